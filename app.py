@@ -1,10 +1,11 @@
-from flask import Flask, render_template, jsonify, request, send_file, session, redirect, url_for
+from flask import Flask, render_template, jsonify, request, send_file, session, redirect, url_for, Response, stream_with_context
 import json
 import logging
 import os
 import threading
 import time
 import re
+import zlib
 from datetime import datetime
 from logging.handlers import RotatingFileHandler
 from container_updates import ContainerUpdateManager
@@ -18,13 +19,19 @@ import docker  # Make sure this is imported
 # Import helper functions
 from functions import (
     initialize_docker_client, load_container_metadata, save_container_metadata, 
-    get_compose_files, scan_all_compose_files, resolve_compose_file_path,
-    extract_env_from_compose, calculate_uptime, find_caddy_container, get_compose_files_cached
+    resolve_compose_file_path, extract_env_from_compose, calculate_uptime, find_caddy_container
 )
 
 
 # Import your existing host manager
-from remote_hosts import host_manager
+from remote_hosts import host_manager, HostBusyError
+from container_inventory import record_image, record_ports, RowVersionTracker
+from container_stats import ContainerStatsCollector, STATS_ENABLED, STATS_INTERVAL, EMPTY_STATS
+from metrics_store import MetricsStore, MetricsArchive, METRICS_ARCHIVE_ENABLED, parse_duration
+from event_stream import EventBroker
+from compose_index import ComposeIndex, ComposeServiceIndex
+from compose_yaml import load_compose, compose_cache, safe_load, safe_dump
+from compose_jobs import ComposeJobManager
 
 # Add after imports
 __version__ = "1.8.5"
@@ -93,18 +100,10 @@ logger.setLevel(log_level)
 # Log the startup
 logger.info(f"Composr starting up - Log file: {log_file}, Debug mode: {log_level == logging.DEBUG}")
 
-# Your host_manager is already initialized in remote_hosts.py, just wait for it to be ready
-start_time = time.time()
-while host_manager.get_client('local') is None and time.time() - start_time < 5:
-    time.sleep(0.1)
-
-# Caching variables
-_system_stats_cache = {}
-_system_stats_timestamp = 0
-_container_cache = {}
-_cache_timestamp = 0
-_cache_lock = threading.Lock()
-CACHE_TTL = 10  # seconds
+# host_manager connects to local Docker on import; saved remote hosts are
+# probed by its health checker in the background and appear as they come up.
+# Lists are shared by all workers through host_manager.shared_cache and daemon
+# info through host_manager.get_daemon_info
 
 # Initialize Docker client (this gets the current/local client)
 client = host_manager.get_client()
@@ -118,6 +117,191 @@ container_update_manager = ContainerUpdateManager(
     metadata_dir=METADATA_DIR
 )
 
+# Compose and .env files under COMPOSE_DIR and EXTRA_COMPOSE_DIRS
+compose_index = ComposeIndex(
+    [COMPOSE_DIR] + EXTRA_COMPOSE_DIRS, COMPOSE_DIR, host_manager.shared_cache,
+    snapshot_path=os.path.join(METADATA_DIR, 'compose_catalog.json.gz')
+)
+# (host, project, service) -> compose file, for the editor
+compose_services = ComposeServiceIndex(
+    compose_index, lambda path: resolve_compose_file_path(path, COMPOSE_DIR, EXTRA_COMPOSE_DIRS, logger)
+)
+
+# docker-compose operations run here instead of in the request thread
+compose_jobs = ComposeJobManager(host_manager.shared_cache, lock_dir=os.path.join(METADATA_DIR, 'locks'))
+
+# Background CPU/memory sampling for running containers
+stats_collector = ContainerStatsCollector(host_manager)
+# Short-term metric history fed by every stats sweep
+metrics_store = MetricsStore()
+stats_collector.add_listener(metrics_store.record_sweep)
+# Long-term history on disk, kept across restarts
+metrics_archive = None
+if METRICS_ARCHIVE_ENABLED:
+    try:
+        metrics_archive = MetricsArchive(os.path.join(METADATA_DIR, 'metrics'))
+        stats_collector.add_listener(metrics_archive.record_sweep)
+    except Exception as e:
+        logger.error(f"Metrics archive disabled: {e}")
+
+# Row versions behind the container list ETag and ?since= deltas, shared by all workers.
+# Live stats and uptime change on every sweep; they travel over the stream instead.
+CONTAINER_LIVE_FIELDS = ('cpu_percent', 'memory_usage', 'uptime')
+container_versions = RowVersionTracker(volatile_fields=CONTAINER_LIVE_FIELDS,
+                                       shared_cache=host_manager.shared_cache, name='containers')
+
+# Live deltas for /api/stream subscribers
+event_broker = EventBroker()
+_published_stats = {}  # (host, container id) -> (cpu, memory) last pushed
+
+def broadcast(event, data):
+    """Publish to this worker's streams and relay to the other workers"""
+    event_broker.publish(event, data)
+    host_manager.shared_cache.append_event(event, data)
+
+def publish_container_change(host_name, change, record):
+    if change == 'resync':
+        broadcast('resync', {'host': host_name})
+        return
+    data = {'change': change, 'host': host_name, 'id': record['short_id'], 'name': record['name']}
+    if change == 'update':
+        data['status'] = record['status']
+        data['image'] = record_image(record)
+    broadcast('container', data)
+
+def publish_stats(host_name, samples, removed):
+    # Latest values for workers that do not run the collector
+    host_manager.shared_cache.set(f"stats:{host_name}", stats_collector.get_host(host_name))
+    for container_id in removed:
+        _published_stats.pop((host_name, container_id), None)
+    changed = {}
+    for container_id, sample in samples.items():
+        value = (sample['cpu_percent'], sample['memory_usage'])
+        if _published_stats.get((host_name, container_id)) != value:
+            _published_stats[(host_name, container_id)] = value
+            changed[container_id[:12]] = {'cpu_percent': value[0], 'memory_usage': value[1]}
+    if changed:
+        broadcast('stats', {'host': host_name, 'containers': changed})
+
+def relay_shared_events():
+    """Forward events logged by the other workers to this worker's stream clients"""
+    last_id = host_manager.shared_cache.last_event_id()
+    while True:
+        time.sleep(1)
+        try:
+            if not event_broker.has_subscribers():
+                last_id = host_manager.shared_cache.last_event_id()
+                continue
+            for event_id, event, data, origin in host_manager.shared_cache.events_after(last_id):
+                # Events from this worker reached its clients when they were broadcast
+                if origin != os.getpid():
+                    event_broker.publish(event, data)
+                last_id = event_id
+        except Exception as e:
+            logger.error(f"Event relay error: {e}")
+
+def host_container_stats(host_name):
+    """Latest stats by container id, from this worker's collector or the leader's"""
+    if stats_collector.is_running():
+        return stats_collector.get_host(host_name)
+    return host_manager.shared_cache.get(f"stats:{host_name}", max_age=STATS_INTERVAL * 3) or {}
+
+def publish_host_status(host_name, connected):
+    event_broker.publish('host', {'host': host_name, 'connected': connected})
+
+def publish_update_results(update_results):
+    event_broker.publish('updates', {
+        'updates_available': update_results.get('updates_available', 0),
+        'last_check': update_results.get('last_check'),
+        'available': [key for key, result in update_results.get('containers', {}).items()
+                      if result.get('update_available')]
+    })
+
+def publish_job(job):
+    if job['finished']:
+        # The request that queued the job invalidated the lists before it ran
+        host_manager.shared_cache.delete_prefix('list:')
+    # Jobs run in whichever worker took the request
+    broadcast('job', {key: job[key] for key in ('id', 'kind', 'host', 'file', 'state', 'message')})
+
+def job_response(job, message):
+    """202 telling the client which job to follow"""
+    response = jsonify({
+        'status': 'queued',
+        'message': message,
+        'job_id': job.id,
+        'status_url': url_for('get_deployment_status', deployment_id=job.id)
+    })
+    response.status_code = 202
+    return response
+
+def container_compose_file(host, container_id):
+    """First compose file of a container from the inventory, None for standalone containers"""
+    try:
+        record = host_manager.inventory.get_record(host, container_id)
+        if record is None:
+            record = next((r for r in host_manager.get_container_snapshot(host)
+                           if r['id'].startswith(container_id) or r['name'] == container_id), None)
+    except Exception as e:
+        logger.debug(f"Cannot look up compose file of {container_id} on {host}: {e}")
+        return None
+    config_files = ((record or {}).get('labels') or {}).get('com.docker.compose.project.config_files')
+    return config_files.split(',')[0] if config_files else None
+
+host_manager.inventory.add_listener(publish_container_change)
+host_manager.add_status_listener(publish_host_status)
+stats_collector.add_listener(publish_stats)
+container_update_manager.add_listener(publish_update_results)
+compose_jobs.add_listener(publish_job)
+
+def query_metric_history(key, range_seconds, points):
+    """Serve short ranges from memory and longer ones from the on-disk archive"""
+    if metrics_archive is not None and (range_seconds > metrics_store.span() or not stats_collector.is_running()):
+        # Workers other than the leader only see the archive
+        return metrics_archive.query(key, range_seconds, points)
+    series = metrics_store.query(key, range_seconds, points)
+    if series is None and metrics_archive is not None:
+        # Nothing in memory yet after a restart
+        series = metrics_archive.query(key, range_seconds, points)
+    return series
+
+def fanout_response(items, host_report, etag=None):
+    """JSON list response with per-host timing and errors from a fan-out query.
+
+    The body stays a plain list for the frontend; timings go into a standard
+    Server-Timing header and failed/timed out hosts into X-Composr-Host-Errors.
+    Responses carry an ETag (the given version tag, else a hash of the body) and
+    answer a matching If-None-Match with 304.
+    """
+    response = jsonify(items)
+    if etag:
+        response.set_etag(etag, weak=True)
+    else:
+        response.add_etag()
+    response.headers['Server-Timing'] = ', '.join(
+        f"{re.sub(r'[^A-Za-z0-9_-]', '_', host)};dur={info['elapsed_ms']}"
+        for host, info in host_report.items()
+    )
+    errors = {host: info['error'] for host, info in host_report.items() if not info['ok']}
+    if errors:
+        response.headers['X-Composr-Host-Errors'] = json.dumps(errors)
+    return response.make_conditional(request)
+
+@app.after_request
+def invalidate_shared_lists(response):
+    """Any successful change may add or remove images, volumes or networks"""
+    if request.method in ('POST', 'PUT', 'DELETE') and response.status_code < 400:
+        host_manager.shared_cache.delete_prefix('list:')
+    return response
+
+@app.errorhandler(HostBusyError)
+def host_busy(e):
+    """A host's bulkhead is full: fail fast instead of tying up a worker thread"""
+    response = jsonify({'status': 'error', 'message': str(e), 'host': e.host_name, 'busy': True})
+    response.status_code = 503
+    response.headers['Retry-After'] = '2'
+    return response
+
 # Main route
 @app.route('/')
 def index():
@@ -259,7 +443,7 @@ def create_backup():
             backup_compose_path = os.path.join(temp_dir, 'backup-compose.yml')
             try:
                 with open(backup_compose_path, 'w') as f:
-                    yaml.dump(backup_compose, f, default_flow_style=False, sort_keys=False)
+                    safe_dump(backup_compose, f, default_flow_style=False, sort_keys=False)
                 logger.info("Saved backup compose file")
             except Exception as e:
                 logger.error(f"Failed to save backup compose: {e}")
@@ -285,7 +469,7 @@ def create_backup():
                 os.makedirs(compose_files_dir, exist_ok=True)
                 
                 try:
-                    compose_files = get_compose_files_cached(COMPOSE_DIR, tuple(EXTRA_COMPOSE_DIRS if EXTRA_COMPOSE_DIRS else []))
+                    compose_files = compose_index.compose_files()
                     logger.info(f"Found {len(compose_files)} compose files to backup")
                     
                     for compose_file in compose_files:
@@ -312,29 +496,19 @@ def create_backup():
                 os.makedirs(env_files_dir, exist_ok=True)
                 
                 try:
-                    # Find all .env files
-                    extra_dirs = EXTRA_COMPOSE_DIRS if EXTRA_COMPOSE_DIRS else []
-                    if isinstance(extra_dirs, str):
-                        extra_dirs = extra_dirs.split(':') if extra_dirs else []
-                    
-                    search_dirs = [COMPOSE_DIR] + [d for d in extra_dirs if d and os.path.exists(d)]
-                    logger.info(f"Searching for .env files in: {search_dirs}")
-                    
-                    for search_dir in search_dirs:
-                        for root, dirs, files in os.walk(search_dir):
-                            for file in files:
-                                if file == '.env':
-                                    try:
-                                        env_file_path = os.path.join(root, file)
-                                        rel_path = os.path.relpath(env_file_path, search_dir)
-                                        backup_env_path = os.path.join(env_files_dir, rel_path)
-                                        os.makedirs(os.path.dirname(backup_env_path), exist_ok=True)
-                                        
-                                        shutil.copy2(env_file_path, backup_env_path)
-                                        env_files_copied.append(rel_path)
-                                        logger.debug(f"Copied env file: {rel_path}")
-                                    except Exception as e:
-                                        logger.warning(f"Failed to copy env file {file}: {e}")
+                    # All .env files from the compose catalog
+                    for entry in compose_index.catalog('env'):
+                        env_file_path = entry['path']
+                        try:
+                            rel_path = os.path.relpath(env_file_path, entry['root'] or COMPOSE_DIR)
+                            backup_env_path = os.path.join(env_files_dir, rel_path)
+                            os.makedirs(os.path.dirname(backup_env_path), exist_ok=True)
+                            
+                            shutil.copy2(env_file_path, backup_env_path)
+                            env_files_copied.append(rel_path)
+                            logger.debug(f"Copied env file: {rel_path}")
+                        except Exception as e:
+                            logger.warning(f"Failed to copy env file {env_file_path}: {e}")
                 except Exception as e:
                     logger.warning(f"Failed to copy env files: {e}")
             
@@ -708,17 +882,10 @@ def preview_backup():
         containers = client.containers.list(all=True)
         container_count = len(containers)
         
-        # Count compose files
-        compose_files = get_compose_files_cached(COMPOSE_DIR, tuple(EXTRA_COMPOSE_DIRS))
-        compose_count = len(compose_files)
-        
-        # Count env files
-        env_count = 0
-        search_dirs = [COMPOSE_DIR] + [d for d in EXTRA_COMPOSE_DIRS if d and isinstance(d, str)]
-        for search_dir in search_dirs:
-            if os.path.exists(search_dir):
-                for root, dirs, files in os.walk(search_dir):
-                    env_count += files.count('.env')
+        # Count compose and env files, sized from the compose catalog
+        compose_count = len(compose_index.catalog('compose'))
+        env_count = len(compose_index.catalog('env'))
+        config_size = compose_index.total_size()
         
         # Get container metadata count
         container_metadata = load_container_metadata(CONTAINER_METADATA_FILE, logger)
@@ -732,7 +899,8 @@ def preview_backup():
                 'compose_files': compose_count,
                 'env_files': env_count,
                 'container_metadata': metadata_count,
-                'estimated_size': 'Small (< 1MB)'  # These are just config files
+                'estimated_size': 'Small (< 1MB)' if config_size < 1024 * 1024 else f"{config_size / (1024 * 1024):.1f} MB",
+                'config_bytes': config_size
             }
         })
     
@@ -750,7 +918,8 @@ def get_hosts():
         return jsonify({
             'status': 'success',
             'hosts': hosts_status,
-            'current_host': current_host
+            'current_host': current_host,
+            'leader': host_manager.leader.leader_info()
         })
     except Exception as e:
         logger.error(f"Failed to get hosts: {e}")
@@ -773,7 +942,7 @@ def add_docker_host():
             return jsonify({'status': 'error', 'message': 'URL must start with tcp:// (e.g., tcp://192.168.1.100:2375)'})
         
         # Add host using your HostManager
-        success, message = host_manager.add_host(name, url, description)
+        success, message = host_manager.add_host(name, url, description, data.get('pool_size'))
         
         if success:
             return jsonify({
@@ -875,48 +1044,42 @@ def switch_docker_host():
 @app.route('/api/containers/all')
 def get_all_containers():
     """Get containers from all connected hosts"""
-    all_containers = []
-    
     try:
-        # Get hosts status
-        hosts_status = host_manager.get_hosts_status()
+        def collect_host_containers(host_name, client):
+            host_containers = []
+            host_stats = host_container_stats(host_name)
+            for record in host_manager.get_container_snapshot(host_name):
+                # Build container data similar to regular endpoint
+                labels = record['labels']
+                compose_project = labels.get('com.docker.compose.project', None)
+                compose_file = None
+                config_files = labels.get('com.docker.compose.project.config_files', None)
+                if config_files:
+                    file_path = config_files.split(',')[0]
+                    compose_file = os.path.basename(file_path)
+                
+                stats = host_stats.get(record['id'], EMPTY_STATS)
+                container_data = {
+                    'id': record['short_id'],
+                    'name': record['name'],
+                    'status': record['status'],
+                    'image': record_image(record),
+                    'compose_project': compose_project,
+                    'compose_file': compose_file,
+                    'uptime': calculate_uptime(record['started_at'], logger),
+                    'cpu_percent': stats['cpu_percent'],
+                    'memory_usage': stats['memory_usage'],
+                    'tags': [],
+                    'host': host_name
+                }
+                host_containers.append(container_data)
+            return host_containers
         
-        # Iterate through each connected host
-        for host_name, status in hosts_status.items():
-            if status['connected']:
-                # Get containers from this host
-                client = host_manager.get_client(host_name)
-                if client:
-                    try:
-                        containers = []
-                        for container in client.containers.list(all=True):
-                            # Build container data similar to regular endpoint
-                            labels = container.labels
-                            compose_project = labels.get('com.docker.compose.project', None)
-                            compose_file = None
-                            config_files = labels.get('com.docker.compose.project.config_files', None)
-                            if config_files:
-                                file_path = config_files.split(',')[0]
-                                compose_file = os.path.basename(file_path)
-                            
-                            container_data = {
-                                'id': container.short_id,
-                                'name': container.name,
-                                'status': container.status,
-                                'image': container.image.tags[0] if container.image.tags else 'unknown',
-                                'compose_project': compose_project,
-                                'compose_file': compose_file,
-                                'uptime': calculate_uptime(container.attrs['State'].get('StartedAt', ''), logger),
-                                'cpu_percent': 0,
-                                'memory_usage': 0,
-                                'tags': [],
-                                'host': host_name
-                            }
-                            all_containers.append(container_data)
-                    except Exception as e:
-                        logger.error(f"Failed to get containers from host {host_name}: {e}")
+        # Query every connected host in parallel
+        host_results, host_report = host_manager.fan_out(collect_host_containers)
+        all_containers = [c for rows in host_results.values() for c in rows]
                         
-        return jsonify(all_containers)
+        return fanout_response(all_containers, host_report)
         
     except Exception as e:
         logger.error(f"Failed to get containers from all hosts: {e}")
@@ -935,71 +1098,71 @@ def get_containers():
         stack_filter = request.args.get('stack', '')
         host_filter = request.args.get('host', '')  # Add host filter
 
-        all_containers = []
         hosts_status = host_manager.get_hosts_status()
         container_metadata = load_container_metadata(CONTAINER_METADATA_FILE, logger)
 
-        # Iterate through ALL connected hosts
-        for host_name, status_info in hosts_status.items():
-            if status_info['connected']:
-                client = host_manager.get_client(host_name)
-                if client:
-                    try:
-                        host_containers = client.containers.list(all=True)
-                        logger.debug(f"Processing {len(host_containers)} containers from host {host_name}")
-                        
-                        for container in host_containers:
-                            labels = container.labels or {}
-                            compose_project = labels.get('com.docker.compose.project', None)
-                            compose_file = None
-                            config_files = labels.get('com.docker.compose.project.config_files', None)
-                            
-                            if config_files:
-                                file_path = config_files.split(',')[0]
-                                compose_file = os.path.basename(file_path)
-                            
-                            container_name = container.name
-                            # Use host-prefixed key for metadata lookup
-                            metadata_key = f"{host_name}:{container_name}" if host_name != 'local' else container_name
-                            container_meta = container_metadata.get(metadata_key, {})
-                            
-                            # Extract ports properly
-                            ports = {}
-                            try:
-                                port_bindings = container.attrs.get('HostConfig', {}).get('PortBindings')
-                                if port_bindings:
-                                    for container_port, host_config in port_bindings.items():
-                                        if host_config and len(host_config) > 0:
-                                            host_port = host_config[0].get('HostPort')
-                                            if host_port:
-                                                ports[host_port] = container_port
-                            except Exception as e:
-                                logger.warning(f"Failed to extract ports for {host_name}:{container_name}: {e}")
-                            
-                            container_data = {
-                                'id': container.short_id,
-                                'name': container_name,
-                                'status': container.status,
-                                'image': container.image.tags[0] if container.image.tags else 'unknown',
-                                'compose_project': compose_project,
-                                'compose_file': compose_file,
-                                'uptime': calculate_uptime(container.attrs['State'].get('StartedAt', ''), logger),
-                                'cpu_percent': 0,
-                                'memory_usage': 0,
-                                'tags': container_meta.get('tags', []),
-                                'custom_url': container_meta.get('custom_url', ''),
-                                'host': host_name,
-                                'host_display': status_info.get('name', host_name),
-                                'ports': ports
-                            }
-                            all_containers.append(container_data)
-                            
-                    except Exception as e:
-                        logger.error(f"Failed to get containers from host {host_name}: {e}")
+        def collect_host_containers(host_name, client):
+            status_info = hosts_status.get(host_name, {})
+            host_containers = host_manager.get_container_snapshot(host_name)
+            logger.debug(f"Processing {len(host_containers)} containers from host {host_name}")
+            host_stats = host_container_stats(host_name)
+            
+            rows = []
+            for record in host_containers:
+                labels = record['labels']
+                compose_project = labels.get('com.docker.compose.project', None)
+                compose_file = None
+                config_files = labels.get('com.docker.compose.project.config_files', None)
+                
+                if config_files:
+                    file_path = config_files.split(',')[0]
+                    compose_file = os.path.basename(file_path)
+                
+                container_name = record['name']
+                # Use host-prefixed key for metadata lookup
+                metadata_key = f"{host_name}:{container_name}" if host_name != 'local' else container_name
+                container_meta = container_metadata.get(metadata_key, {})
+                
+                # Extract ports properly
+                ports = {}
+                try:
+                    ports = record_ports(record)
+                except Exception as e:
+                    logger.warning(f"Failed to extract ports for {host_name}:{container_name}: {e}")
+                
+                stats = host_stats.get(record['id'], EMPTY_STATS)
+                container_data = {
+                    'id': record['short_id'],
+                    'name': container_name,
+                    'status': record['status'],
+                    'image': record_image(record),
+                    'compose_project': compose_project,
+                    'compose_file': compose_file,
+                    'uptime': calculate_uptime(record['started_at'], logger),
+                    'cpu_percent': stats['cpu_percent'],
+                    'memory_usage': stats['memory_usage'],
+                    'tags': container_meta.get('tags', []),
+                    'custom_url': container_meta.get('custom_url', ''),
+                    'host': host_name,
+                    'host_display': status_info.get('name', host_name),
+                    'ports': ports
+                }
+                rows.append(container_data)
+            return rows
+
+        # Query ALL connected hosts in parallel; a slow host only delays its own rows
+        host_results, host_report = host_manager.fan_out(collect_host_containers)
+        all_containers = [c for rows in host_results.values() for c in rows]
+
+        # Version the full row set before filtering, so every filter shares it. Rows of a host
+        # that failed to answer this time are not counted as removed.
+        failed_hosts = {name for name, report in host_report.items() if not report['ok']}
+        version = container_versions.update(all_containers, retain=lambda key: key[0] in failed_hosts)
+        args_key = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items())
+                            if k not in ('nocache', 'since', 'epoch'))
 
         # Apply filters
-        filtered_containers = []
-        for container in all_containers:
+        def matches_filters(container):
             # Search filter
             if search and not (
                 search in container['name'].lower() or
@@ -1007,27 +1170,29 @@ def get_containers():
                 search in (container['compose_file'] or '').lower() or
                 any(search in tag.lower() for tag in container.get('tags', []))
             ):
-                continue
+                return False
             
             # Status filter
             if status and container['status'] != status:
-                continue
+                return False
             
             # Tag filter
             if tag_filter and tag_filter not in container.get('tags', []):
-                continue
+                return False
                 
             # Stack filter
             if stack_filter:
                 stack_name = extract_stack_name(container)
                 if stack_name != stack_filter:
-                    continue
+                    return False
             
             # Host filter
             if host_filter and container['host'] != host_filter:
-                continue
+                return False
                 
-            filtered_containers.append(container)
+            return True
+
+        filtered_containers = [c for c in all_containers if matches_filters(c)]
 
         # Sort containers
         if sort_by == 'name':
@@ -1043,7 +1208,53 @@ def get_containers():
         elif sort_by == 'host':
             filtered_containers.sort(key=lambda x: (x.get('host', 'local'), x['name'].lower()))
 
-        return jsonify(filtered_containers)
+        since = request.args.get('since')
+        if since is not None:
+            # Live values of every listed container, by host and id
+            live = {}
+            for container in filtered_containers:
+                live.setdefault(container['host'], {})[container['id']] = {
+                    field: container[field] for field in CONTAINER_LIVE_FIELDS
+                }
+            delta = None
+            if request.args.get('epoch') == container_versions.epoch and since.isdigit():
+                delta = container_versions.changes_since(int(since))
+            if delta is None:
+                # Unknown or expired version: send everything
+                return jsonify({
+                    'epoch': container_versions.epoch,
+                    'version': version,
+                    'full': True,
+                    'changed': filtered_containers,
+                    'removed': [],
+                    'live': live
+                })
+            changed_keys, removed = delta
+            changed_keys = set(changed_keys)
+            changed = [row for row in all_containers if container_versions.key(row) in changed_keys]
+            # Rows that changed out of the filter are removals for this client
+            removed = [{'host': key[0], 'id': key[1]} for key in removed]
+            removed += [{'host': row['host'], 'id': row['id']} for row in changed if not matches_filters(row)]
+            return jsonify({
+                'epoch': container_versions.epoch,
+                'version': version,
+                'full': False,
+                'changed': [row for row in filtered_containers if container_versions.key(row) in changed_keys],
+                'removed': removed,
+                'live': live
+            })
+
+        # Row versions leave out the live fields, so the ETag hashes them (in list order) on top
+        live_key = json.dumps([[c['host'], c['id']] + [c[field] for field in CONTAINER_LIVE_FIELDS]
+                               for c in filtered_containers], default=str)
+        etag = (f"{container_versions.epoch}-{version}-{zlib.crc32(args_key.encode()):08x}"
+                f"-{zlib.crc32(live_key.encode()):08x}")
+        if request.if_none_match.contains_weak(etag):
+            response = Response(status=304)
+            response.set_etag(etag, weak=True)
+            return response
+
+        return fanout_response(filtered_containers, host_report, etag=etag)
 
     except Exception as e:
         logger.error(f"Failed to list containers from all hosts: {e}")
@@ -1246,6 +1457,74 @@ def get_container_logs(id):
         return jsonify({'status': 'error', 'message': str(e)})
 
 
+@app.route('/api/containers/<id>/metrics')
+def get_container_metrics(id):
+    """Downsampled CPU/memory/IO history for a container"""
+    try:
+        host = request.args.get('host', 'local')
+        range_seconds = parse_duration(request.args.get('range', '1h'))
+        points = int(request.args.get('points', 120))
+
+        record = host_manager.inventory.get_record(host, id)
+        if record is None:
+            record = next((r for r in host_manager.get_container_snapshot(host)
+                           if r['id'].startswith(id) or r['name'] == id), None)
+        if record is None:
+            return jsonify({'status': 'error', 'message': f'Container {id} not found on {host}'}), 404
+
+        series = query_metric_history(('container', host, record['id']), range_seconds, points)
+        return jsonify({
+            'status': 'success',
+            'container': record['name'],
+            'host': host,
+            'range': range_seconds,
+            'metrics': list(metrics_store.metrics),
+            'resolution': series['resolution'] if series else None,
+            'points': series['points'] if series else []
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to get metrics for container {id}: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/api/hosts/<host_name>/metrics')
+def get_host_metrics(host_name):
+    """Downsampled totals across all running containers of a host"""
+    try:
+        range_seconds = parse_duration(request.args.get('range', '1h'))
+        points = int(request.args.get('points', 120))
+        series = query_metric_history(('host', host_name), range_seconds, points)
+        return jsonify({
+            'status': 'success',
+            'host': host_name,
+            'range': range_seconds,
+            'metrics': list(metrics_store.metrics),
+            'resolution': series['resolution'] if series else None,
+            'points': series['points'] if series else []
+        })
+    except ValueError as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    except Exception as e:
+        logger.error(f"Failed to get metrics for host {host_name}: {e}")
+        return jsonify({'status': 'error', 'message': str(e)}), 500
+
+
+@app.route('/api/stream')
+def event_stream():
+    """Server-Sent Events: container state, stats, host and update-check deltas"""
+    topics = [t for t in request.args.get('topics', '').split(',') if t] or None
+    subscription = event_broker.subscribe(topics)
+    if subscription is None:
+        return jsonify({'status': 'error', 'message': 'Too many open event streams'}), 503
+    return Response(
+        stream_with_context(subscription.frames()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
 # Fix the container inspect endpoint
 @app.route('/api/container/<id>/inspect')
 def inspect_container(id):
@@ -1516,79 +1795,34 @@ def repull_container(id):
 
 @app.route('/api/container/<id>/compose')
 def get_container_compose(id):
-    if client is None:
-        return jsonify({'status': 'error', 'message': 'Docker service unavailable'})
     try:
-        container = client.containers.get(id)
+        host = request.args.get('host', 'local')
+        host_client = host_manager.get_client(host)
+        if not host_client:
+            return jsonify({'status': 'error', 'message': f'Host {host} not available'})
+        container = host_client.containers.get(id)
         
         # Extract project name and service name from labels
         labels = container.labels
         project = labels.get('com.docker.compose.project', '')
         service = labels.get('com.docker.compose.service', '')
         
-        logger.debug(f"Looking for compose file for project: {project}, service: {service}")
-        
-        # Check if project exists as a directory in COMPOSE_DIR
-        project_dir = os.path.join(COMPOSE_DIR, project)
+        logger.debug(f"Looking for compose file for project: {project}, service: {service} on {host}")
         
-        # List of common compose filenames
-        compose_filenames = ['docker-compose.yaml', 'docker-compose.yml', 'compose.yaml', 'compose.yml']
-        
-        # Try to find compose file in project directory
-        if os.path.isdir(project_dir):
-            logger.debug(f"Found project directory: {project_dir}")
+        file_path = compose_services.lookup(host, project, service, labels)
+        if file_path:
+            with open(file_path, 'r') as f:
+                content = f.read()
             
-            for filename in compose_filenames:
-                file_path = os.path.join(project_dir, filename)
-                if os.path.exists(file_path):
-                    logger.debug(f"Found compose file: {file_path}")
-                    
-                    with open(file_path, 'r') as f:
-                        content = f.read()
-                    
-                    relative_path = os.path.join(project, filename)
-                    return jsonify({
-                        'status': 'success',
-                        'content': content,
-                        'file': relative_path
-                    })
-        
-        # If that doesn't work, try all directories
-        for dir_name in os.listdir(COMPOSE_DIR):
-            dir_path = os.path.join(COMPOSE_DIR, dir_name)
-            if not os.path.isdir(dir_path):
-                continue
-                
-            for filename in compose_filenames:
-                file_path = os.path.join(dir_path, filename)
-                if os.path.exists(file_path):
-                    logger.debug(f"Checking compose file: {file_path}")
-                    
-                    # Check if this compose file contains the service
-                    try:
-                        with open(file_path, 'r') as f:
-                            import yaml
-                            try:
-                                compose_data = yaml.safe_load(f)
-                                if (compose_data and 'services' in compose_data and
-                                    service in compose_data['services']):
-                                    logger.debug(f"Found matching service in: {file_path}")
-                                    
-                                    with open(file_path, 'r') as f2:
-                                        content = f2.read()
-                                    
-                                    relative_path = os.path.join(dir_name, filename)
-                                    return jsonify({
-                                        'status': 'success',
-                                        'content': content,
-                                        'file': relative_path
-                                    })
-                            except yaml.YAMLError:
-                                pass
-                    except Exception as e:
-                        logger.debug(f"Error checking compose file: {e}")
+            # Relative to the compose directory holding it, which may be one of EXTRA_COMPOSE_DIRS
+            file_path = os.path.abspath(file_path)
+            relative_path = os.path.relpath(file_path, compose_index.root_of(file_path) or COMPOSE_DIR).replace(os.sep, '/')
+            return jsonify({
+                'status': 'success',
+                'content': content,
+                'file': relative_path
+            })
         
-        # If still not found, return error
         logger.error(f"No matching compose file found for container {id}, project {project}, service {service}")
         return jsonify({
             'status': 'error',
@@ -1601,19 +1835,13 @@ def get_container_compose(id):
 # System info route
 @app.route('/api/system')
 def get_system_stats():
-    global _system_stats_cache, _system_stats_timestamp
     if client is None:
         logger.error("Docker client not initialized")
         return jsonify({'status': 'error', 'message': 'Docker service unavailable'})
-    current_time = time.time()
-    with _cache_lock:
-        if current_time - _system_stats_timestamp < CACHE_TTL and _system_stats_cache:
-            logger.debug("Using cached system stats")
-            return jsonify(_system_stats_cache)
     try:
-        info = client.info()
+        info = host_manager.get_daemon_info('local')
         if not info:
-            logger.error("Empty response from client.info()")
+            logger.error("No daemon info available for local host")
             return jsonify({'status': 'error', 'message': 'No system info available'})
         total_memory = 0
         used_memory = 0
@@ -1628,20 +1856,17 @@ def get_system_stats():
                     used_memory = total_memory - mem_available
         except Exception as e:
             logger.warning(f"Failed to read /proc/meminfo: {e}")
-            total_memory = info.get('MemTotal', 0) / (1024 * 1024)
-            used_memory = total_memory - (info.get('MemFree', 0) / (1024 * 1024))
+            total_memory = (info.get('MemTotal') or 0) / (1024 * 1024)
+            used_memory = 0
         stats = {
             'status': 'success',
-            'total_containers': info.get('Containers', 0),
-            'running_containers': info.get('ContainersRunning', 0),
-            'cpu_count': info.get('NCPU', 0),
+            'total_containers': info.get('Containers') or 0,
+            'running_containers': info.get('ContainersRunning') or 0,
+            'cpu_count': info.get('NCPU') or 0,
             'memory_used': round(used_memory, 2),
             'memory_total': round(total_memory, 2),
             'memory_percent': round((used_memory / total_memory * 100) if total_memory else 0, 2)
         }
-        with _cache_lock:
-            _system_stats_cache = stats
-            _system_stats_timestamp = current_time
         return jsonify(stats)
     except Exception as e:
         logger.error(f"Failed to get system stats: {e}")
@@ -1651,7 +1876,7 @@ def get_system_stats():
 @app.route('/api/compose/files')
 def get_compose_files_endpoint():
     try:
-        files = get_compose_files_cached(COMPOSE_DIR, tuple(EXTRA_COMPOSE_DIRS))
+        files = compose_index.compose_files()
         logger.debug(f"Returning compose files: {files}")
         return jsonify({'status': 'success', 'files': files})
     except Exception as e:
@@ -1663,7 +1888,7 @@ def scan_compose_files_multihost():
     """Enhanced compose file scanning with host context awareness"""
     try:
         # Get standard local files
-        files = scan_all_compose_files(COMPOSE_DIR, EXTRA_COMPOSE_DIRS, logger)
+        files = compose_index.rescan()
         
         # Add metadata about which hosts can use each file
         enhanced_files = []
@@ -1751,29 +1976,33 @@ def deploy_compose_to_host():
         if analysis['warnings']:
             logger.warning(f"Deployment warnings for {compose_file}: {analysis['warnings']}")
         
-        # Execute compose command targeting specific host
-        result = execute_compose_on_host_enhanced(full_path, target_host, action, pull_images)
-        
-        if result['success']:
-            return jsonify({
-                'status': 'success',
-                'message': f'Successfully {action}ed compose on {target_host}',
-                'output': result.get('output', ''),
-                'warnings': analysis.get('warnings', []),
-                'deployment_info': {
-                    'host': target_host,
-                    'action': action,
-                    'file': compose_file,
-                    'timestamp': datetime.now().isoformat()
+        def deploy(job):
+            # Execute compose command targeting specific host
+            result = execute_compose_on_host_enhanced(job, full_path, target_host, action, pull_images)
+            
+            if result['success']:
+                return {
+                    'status': 'success',
+                    'message': f'Successfully {action}ed compose on {target_host}',
+                    'output': result.get('output', ''),
+                    'warnings': analysis.get('warnings', []),
+                    'deployment_info': {
+                        'host': target_host,
+                        'action': action,
+                        'file': compose_file,
+                        'timestamp': datetime.now().isoformat()
+                    }
                 }
-            })
-        else:
-            return jsonify({
+            return {
                 'status': 'error',
                 'message': result['message'],
                 'output': result.get('output', ''),
                 'error_details': result.get('error_details', {})
-            })
+            }
+        
+        job = compose_jobs.submit('deploy', deploy, f'{action} {compose_file} on {target_host}',
+                                  host=target_host, file=full_path)
+        return job_response(job, f'Queued {action} of {compose_file} on {target_host}')
             
     except Exception as e:
         logger.error(f"Failed to deploy compose: {e}", exc_info=True)
@@ -1860,28 +2089,46 @@ def analyze_compose_file_endpoint():
 
 @app.route('/api/deployment/status/<deployment_id>')
 def get_deployment_status(deployment_id):
-    """Get status of a deployment operation"""
+    """Get status of a deployment operation (any queued compose job)"""
     try:
-        # In a real implementation, you'd track deployment status
-        # For now, return a simple status
+        job = compose_jobs.get(deployment_id)
+        if job is None:
+            return jsonify({'status': 'error', 'message': f'Unknown deployment {deployment_id}'}), 404
         return jsonify({
             'status': 'success',
-            'deployment_status': 'completed',
-            'message': 'Deployment completed successfully'
+            'deployment_status': job['state'],
+            'message': job['message'],
+            'job': job
         })
     except Exception as e:
         logger.error(f"Failed to get deployment status: {e}")
         return jsonify({'status': 'error', 'message': str(e)})
 
+@app.route('/api/deployment/stream/<deployment_id>')
+def stream_deployment_output(deployment_id):
+    """Server-Sent Events: a compose job's output line by line, then its result"""
+    if compose_jobs.get(deployment_id) is None:
+        return jsonify({'status': 'error', 'message': f'Unknown deployment {deployment_id}'}), 404
+    try:
+        # Reconnecting browsers send the seq of the last line they saw
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after') or 0)
+    except ValueError:
+        after = 0
+    frames = compose_jobs.open_stream(deployment_id, after)
+    if frames is None:
+        return jsonify({'status': 'error', 'message': 'Too many open output streams'}), 503
+    return Response(
+        stream_with_context(frames),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 # Enhanced helper functions
 
 def validate_compose_file(file_path):
     """Validate a docker-compose file"""
     try:
-        import yaml
-        
-        with open(file_path, 'r') as f:
-            compose_data = yaml.safe_load(f)
+        compose_data = load_compose(file_path)
         
         if not compose_data:
             return {'valid': False, 'error': 'Empty YAML document'}
@@ -1920,10 +2167,7 @@ def validate_compose_file(file_path):
 def analyze_compose_for_deployment(file_path, target_host):
     """Analyze compose file for deployment warnings and requirements"""
     try:
-        import yaml
-        
-        with open(file_path, 'r') as f:
-            compose_data = yaml.safe_load(f)
+        compose_data = load_compose(file_path)
         
         return analyze_compose_data(compose_data, target_host)
         
@@ -1940,9 +2184,7 @@ def analyze_compose_for_deployment(file_path, target_host):
 def analyze_compose_content_for_issues(content):
     """Analyze compose content string for issues"""
     try:
-        import yaml
-        
-        compose_data = yaml.safe_load(content)
+        compose_data = safe_load(content)
         return analyze_compose_data(compose_data, 'unknown')
         
     except yaml.YAMLError as e:
@@ -2058,8 +2300,8 @@ def analyze_compose_data(compose_data, target_host):
         'resource_requirements': resource_requirements
     }
 
-def execute_compose_on_host_enhanced(compose_file_path, target_host, action, pull_images=False):
-    """Enhanced version of execute_compose_on_host with better error handling"""
+def execute_compose_on_host_enhanced(job, compose_file_path, target_host, action, pull_images=False):
+    """Enhanced version of execute_compose_on_host with better error handling; runs inside a compose job"""
     try:
         import subprocess
         
@@ -2092,14 +2334,7 @@ def execute_compose_on_host_enhanced(compose_file_path, target_host, action, pul
                 logger.info(f"Pulling images for {project_name} on {target_host}")
                 pull_cmd = ['docker-compose', '-f', compose_filename, 'pull']
                 
-                pull_result = subprocess.run(
-                    pull_cmd,
-                    cwd=compose_dir,
-                    env=env,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
+                pull_result = job.run(pull_cmd, cwd=compose_dir, env=env, timeout=300)
                 
                 steps_output.append(f"PULL OUTPUT:\n{pull_result.stdout}")
                 if pull_result.stderr:
@@ -2116,14 +2351,7 @@ def execute_compose_on_host_enhanced(compose_file_path, target_host, action, pul
             elif action == 'restart':
                 # First down, then up
                 down_cmd = ['docker-compose', '-f', compose_filename, 'down']
-                down_result = subprocess.run(
-                    down_cmd,
-                    cwd=compose_dir,
-                    env=env,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
+                down_result = job.run(down_cmd, cwd=compose_dir, env=env, timeout=300)
                 
                 steps_output.append(f"DOWN OUTPUT:\n{down_result.stdout}")
                 if down_result.stderr:
@@ -2136,14 +2364,7 @@ def execute_compose_on_host_enhanced(compose_file_path, target_host, action, pul
             logger.info(f"Executing: {' '.join(cmd)} in {compose_dir} for host {target_host}")
             
             # Execute main command
-            result = subprocess.run(
-                cmd,
-                cwd=compose_dir,
-                env=env,
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+            result = job.run(cmd, cwd=compose_dir, env=env, timeout=300)
             
             steps_output.append(f"{action.upper()} OUTPUT:\n{result.stdout}")
             if result.stderr:
@@ -2206,23 +2427,31 @@ def create_project_and_deploy():
             
             # Deploy the project
             deploy_action = 'up' if auto_start else 'down'
-            deploy_result = execute_compose_on_host_enhanced(
-                os.path.join(COMPOSE_DIR, compose_path), 
-                deploy_host, 
-                deploy_action
-            )
+            full_path = os.path.join(COMPOSE_DIR, compose_path)
             
-            if deploy_result['success']:
-                create_result['message'] += f' and deployed to {deploy_host}'
-                create_result['deployment'] = {
-                    'host': deploy_host,
-                    'action': deploy_action,
-                    'output': deploy_result.get('output', '')
+            def deploy(job):
+                deploy_result = execute_compose_on_host_enhanced(job, full_path, deploy_host, deploy_action)
+                if deploy_result['success']:
+                    return {
+                        'status': 'success',
+                        'message': f'{project_name} deployed to {deploy_host}',
+                        'deployment': {
+                            'host': deploy_host,
+                            'action': deploy_action,
+                            'output': deploy_result.get('output', '')
+                        }
+                    }
+                # Don't fail the entire operation if deployment fails: the project exists
+                return {
+                    'status': 'error',
+                    'message': f'Deployment to {deploy_host} failed',
+                    'deployment_error': deploy_result['message']
                 }
-            else:
-                create_result['message'] += f' but deployment to {deploy_host} failed'
-                create_result['deployment_error'] = deploy_result['message']
-                # Don't fail the entire operation if deployment fails
+            
+            job = compose_jobs.submit('create-deploy', deploy, f'{deploy_action} {compose_path} on {deploy_host}',
+                                      host=deploy_host, file=full_path)
+            create_result['message'] += f', deployment to {deploy_host} queued'
+            create_result['job_id'] = job.id
         
         return jsonify(create_result)
         
@@ -2285,8 +2514,8 @@ def check_host_deployment_ready(host_name):
         })
 
 
-def execute_compose_on_host(compose_file_path, target_host, action):
-    """Execute docker-compose command on a specific host"""
+def execute_compose_on_host(job, compose_file_path, target_host, action):
+    """Execute docker-compose command on a specific host; runs inside a compose job"""
     try:
         import subprocess
         
@@ -2323,27 +2552,13 @@ def execute_compose_on_host(compose_file_path, target_host, action):
         logger.info(f"Executing: {' '.join(cmd)} in {compose_dir} for host {target_host}")
         
         # Execute command
-        result = subprocess.run(
-            cmd,
-            cwd=compose_dir,
-            env=env,
-            capture_output=True,
-            text=True,
-            timeout=300  # 5 minute timeout
-        )
+        result = job.run(cmd, cwd=compose_dir, env=env, timeout=300)  # 5 minute timeout
         
         if result.returncode == 0:
             # If restart, now do the up
             if action == 'restart':
                 up_cmd = ['docker-compose', '-f', compose_filename, 'up', '-d']
-                up_result = subprocess.run(
-                    up_cmd,
-                    cwd=compose_dir,
-                    env=env,
-                    capture_output=True,
-                    text=True,
-                    timeout=300
-                )
+                up_result = job.run(up_cmd, cwd=compose_dir, env=env, timeout=300)
                 if up_result.returncode != 0:
                     return {
                         'success': False,
@@ -2403,6 +2618,7 @@ def save_compose():
             os.makedirs(os.path.dirname(full_path), exist_ok=True)
         with open(full_path, 'w') as f:
             f.write(content)
+        compose_cache.invalidate(full_path)
         return jsonify({'status': 'success', 'message': 'Compose file saved successfully'})
     except Exception as e:
         logger.error(f"Failed to save compose file: {e}")
@@ -2478,68 +2694,63 @@ def apply_compose():
         env = os.environ.copy()
         
         # First, check if the compose file has a "name:" property
-        with open(full_path, 'r') as f:
-            import yaml
-            compose_data = yaml.safe_load(f)
-            project_name = compose_data.get('name', os.path.basename(compose_dir))
+        compose_data = load_compose(full_path)
+        project_name = compose_data.get('name', os.path.basename(compose_dir))
         
         env["COMPOSE_PROJECT_NAME"] = project_name
         logger.info(f"Using project name: {project_name}")
         
-        # Prepare the command logging handler
-        def log_command(cmd, cwd):
-            cmd_str = ' '.join(cmd)
-            logger.info(f"Running command: {cmd_str} in {cwd}")
-            return subprocess.run(
-                cmd, 
-                check=True, 
-                cwd=cwd, 
-                env=env,
-                text=True,
-                capture_output=True
-            )
-        
-        # Step 1: If requested, pull latest images
-        if pull:
-            logger.info("Pulling latest images...")
+        def restart(job):
+            # Prepare the command logging handler
+            def log_command(cmd, cwd):
+                cmd_str = ' '.join(cmd)
+                logger.info(f"Running command: {cmd_str} in {cwd}")
+                return job.run(cmd, cwd=cwd, env=env, check=True)
+            
+            # Step 1: If requested, pull latest images
+            if pull:
+                logger.info("Pulling latest images...")
+                try:
+                    result = log_command(
+                        ["docker-compose", "-f", compose_filename, "pull"],
+                        compose_dir
+                    )
+                    logger.info(f"Pull completed: {result.stdout}")
+                except subprocess.CalledProcessError as e:
+                    logger.error(f"Pull failed: {e.stderr}")
+                    return {'status': 'error', 'message': f'Failed to pull images: {e.stderr}'}
+            
+            # Step 2: Stop the containers
+            logger.info("Stopping containers...")
             try:
                 result = log_command(
-                    ["docker-compose", "-f", compose_filename, "pull"],
+                    ["docker-compose", "-f", compose_filename, "down"],
                     compose_dir
                 )
-                logger.info(f"Pull completed: {result.stdout}")
+                logger.info(f"Down completed: {result.stdout}")
             except subprocess.CalledProcessError as e:
-                logger.error(f"Pull failed: {e.stderr}")
-                return jsonify({'status': 'error', 'message': f'Failed to pull images: {e.stderr}'})
-        
-        # Step 2: Stop the containers
-        logger.info("Stopping containers...")
-        try:
-            result = log_command(
-                ["docker-compose", "-f", compose_filename, "down"],
-                compose_dir
-            )
-            logger.info(f"Down completed: {result.stdout}")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Down failed: {e.stderr}")
-            # Continue anyway, as some containers might not exist yet
-        
-        # Step 3: Start the containers
-        logger.info("Starting containers...")
-        try:
-            result = log_command(
-                ["docker-compose", "-f", compose_filename, "up", "-d"],
-                compose_dir
-            )
-            logger.info(f"Up completed: {result.stdout}")
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Up failed: {e.stderr}")
-            return jsonify({'status': 'error', 'message': f'Failed to start containers: {e.stderr}'})
+                logger.error(f"Down failed: {e.stderr}")
+                # Continue anyway, as some containers might not exist yet
+            
+            # Step 3: Start the containers
+            logger.info("Starting containers...")
+            try:
+                result = log_command(
+                    ["docker-compose", "-f", compose_filename, "up", "-d"],
+                    compose_dir
+                )
+                logger.info(f"Up completed: {result.stdout}")
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Up failed: {e.stderr}")
+                return {'status': 'error', 'message': f'Failed to start containers: {e.stderr}'}
+            
+            return {
+                'status': 'success',
+                'message': f'Successfully restarted containers for {project_name}'
+            }
         
-        return jsonify({
-            'status': 'success',
-            'message': f'Successfully restarted containers for {project_name}'
-        })
+        job = compose_jobs.submit('apply', restart, f'restart {project_name}', host='local', file=full_path)
+        return job_response(job, f'Queued restart of {project_name}')
         
     except Exception as e:
         logger.error(f"Failed to apply compose file: {e}", exc_info=True)
@@ -2549,20 +2760,8 @@ def apply_compose():
 @app.route('/api/env/files')
 def get_env_files():
     try:
-        env_files = []
-        search_dirs = [COMPOSE_DIR] + [d for d in EXTRA_COMPOSE_DIRS if d]
-        logger.info(f"Scanning for .env files in: {search_dirs}")
-        for search_dir in search_dirs:
-            if not os.path.exists(search_dir):
-                logger.warning(f"Search directory doesn't exist: {search_dir}")
-                continue
-            for root, dirs, files in os.walk(search_dir, topdown=True):
-                for file in files:
-                    if file == '.env':
-                        file_path = os.path.join(root, file)
-                        logger.info(f"Found .env file: {file_path}")
-                        env_files.append(file_path)
-        logger.info(f"Total .env files found: {len(env_files)}")
+        env_files = compose_index.env_files()
+        logger.debug(f"Total .env files found: {len(env_files)}")
         return jsonify({'files': env_files})
     except Exception as e:
         logger.error(f"Failed to find .env files: {e}")
@@ -2610,56 +2809,52 @@ def save_env_file():
 def get_images_multihost():
     """Get images from all connected hosts"""
     try:
-        all_images = []
         hosts_status = host_manager.get_hosts_status()
         
-        for host_name, status_info in hosts_status.items():
-            if status_info['connected']:
-                client = host_manager.get_client(host_name)
-                if client:
+        def collect_host_images(host_name, client):
+            status_info = hosts_status.get(host_name, {})
+            
+            # Map image id -> container names once per host instead of once per image
+            used_by_map = {}
+            try:
+                for record in host_manager.get_container_snapshot(host_name):
+                    used_by_map.setdefault(record['image_id'], []).append(record['name'])
+            except Exception as e:
+                logger.warning(f"Failed to get container usage for images on {host_name}: {e}")
+            
+            host_images = []
+            for image in client.images.list():
+                tags = image.tags
+                name = tags[0] if tags else '<none>:<none>'
+                size_mb = round(image.attrs['Size'] / (1024 * 1024), 2)
+                
+                # Handle timestamps
+                created_val = image.attrs['Created']
+                if isinstance(created_val, (int, float)):
+                    created = datetime.fromtimestamp(created_val).strftime('%Y-%m-%d %H:%M:%S')
+                else:
                     try:
-                        host_images = client.images.list()
-                        
-                        for image in host_images:
-                            tags = image.tags
-                            name = tags[0] if tags else '<none>:<none>'
-                            size_mb = round(image.attrs['Size'] / (1024 * 1024), 2)
-                            
-                            # Handle timestamps
-                            created_val = image.attrs['Created']
-                            if isinstance(created_val, (int, float)):
-                                created = datetime.fromtimestamp(created_val).strftime('%Y-%m-%d %H:%M:%S')
-                            else:
-                                try:
-                                    created_dt = datetime.strptime(created_val.split('.')[0], '%Y-%m-%dT%H:%M:%S')
-                                    created = created_dt.strftime('%Y-%m-%d %H:%M:%S')
-                                except (ValueError, TypeError):
-                                    created = 'Unknown'
-                            
-                            # Find containers using this image on this host
-                            used_by = []
-                            try:
-                                for container in client.containers.list(all=True):
-                                    if container.image.id == image.id:
-                                        used_by.append(f"{container.name}")
-                            except Exception as e:
-                                logger.warning(f"Failed to get container usage for image on {host_name}: {e}")
-                            
-                            all_images.append({
-                                'id': image.short_id,
-                                'name': name,
-                                'tags': tags,
-                                'size': size_mb,
-                                'created': created,
-                                'used_by': used_by,
-                                'host': host_name,
-                                'host_display': status_info.get('name', host_name)
-                            })
-                            
-                    except Exception as e:
-                        logger.error(f"Failed to get images from host {host_name}: {e}")
+                        created_dt = datetime.strptime(created_val.split('.')[0], '%Y-%m-%dT%H:%M:%S')
+                        created = created_dt.strftime('%Y-%m-%d %H:%M:%S')
+                    except (ValueError, TypeError):
+                        created = 'Unknown'
+                
+                host_images.append({
+                    'id': image.short_id,
+                    'name': name,
+                    'tags': tags,
+                    'size': size_mb,
+                    'created': created,
+                    'used_by': used_by_map.get(image.id, []),
+                    'host': host_name,
+                    'host_display': status_info.get('name', host_name)
+                })
+            return host_images
+        
+        host_results, host_report = host_manager.fan_out(collect_host_images, cache_key='list:images')
+        all_images = [i for rows in host_results.values() for i in rows]
         
-        return jsonify(all_images)
+        return fanout_response(all_images, host_report)
         
     except Exception as e:
         logger.error(f"Failed to get images from all hosts: {e}")
@@ -2668,20 +2863,20 @@ def get_images_multihost():
 def get_host_system_info(host):
     """Get system information for a specific host"""
     try:
-        client = host_manager.get_client(host)
-        if not client:
+        if not host_manager.get_client(host):
             return jsonify({'status': 'error', 'message': f'Host {host} not available'})
         
-        info = client.info()
-        containers = client.containers.list(all=True)
+        info = host_manager.get_daemon_info(host)
+        if not info:
+            return jsonify({'status': 'error', 'message': f'No system info available for {host}'})
         
         return jsonify({
             'status': 'success',
-            'total_containers': len(containers),
-            'running_containers': len([c for c in containers if c.status == 'running']),
-            'cpu_count': info.get('NCPU', 0),
-            'memory_total': round(info.get('MemTotal', 0) / (1024 * 1024), 2),
-            'docker_version': info.get('ServerVersion', 'unknown')
+            'total_containers': info.get('Containers') or 0,
+            'running_containers': info.get('ContainersRunning') or 0,
+            'cpu_count': info.get('NCPU') or 0,
+            'memory_total': round((info.get('MemTotal') or 0) / (1024 * 1024), 2),
+            'docker_version': info.get('ServerVersion') or 'unknown'
         })
         
     except Exception as e:
@@ -2705,48 +2900,48 @@ def get_multihost_system_overview():
         
         hosts_status = host_manager.get_hosts_status()
         
+        # Answered from the health checker's info cache; no Docker calls unless a
+        # connected host has never been described yet
+        host_results = {}
+        host_errors = {}
         for host_name, status in hosts_status.items():
-            if status['connected']:
-                client = host_manager.get_client(host_name)
-                if client:
-                    try:
-                        info = client.info()
-                        containers = len(client.containers.list(all=True))
-                        running = len(client.containers.list())
-                        images = len(client.images.list())
-                        
-                        host_stats = {
-                            'name': status.get('name', host_name),
-                            'connected': True,
-                            'containers': containers,
-                            'running': running,
-                            'images': images,
-                            'cpu_count': info.get('NCPU', 0),
-                            'memory_total': round(info.get('MemTotal', 0) / (1024 * 1024 * 1024), 2),
-                            'docker_version': info.get('ServerVersion', 'unknown')
-                        }
-                        
-                        # Add to totals
-                        totals['total_containers'] += containers
-                        totals['total_running'] += running
-                        totals['total_images'] += images
-                        totals['total_cpu_cores'] += host_stats['cpu_count']
-                        totals['total_memory_gb'] += host_stats['memory_total']
-                        totals['connected_hosts'] += 1
-                        
-                    except Exception as e:
-                        logger.error(f"Failed to get stats for host {host_name}: {e}")
-                        host_stats = {
-                            'name': status.get('name', host_name),
-                            'connected': False,
-                            'error': str(e)
-                        }
-                else:
-                    host_stats = {
-                        'name': status.get('name', host_name),
-                        'connected': False,
-                        'error': 'Client not available'
-                    }
+            if not status.get('connected'):
+                continue
+            try:
+                info = host_manager.get_daemon_info(host_name)
+            except Exception as e:
+                host_errors[host_name] = str(e)
+                continue
+            if not info:
+                continue
+            host_results[host_name] = {
+                'name': status.get('name', host_name),
+                'connected': True,
+                'containers': info.get('Containers') or 0,
+                'running': info.get('ContainersRunning') or 0,
+                'images': info.get('Images') or 0,
+                'cpu_count': info.get('NCPU') or 0,
+                'memory_total': round((info.get('MemTotal') or 0) / (1024 * 1024 * 1024), 2),
+                'docker_version': info.get('ServerVersion') or 'unknown'
+            }
+        
+        for host_name, status in hosts_status.items():
+            if host_name in host_results:
+                host_stats = host_results[host_name]
+                
+                # Add to totals
+                totals['total_containers'] += host_stats['containers']
+                totals['total_running'] += host_stats['running']
+                totals['total_images'] += host_stats['images']
+                totals['total_cpu_cores'] += host_stats['cpu_count']
+                totals['total_memory_gb'] += host_stats['memory_total']
+                totals['connected_hosts'] += 1
+            elif host_name in host_errors:
+                host_stats = {
+                    'name': status.get('name', host_name),
+                    'connected': False,
+                    'error': host_errors[host_name]
+                }
             else:
                 host_stats = {
                     'name': status.get('name', host_name),
@@ -2937,46 +3132,47 @@ def save_caddy_file():
 @app.route('/api/volumes')
 def get_volumes():
     try:
-        all_volumes = []
         hosts_status = host_manager.get_hosts_status()
         
-        for host_name, status_info in hosts_status.items():
-            if status_info['connected']:
-                client = host_manager.get_client(host_name)
-                if client:
-                    try:
-                        for volume in client.volumes.list():
-                            volume_data = volume.attrs
-                            
-                            # Check which containers are using this volume on this host
-                            containers_using = []
-                            try:
-                                for container in client.containers.list(all=True):
-                                    mounts = container.attrs.get('Mounts', [])
-                                    for mount in mounts:
-                                        if mount.get('Name') == volume.name:
-                                            containers_using.append(container.name)
-                                            break
-                            except Exception as e:
-                                logger.warning(f"Failed to get container usage for volume on {host_name}: {e}")
-                            
-                            all_volumes.append({
-                                'name': volume.name,
-                                'driver': volume_data.get('Driver', 'unknown'),
-                                'created': volume_data.get('CreatedAt', 'unknown'),
-                                'mountpoint': volume_data.get('Mountpoint', ''),
-                                'scope': volume_data.get('Scope', 'local'),
-                                'labels': volume_data.get('Labels', {}),
-                                'in_use': len(containers_using) > 0,
-                                'containers': containers_using,
-                                'host': host_name,
-                                'host_display': status_info.get('name', host_name)
-                            })
-                    except Exception as e:
-                        logger.error(f"Failed to get volumes from host {host_name}: {e}")
+        def collect_host_volumes(host_name, client):
+            status_info = hosts_status.get(host_name, {})
+            
+            # Check which containers are using each volume on this host
+            volume_users = {}
+            try:
+                for record in host_manager.get_container_snapshot(host_name):
+                    for mount in record['attrs'].get('Mounts', []):
+                        if mount.get('Name'):
+                            users = volume_users.setdefault(mount['Name'], [])
+                            if record['name'] not in users:
+                                users.append(record['name'])
+            except Exception as e:
+                logger.warning(f"Failed to get container usage for volumes on {host_name}: {e}")
+            
+            host_volumes = []
+            for volume in client.volumes.list():
+                volume_data = volume.attrs
+                containers_using = volume_users.get(volume.name, [])
+                
+                host_volumes.append({
+                    'name': volume.name,
+                    'driver': volume_data.get('Driver', 'unknown'),
+                    'created': volume_data.get('CreatedAt', 'unknown'),
+                    'mountpoint': volume_data.get('Mountpoint', ''),
+                    'scope': volume_data.get('Scope', 'local'),
+                    'labels': volume_data.get('Labels', {}),
+                    'in_use': len(containers_using) > 0,
+                    'containers': containers_using,
+                    'host': host_name,
+                    'host_display': status_info.get('name', host_name)
+                })
+            return host_volumes
+        
+        host_results, host_report = host_manager.fan_out(collect_host_volumes, cache_key='list:volumes')
+        all_volumes = [v for rows in host_results.values() for v in rows]
         
         logger.debug(f"Returning {len(all_volumes)} volumes from all hosts")
-        return jsonify(all_volumes)
+        return fanout_response(all_volumes, host_report)
     
     except Exception as e:
         logger.error(f"Failed to list volumes from all hosts: {e}", exc_info=True)
@@ -3056,16 +3252,13 @@ def create_compose_project_multihost():
             # Optionally deploy to target host after creation
             if data.get('auto_deploy', False) and target_host != 'local':
                 compose_file = result['compose_file']
-                deploy_result = execute_compose_on_host(
-                    os.path.join(COMPOSE_DIR, compose_file), 
-                    target_host, 
-                    'up'
+                full_path = os.path.join(COMPOSE_DIR, compose_file)
+                job = compose_jobs.submit(
+                    'create-deploy', lambda job: execute_compose_on_host(job, full_path, target_host, 'up'),
+                    f'up {compose_file} on {target_host}', host=target_host, file=full_path
                 )
-                
-                if deploy_result['success']:
-                    result['message'] += f' and deployed to {target_host}'
-                else:
-                    result['message'] += f' but deployment to {target_host} failed: {deploy_result["message"]}'
+                result['message'] += f', deployment to {target_host} queued'
+                result['job_id'] = job.id
             
             return jsonify(result)
         else:
@@ -3139,46 +3332,45 @@ def create_project_locally(data):
 @app.route('/api/networks')
 def get_networks():
     try:
-        all_networks = []
         hosts_status = host_manager.get_hosts_status()
         
-        for host_name, status_info in hosts_status.items():
-            if status_info['connected']:
-                client = host_manager.get_client(host_name)
-                if client:
-                    try:
-                        for network in client.networks.list():
-                            network_data = network.attrs
-                            
-                            # Get containers in this network
-                            containers_in_network = []
-                            for container_id, container_info in network_data.get('Containers', {}).items():
-                                containers_in_network.append(container_info.get('Name', 'unknown'))
-                            
-                            # Get subnet if available
-                            ipam_config = network_data.get('IPAM', {}).get('Config', [])
-                            subnet = ipam_config[0].get('Subnet', 'N/A') if ipam_config else 'N/A'
-                            
-                            all_networks.append({
-                                'id': network.short_id,
-                                'name': network.name,
-                                'driver': network_data.get('Driver', 'unknown'),
-                                'scope': network_data.get('Scope', 'local'),
-                                'internal': network_data.get('Internal', False),
-                                'external': network_data.get('External', False),
-                                'attachable': network_data.get('Attachable', False),
-                                'created': network_data.get('Created', 'unknown'),
-                                'subnet': subnet,
-                                'containers': containers_in_network,
-                                'labels': network_data.get('Labels', {}),
-                                'host': host_name,
-                                'host_display': status_info.get('name', host_name)
-                            })
-                    except Exception as e:
-                        logger.error(f"Failed to get networks from host {host_name}: {e}")
+        def collect_host_networks(host_name, client):
+            status_info = hosts_status.get(host_name, {})
+            host_networks = []
+            for network in client.networks.list():
+                network_data = network.attrs
+                
+                # Get containers in this network
+                containers_in_network = []
+                for container_id, container_info in network_data.get('Containers', {}).items():
+                    containers_in_network.append(container_info.get('Name', 'unknown'))
+                
+                # Get subnet if available
+                ipam_config = network_data.get('IPAM', {}).get('Config', [])
+                subnet = ipam_config[0].get('Subnet', 'N/A') if ipam_config else 'N/A'
+                
+                host_networks.append({
+                    'id': network.short_id,
+                    'name': network.name,
+                    'driver': network_data.get('Driver', 'unknown'),
+                    'scope': network_data.get('Scope', 'local'),
+                    'internal': network_data.get('Internal', False),
+                    'external': network_data.get('External', False),
+                    'attachable': network_data.get('Attachable', False),
+                    'created': network_data.get('Created', 'unknown'),
+                    'subnet': subnet,
+                    'containers': containers_in_network,
+                    'labels': network_data.get('Labels', {}),
+                    'host': host_name,
+                    'host_display': status_info.get('name', host_name)
+                })
+            return host_networks
+        
+        host_results, host_report = host_manager.fan_out(collect_host_networks, cache_key='list:networks')
+        all_networks = [n for rows in host_results.values() for n in rows]
         
         logger.debug(f"Returning {len(all_networks)} networks from all hosts")
-        return jsonify(all_networks)
+        return fanout_response(all_networks, host_report)
     
     except Exception as e:
         logger.error(f"Failed to list networks from all hosts: {e}", exc_info=True)
@@ -3279,35 +3471,35 @@ def stop_compose():
         env = os.environ.copy()
         
         # Check if the compose file has a "name:" property
-        with open(full_path, 'r') as f:
-            import yaml
-            compose_data = yaml.safe_load(f)
-            project_name = compose_data.get('name', os.path.basename(compose_dir))
+        compose_data = load_compose(full_path)
+        project_name = compose_data.get('name', os.path.basename(compose_dir))
         
         env["COMPOSE_PROJECT_NAME"] = project_name
         logger.info(f"Using project name: {project_name}")
         
-        # Stop the containers
-        logger.info("Stopping containers...")
-        try:
-            result = subprocess.run(
-                ["docker-compose", "-f", compose_filename, "down"],
-                check=True,
-                cwd=compose_dir,
-                env=env,
-                text=True,
-                capture_output=True
-            )
-            logger.info(f"Down completed: {result.stdout}")
-            
-            return jsonify({
-                'status': 'success',
-                'message': f'Successfully stopped containers for {project_name}'
-            })
-            
-        except subprocess.CalledProcessError as e:
-            logger.error(f"Down failed: {e.stderr}")
-            return jsonify({'status': 'error', 'message': f'Failed to stop containers: {e.stderr}'})
+        def stop(job):
+            # Stop the containers
+            logger.info("Stopping containers...")
+            try:
+                result = job.run(
+                    ["docker-compose", "-f", compose_filename, "down"],
+                    cwd=compose_dir,
+                    env=env,
+                    check=True
+                )
+                logger.info(f"Down completed: {result.stdout}")
+                
+                return {
+                    'status': 'success',
+                    'message': f'Successfully stopped containers for {project_name}'
+                }
+                
+            except subprocess.CalledProcessError as e:
+                logger.error(f"Down failed: {e.stderr}")
+                return {'status': 'error', 'message': f'Failed to stop containers: {e.stderr}'}
+        
+        job = compose_jobs.submit('stop', stop, f'stop {project_name}', host='local', file=full_path)
+        return job_response(job, f'Queued stop of {project_name}')
         
     except Exception as e:
         logger.error(f"Failed to stop compose file: {e}", exc_info=True)
@@ -3580,10 +3772,7 @@ def extract_env_from_content():
 def extract_env_from_compose(compose_file_path, modify_compose=False, logger=None):
     """Extract environment variables from a docker-compose file"""
     try:
-        import yaml
-        
-        with open(compose_file_path, 'r') as f:
-            compose_data = yaml.safe_load(f)
+        compose_data = load_compose(compose_file_path)
         
         if not compose_data or 'services' not in compose_data:
             return None, False
@@ -3647,7 +3836,8 @@ def extract_env_from_compose(compose_file_path, modify_compose=False, logger=Non
         # Save modified compose file if requested
         if modify_compose and compose_modified:
             with open(compose_file_path, 'w') as f:
-                yaml.dump(compose_data, f, default_flow_style=False)
+                safe_dump(compose_data, f, default_flow_style=False)
+            compose_cache.invalidate(compose_file_path)
         
         return '\n'.join(env_vars), compose_modified
         
@@ -3908,25 +4098,31 @@ def update_container():
         
         logger.info(f"Updating container {container_id} on {host} to tag {target_tag}")
         
-        result = container_update_manager.update_container(
-            container_id=container_id,
-            host=host,
-            target_tag=target_tag,
-            host_manager=host_manager
-        )
-        
-        if result['success']:
-            return jsonify({
-                'status': 'success',
-                'message': result['message'],
-                'details': result
-            })
-        else:
-            return jsonify({
+        def update(job):
+            result = container_update_manager.update_container(
+                container_id=container_id,
+                host=host,
+                target_tag=target_tag,
+                host_manager=host_manager,
+                job=job
+            )
+            
+            if result['success']:
+                return {
+                    'status': 'success',
+                    'message': result['message'],
+                    'details': result
+                }
+            return {
                 'status': 'error',
                 'message': result['error'],
                 'details': result
-            })
+            }
+        
+        # The update rewrites and redeploys the compose file, so it queues on it like any compose job
+        job = compose_jobs.submit('update', update, f'update {container_id} on {host} to {target_tag}',
+                                  host=host, file=container_compose_file(host, container_id))
+        return job_response(job, f'Queued update of {container_id} to {target_tag}')
             
     except Exception as e:
         logger.error(f"Container update failed: {e}")
@@ -3948,61 +4144,68 @@ def batch_update_containers():
                 'message': 'No updates specified'
             })
         
-        results = {
-            'successful': 0,
-            'failed': 0,
-            'details': []
-        }
+        def batch(job):
+            results = {
+                'successful': 0,
+                'failed': 0,
+                'details': []
+            }
         
-        for update in updates:
-            container_id = update.get('container_id')
-            host = update.get('host', 'local')
-            target_tag = update.get('target_tag')
+            for update in updates:
+                container_id = update.get('container_id')
+                host = update.get('host', 'local')
+                target_tag = update.get('target_tag')
             
-            if not container_id or not target_tag:
-                results['failed'] += 1
-                results['details'].append({
-                    'container_id': container_id,
-                    'success': False,
-                    'error': 'Missing container_id or target_tag'
-                })
-                continue
+                if not container_id or not target_tag:
+                    results['failed'] += 1
+                    results['details'].append({
+                        'container_id': container_id,
+                        'success': False,
+                        'error': 'Missing container_id or target_tag'
+                    })
+                    continue
             
-            try:
-                result = container_update_manager.update_container(
-                    container_id=container_id,
-                    host=host,
-                    target_tag=target_tag,
-                    host_manager=host_manager
-                )
+                try:
+                    job.log(f"Updating {container_id} on {host} to {target_tag}")
+                    with compose_jobs.hold_file(job, container_compose_file(host, container_id)):
+                        result = container_update_manager.update_container(
+                            container_id=container_id,
+                            host=host,
+                            target_tag=target_tag,
+                            host_manager=host_manager,
+                            job=job
+                        )
                 
-                if result['success']:
-                    results['successful'] += 1
-                else:
-                    results['failed'] += 1
+                    if result['success']:
+                        results['successful'] += 1
+                    else:
+                        results['failed'] += 1
                 
-                results['details'].append({
-                    'container_id': container_id,
-                    'host': host,
-                    'target_tag': target_tag,
-                    'success': result['success'],
-                    'message': result.get('message', result.get('error', '')),
-                    **result
-                })
+                    results['details'].append({
+                        'container_id': container_id,
+                        'host': host,
+                        'target_tag': target_tag,
+                        'success': result['success'],
+                        'message': result.get('message', result.get('error', '')),
+                        **result
+                    })
                 
-            except Exception as e:
-                results['failed'] += 1
-                results['details'].append({
-                    'container_id': container_id,
-                    'success': False,
-                    'error': str(e)
-                })
+                except Exception as e:
+                    results['failed'] += 1
+                    results['details'].append({
+                        'container_id': container_id,
+                        'success': False,
+                        'error': str(e)
+                    })
+            
+            return {
+                'status': 'success',
+                'message': f'Batch update completed: {results["successful"]} successful, {results["failed"]} failed',
+                'results': results
+            }
         
-        return jsonify({
-            'status': 'success',
-            'message': f'Batch update completed: {results["successful"]} successful, {results["failed"]} failed',
-            'results': results
-        })
+        job = compose_jobs.submit('batch-update', batch, f'update {len(updates)} containers')
+        return job_response(job, f'Queued update of {len(updates)} containers')
         
     except Exception as e:
         logger.error(f"Batch update failed: {e}")
@@ -4245,10 +4448,29 @@ def trigger_auto_maintenance():
 def start_container_update_checker():
     """Start background thread for periodic container update checks"""
     
-    
+    last_seen_results = [0]
+
+    def follow_leader_results():
+        """Pass results saved by the leader on to this worker's listeners"""
+        try:
+            mtime = os.stat(container_update_manager.update_cache_file).st_mtime
+        except FileNotFoundError:
+            return
+        if last_seen_results[0] and mtime != last_seen_results[0]:
+            container_update_manager.notify_listeners(container_update_manager.load_update_cache())
+        last_seen_results[0] = mtime
+
     def update_checker_worker():
         while True:
             try:
+                if not host_manager.leader.is_leader():
+                    # Registry checks and auto-maintenance run in the leader process only
+                    follow_leader_results()
+                    time.sleep(60)
+                    continue
+
+                # Settings may have been changed through another worker
+                container_update_manager.settings = container_update_manager.load_settings()
                 settings = container_update_manager.settings
                 
                 if not settings['auto_check_enabled']:
@@ -4297,6 +4519,19 @@ def start_container_update_checker():
 # Call this after your app initialization
 start_container_update_checker()
 
+if STATS_ENABLED:
+    # Sampling runs in the leader (starting now if this worker already is); other workers read its results
+    host_manager.leader.add_listener(stats_collector.start)
+
+threading.Thread(target=relay_shared_events, name='event-relay', daemon=True).start()
+
+# The compose index is watched by the leader and shared with the other workers. The listener
+# goes first, so leadership won at any point starts the watcher
+host_manager.leader.add_listener(compose_index.start)
+if not host_manager.leader.is_leader():
+    # Load the saved catalog now, so even the first request is answered from it
+    compose_index.follow()
+
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5003, debug=False)
\ No newline at end of file
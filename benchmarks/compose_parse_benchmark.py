@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""Compose parse/dump benchmark: pure-Python PyYAML against libyaml.
+
+Parses every compose file under the given directories (default: $COMPOSE_DIR)
+the way validate_compose_file does, and dumps a document shaped like
+generate_backup_compose output. Without a corpus on disk a synthetic one is
+generated: anchor-heavy compose files with many services.
+
+    python benchmarks/compose_parse_benchmark.py [DIR ...] [--services 200] [--repeat 5]
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compose_index import ComposeScanner  # noqa: E402
+from compose_yaml import ComposeLoader, ComposeDumper, LIBYAML  # noqa: E402
+
+
+def synthetic_compose(services):
+    lines = [
+        "x-common: &common",
+        "  restart: unless-stopped",
+        "  logging:",
+        "    driver: json-file",
+        "    options: {max-size: 10m, max-file: '3'}",
+        "  environment: &env",
+        "    TZ: Etc/UTC",
+        "    PUID: '1000'",
+        "    PGID: '1000'",
+        "services:",
+    ]
+    for i in range(services):
+        lines += [
+            f"  app{i}:",
+            "    <<: *common",
+            f"    image: ghcr.io/example/app{i}:1.{i}.0",
+            f"    container_name: app{i}",
+            "    environment:",
+            "      <<: *env",
+            f"      APP_PORT: '{8000 + i}'",
+            "    ports:",
+            f"      - \"{10000 + i}:{8000 + i}\"",
+            "    volumes:",
+            f"      - ./data/app{i}:/data",
+            "      - /etc/localtime:/etc/localtime:ro",
+            "    labels:",
+            f"      - traefik.http.routers.app{i}.rule=Host(`app{i}.example.com`)",
+            "    depends_on: [db]",
+        ]
+    lines += ["  db:", "    <<: *common", "    image: postgres:16", "volumes:", "  data: {}"]
+    return "\n".join(lines) + "\n"
+
+
+def backup_compose(services):
+    """Document shaped like generate_backup_compose output"""
+    return {
+        'version': '3.8',
+        'services': {
+            f"app{i}": {
+                'image': f"ghcr.io/example/app{i}:1.{i}.0",
+                'container_name': f"app{i}",
+                'restart': 'unless-stopped',
+                'environment': [f"VAR{j}=value{j}" for j in range(15)],
+                'ports': [f"{10000 + i}:{8000 + i}"],
+                'volumes': [f"/srv/app{i}:/data", '/etc/localtime:/etc/localtime:ro'],
+                'labels': [f"composr.backup.original-name=app{i}", 'composr.backup.status=running'],
+                'networks': ['default'],
+            }
+            for i in range(services)
+        },
+        'networks': {'default': {'external': True, 'name': 'proxy'}},
+    }
+
+
+def best_of(repeat, func):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('dirs', nargs='*', help='directories with compose files')
+    parser.add_argument('--services', type=int, default=200, help='services in synthetic documents')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    dirs = args.dirs or [d for d in [os.environ.get('COMPOSE_DIR')] if d and os.path.isdir(d)]
+    catalog = ComposeScanner().scan(dirs)[0] if dirs else {}
+    paths = sorted(p for p, e in catalog.items() if e['kind'] == 'compose')
+    tmp = None
+    if not paths:
+        tmp = tempfile.NamedTemporaryFile('w', suffix='.yml', delete=False)
+        tmp.write(synthetic_compose(args.services))
+        tmp.close()
+        paths = [tmp.name]
+        print(f"No compose corpus given, using a synthetic file with {args.services} services")
+    texts = [open(p).read() for p in paths]
+    print(f"Corpus: {len(paths)} files, {sum(len(t) for t in texts) / 1024:.0f} KiB; libyaml available: {LIBYAML}")
+
+    loaders = [('yaml.SafeLoader', yaml.SafeLoader), ('ComposeLoader', ComposeLoader)]
+    for label, loader in loaders:
+        ms = best_of(args.repeat, lambda: [yaml.load(t, Loader=loader) for t in texts])
+        print(f"parse   {label:<18} {ms:9.1f} ms")
+
+    document = backup_compose(args.services)
+    dumpers = [('yaml.Dumper', yaml.Dumper), ('ComposeDumper', ComposeDumper)]
+    for label, dumper in dumpers:
+        ms = best_of(args.repeat, lambda: yaml.dump(document, Dumper=dumper, default_flow_style=False, sort_keys=False))
+        print(f"dump    {label:<18} {ms:9.1f} ms  (backup compose, {args.services} services)")
+
+    if tmp is not None:
+        os.unlink(tmp.name)
+
+
+if __name__ == '__main__':
+    main()
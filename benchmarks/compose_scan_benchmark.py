@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""Compose discovery benchmark on a synthetic tree.
+
+Builds PROJECTS project folders, each with a compose file, a .env file and a
+data tree (think Postgres data dirs, media libraries, node_modules), for
+about 100k directories in total. It then times the old os.walk discovery
+against ComposeScanner in its different modes.
+
+    python benchmarks/compose_scan_benchmark.py [--dirs 100000] [--keep PATH]
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from compose_index import ComposeScanner, COMPOSE_FILENAMES  # noqa: E402
+
+PROJECTS = 200
+
+
+def build_tree(root, total_dirs):
+    """PROJECTS projects whose data trees share total_dirs directories"""
+    per_project = max(1, total_dirs // PROJECTS)
+    fanout = 10
+    for p in range(PROJECTS):
+        project = os.path.join(root, f"project{p:03d}")
+        os.makedirs(project)
+        with open(os.path.join(project, 'docker-compose.yml'), 'w') as f:
+            f.write(f"services:\n  app{p}:\n    image: nginx:latest\n")
+        with open(os.path.join(project, '.env'), 'w') as f:
+            f.write("TZ=UTC\n")
+        # Breadth-first data tree: data/0, data/0/0, ... until per_project dirs exist
+        queue = [os.path.join(project, 'node_modules' if p % 10 == 0 else 'data')]
+        created = 0
+        while queue and created < per_project:
+            path = queue.pop(0)
+            os.makedirs(path, exist_ok=True)
+            created += 1
+            queue.extend(os.path.join(path, str(i)) for i in range(fanout))
+
+
+def os_walk_compose_files(root):
+    """The os.walk discovery functions.py used before ComposeScanner"""
+    found = []
+    for current, dirs, files in os.walk(root, topdown=True):
+        dirs[:] = [d for d in dirs if not d.startswith('.')]
+        for name in files:
+            if name in COMPOSE_FILENAMES:
+                found.append(os.path.relpath(os.path.join(current, name), root).replace(os.sep, '/'))
+    return sorted(found)
+
+
+def compose_count(scanner, root):
+    catalog, _ = scanner.scan([root])
+    return sum(1 for e in catalog.values() if e['kind'] == 'compose')
+
+
+def timed(label, func, repeat=3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<44} {best * 1000:9.1f} ms  {result} compose files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--dirs', type=int, default=100000, help='directories to create')
+    parser.add_argument('--keep', help='build (or reuse) the tree at this path and keep it')
+    args = parser.parse_args()
+
+    root = args.keep or tempfile.mkdtemp(prefix='composr-scan-')
+    if not os.path.exists(os.path.join(root, 'project000')):
+        start = time.perf_counter()
+        build_tree(root, args.dirs)
+        print(f"Built synthetic tree in {root} ({time.perf_counter() - start:.1f}s)")
+
+    try:
+        timed('os.walk (old get_compose_files)', lambda: len(os_walk_compose_files(root)))
+        timed('scandir, 1 worker, no ignore globs', lambda: compose_count(ComposeScanner(ignore=[], workers=1), root))
+        timed('scandir, 8 workers, no ignore globs', lambda: compose_count(ComposeScanner(ignore=[], workers=8), root))
+        timed('scandir, 8 workers, ignore node_modules',
+              lambda: compose_count(ComposeScanner(ignore=['node_modules'], workers=8), root))
+        timed('scandir, 8 workers, max depth 2',
+              lambda: compose_count(ComposeScanner(max_depth=2, workers=8), root))
+        timed('scandir, 8 workers, stop at compose',
+              lambda: compose_count(ComposeScanner(stop_at_compose=True, workers=8), root))
+    finally:
+        if not args.keep:
+            shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,26 @@
+# call_context.py - Per-thread markers for the Docker API calls a thread makes
+
+import threading
+from contextlib import contextmanager
+
+_call_context = threading.local()
+
+
+@contextmanager
+def background_calls():
+    """Mark the Docker API calls this thread makes as background work.
+
+    Background calls (stats sampling) only get the slots of a host's bulkhead
+    that are not reserved for interactive requests.
+    """
+    previous = getattr(_call_context, 'background', False)
+    _call_context.background = True
+    try:
+        yield
+    finally:
+        _call_context.background = previous
+
+
+def is_background_call():
+    """True inside background_calls() on this thread"""
+    return getattr(_call_context, 'background', False)
@@ -0,0 +1,908 @@
+# compose_index.py - Watcher-maintained catalog of compose and .env files
+
+import os
+import json
+import gzip
+import time
+import errno
+import ctypes
+import ctypes.util
+import select
+import struct
+import re
+import fnmatch
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from compose_yaml import load_compose
+
+logger = logging.getLogger(__name__)
+
+COMPOSE_FILENAMES = ('docker-compose.yml', 'docker-compose.yaml', 'compose.yml', 'compose.yaml')
+ENV_FILENAME = '.env'
+COMPOSE_RESCAN_INTERVAL = float(os.environ.get('COMPOSE_RESCAN_INTERVAL', '600'))  # seconds, with inotify
+COMPOSE_POLL_INTERVAL = float(os.environ.get('COMPOSE_POLL_INTERVAL', '30'))  # seconds, without inotify
+COMPOSE_SCAN_IGNORE = [g.strip() for g in os.environ.get(
+    'COMPOSE_SCAN_IGNORE', 'node_modules,__pycache__,venv').split(',') if g.strip()]
+COMPOSE_SCAN_MAX_DEPTH = int(os.environ.get('COMPOSE_SCAN_MAX_DEPTH', '0'))  # 0 = unlimited
+COMPOSE_SCAN_STOP_AT_COMPOSE = os.environ.get('COMPOSE_SCAN_STOP_AT_COMPOSE', 'false').lower() == 'true'
+COMPOSE_SCAN_WORKERS = int(os.environ.get('COMPOSE_SCAN_WORKERS', '8'))
+INDEX_SYNC_INTERVAL = 1  # seconds between followers' looks at the shared index version
+INDEX_WAIT = 30  # seconds a follower waits for the leader's first scan before scanning itself
+SERVICE_REBUILD_INTERVAL = 30  # seconds between rebuilds forced by lookups that missed
+SERVICE_LABEL_CACHE = 1024  # (host, project, service) lookups remembered
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_INTERVAL = 30  # seconds between catalog snapshot writes while it keeps changing
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+FILE_WATCH_MASK = IN_CLOSE_WRITE  # on each catalogued file, to keep its size and mtime current
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len
+
+
+class Inotify:
+    """Minimal inotify binding through libc; raises OSError where unsupported"""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not available')
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def add_watch(self, path, mask=WATCH_MASK):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def read(self, timeout):
+        """[(wd, mask, name)] available within timeout seconds"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        events = []
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, mask, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+
+class ComposeScanner:
+    """Finds compose and .env files with os.scandir, pruning as it goes.
+
+    Dot-dirs and directories matching an ignore glob (against the name or the
+    path relative to the root) are skipped, descent stops at max_depth levels
+    below a root, and in stop_at_compose mode a directory holding a compose
+    file is treated as a project whose subdirectories (volumes, data, media)
+    are not searched (a compose file directly in a root does not count).
+    The subdirectories of each root are scanned on a thread pool; scandir
+    releases the GIL, which pays off on slow or network mounts.
+    """
+
+    def __init__(self, ignore=None, max_depth=None, stop_at_compose=None, workers=None):
+        self.ignore = COMPOSE_SCAN_IGNORE if ignore is None else list(ignore)
+        self.max_depth = COMPOSE_SCAN_MAX_DEPTH if max_depth is None else max_depth
+        self.stop_at_compose = COMPOSE_SCAN_STOP_AT_COMPOSE if stop_at_compose is None else stop_at_compose
+        self.workers = COMPOSE_SCAN_WORKERS if workers is None else workers
+        # One regex per kind; globs with a slash match the relative path, others the name
+        name_globs = [g for g in self.ignore if '/' not in g]
+        path_globs = [g.strip('/') for g in self.ignore if '/' in g]
+        self._name_re = re.compile('|'.join(fnmatch.translate(g) for g in name_globs)) if name_globs else None
+        self._path_re = re.compile('|'.join(fnmatch.translate(g) for g in path_globs)) if path_globs else None
+
+    def is_ignored(self, name, rel_path):
+        if name.startswith('.'):
+            return True
+        if self._name_re is not None and self._name_re.match(name):
+            return True
+        return self._path_re is not None and self._path_re.match(rel_path) is not None
+
+    def should_descend(self, path, root):
+        """Whether a directory that appears under root belongs in the scan"""
+        rel = os.path.relpath(path, root)
+        if rel == '.':
+            return True
+        if rel.startswith('..'):
+            return False
+        parts = rel.split(os.sep)
+        if self.max_depth and len(parts) > self.max_depth:
+            return False
+        for i, name in enumerate(parts):
+            if self.is_ignored(name, '/'.join(parts[:i + 1])):
+                return False
+        if self.stop_at_compose:
+            # Inside a project found higher up (roots themselves never count)
+            parent = os.path.dirname(path)
+            while parent != root and parent.startswith(root + os.sep):
+                if any(os.path.exists(os.path.join(parent, n)) for n in COMPOSE_FILENAMES):
+                    return False
+                parent = os.path.dirname(parent)
+        return True
+
+    def _scan_dir(self, path, root, depth, catalog):
+        """Scan one directory into catalog; returns the subdirectories to descend into"""
+        try:
+            entries = list(os.scandir(path))
+        except OSError:
+            return []
+        subdirs = []
+        found_compose = False
+        prefix = len(root) + 1
+        for entry in entries:
+            name = entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if name[0] == '.' or (self._name_re is not None and self._name_re.match(name)):
+                        continue
+                    if self._path_re is not None and self._path_re.match(entry.path[prefix:].replace(os.sep, '/')):
+                        continue
+                    subdirs.append(entry.path)
+                    continue
+                kind = file_kind(name)
+                if kind is None or not entry.is_file():
+                    continue
+                # Same pass: the stat is only paid for the files we catalogue
+                st = entry.stat()
+                catalog[entry.path] = {'kind': kind, 'size': st.st_size, 'mtime': st.st_mtime}
+                found_compose = found_compose or kind == 'compose'
+            except OSError:
+                continue
+        if found_compose and self.stop_at_compose and depth > 0:
+            return []
+        if self.max_depth and depth >= self.max_depth:
+            return []
+        return subdirs
+
+    def scan_tree(self, path, root=None, depth=0):
+        """Scan path (depth levels below root); returns (catalog, directories)"""
+        root = root or path
+        catalog, dirs = {}, []
+        stack = [(path, depth)]
+        while stack:
+            current, level = stack.pop()
+            dirs.append(current)
+            for subdir in self._scan_dir(current, root, level, catalog):
+                stack.append((subdir, level + 1))
+        return catalog, dirs
+
+    def scan(self, roots):
+        """Scan every root, fanning their top-level subdirectories out to the pool.
+
+        Returns (catalog, directories), the catalog mapping each absolute
+        path to {'kind': 'compose' | 'env', 'size', 'mtime'}.
+        """
+        catalog, dirs = {}, []
+        tasks = []
+        for root in roots:
+            subdirs = self._scan_dir(root, root, 0, catalog)
+            dirs.append(root)
+            tasks.extend((subdir, root) for subdir in subdirs)
+        if not tasks:
+            return catalog, dirs
+        with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(tasks))),
+                                thread_name_prefix='compose-scan') as pool:
+            for c, d in pool.map(lambda task: self.scan_tree(task[0], task[1], 1), tasks):
+                catalog.update(c)
+                dirs.extend(d)
+        return catalog, dirs
+
+    def relative_compose_files(self, roots, base_dir):
+        """One-off scan: sorted compose paths relative to base_dir"""
+        catalog, _ = self.scan([r for r in roots if r and os.path.isdir(r)])
+        return relative_paths([p for p, e in catalog.items() if e['kind'] == 'compose'], base_dir)
+
+
+def file_kind(name):
+    """'compose', 'env' or None for a file name"""
+    if name in COMPOSE_FILENAMES:
+        return 'compose'
+    if name == ENV_FILENAME:
+        return 'env'
+    return None
+
+
+def catalog_entry(path, kind):
+    """Catalog record for path, or None if it is gone"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return {'kind': kind, 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def relative_paths(paths, base_dir):
+    """Sorted '/'-separated paths relative to base_dir"""
+    result = []
+    for path in paths:
+        try:
+            result.append(os.path.relpath(path, base_dir).replace(os.sep, '/'))
+        except ValueError:
+            continue
+    return sorted(result)
+
+
+class ComposeIndex:
+    """Catalog of the compose and .env files under the compose directories, kept current.
+
+    One crawl records every file with its kind, size and mtime; the compose
+    list, the .env list and backups are all answered from it. The leader
+    scans once, then follows changes with inotify (one watch per directory
+    plus one per catalogued file for rewrites) and rescans every
+    COMPOSE_RESCAN_INTERVAL as a safety net, or every COMPOSE_POLL_INTERVAL
+    where inotify is unavailable or out of watches. Each change publishes
+    the catalog, with the parsed service summaries, to the shared cache;
+    the other workers pick it up by version, so queries never walk the
+    filesystem or parse a compose file. Nor do they wait for a scan: until
+    the first scan or snapshot is in, the catalog is empty.
+
+    With a snapshot_path the catalog, the directory mtimes and the parsed
+    service summaries are also saved to disk. After a restart the snapshot
+    is served straight away and checked in the background: only the
+    directories whose mtime moved are listed again.
+    """
+
+    def __init__(self, roots, base_dir, shared_cache=None, snapshot_path=None):
+        self.roots = [os.path.abspath(r) for r in roots if r]
+        self.base_dir = base_dir
+        self.shared_cache = shared_cache
+        self.snapshot_path = snapshot_path
+        self._catalog = {}  # absolute path -> {'kind', 'size', 'mtime'}
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._version = 0
+        self._lists = None  # (compose relative paths, env paths, catalog), rebuilt after a change
+        self._synced_at = 0
+        self._thread = None
+        self._follow_thread = None  # follower: snapshot load and fallback scan, see follow()
+        self._dirs = set()  # directories covered by the catalog
+        self._summaries = {}  # compose path -> (mtime, size, project, [services])
+        self._dirty = False  # catalog changed since the last snapshot
+        self._snapshot_checked = False
+        self._inotify = None
+        self._watches = {}  # wd -> directory
+        self._watched = {}  # directory -> wd
+        self._file_watches = {}  # wd -> catalogued file
+        self._watch_exhausted = False
+        self._rescan = threading.Event()  # full scan asked of the watcher thread
+        self._rescan_seen = None  # last rescan request forwarded through the shared cache
+        self.scanner = ComposeScanner()
+
+    def start(self):
+        """Scan and start following changes in this process"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, name='compose-index', daemon=True)
+        self._thread.start()
+
+    @property
+    def version(self):
+        return self._version
+
+    def compose_files(self):
+        """Sorted compose file paths relative to base_dir"""
+        return self._current()[0]
+
+    def env_files(self):
+        """Sorted absolute paths of .env files"""
+        return self._current()[1]
+
+    def catalog(self, kind=None):
+        """[{'path', 'root', 'kind', 'size', 'mtime'}] sorted by path, optionally of one kind"""
+        entries = self._current()[2]
+        if kind is None:
+            return list(entries)
+        return [e for e in entries if e['kind'] == kind]
+
+    def total_size(self, kind=None):
+        """Bytes taken by the catalogued files"""
+        return sum(e['size'] for e in self.catalog(kind))
+
+    def service_summaries(self):
+        """{compose path: (project, [services])} as of the last publish; never parses"""
+        self._current()
+        with self._lock:
+            return {path: (s[2], s[3]) for path, s in self._summaries.items()}
+
+    def _refresh_summaries(self):
+        """Leader: parse the compose files changed since the summaries were last built"""
+        with self._lock:
+            known = self._summaries
+            compose = [(p, e) for p, e in self._catalog.items() if e['kind'] == 'compose']
+        summaries = {}
+        for path, entry in compose:
+            summary = known.get(path)
+            if summary is None or summary[0] != entry['mtime'] or summary[1] != entry['size']:
+                try:
+                    document = load_compose(path)
+                except Exception as e:
+                    logger.debug(f"Skipping unparsable compose file {path}: {e}")
+                    continue
+                if not isinstance(document, dict):
+                    continue
+                services = document.get('services')
+                services = [str(name) for name in services] if isinstance(services, dict) else []
+                summary = (entry['mtime'], entry['size'], default_project_name(path, document), services)
+            summaries[path] = summary
+        with self._lock:
+            self._summaries = summaries
+
+    def contains(self, path):
+        """Whether path is a catalogued compose or .env file"""
+        self._current()
+        with self._lock:
+            return os.path.abspath(path) in self._catalog
+
+    def root_of(self, path):
+        """The compose directory containing path, or None"""
+        for root in self.roots:
+            if path == root or path.startswith(root + os.sep):
+                return root
+        return None
+
+    def rescan(self):
+        """Ask for a full scan and return the compose files as they stand.
+
+        The scan runs on the leader's watcher thread, the only one that
+        touches the inotify watches; other workers forward the request
+        through the shared cache and pick the result up by version.
+        """
+        if self._thread is not None:
+            self._rescan.set()
+        elif self.shared_cache is not None:
+            self.shared_cache.set('compose:index:rescan', time.time())
+        return self.compose_files()
+
+    def _rescan_requested(self):
+        """Watcher thread: whether a rescan was asked here or in another worker since the last check"""
+        requested = self._rescan.is_set()
+        self._rescan.clear()
+        if self.shared_cache is not None:
+            asked = self.shared_cache.get('compose:index:rescan')
+            if asked != self._rescan_seen:
+                self._rescan_seen = asked
+                requested = True
+        return requested
+
+    def _current(self):
+        # Never blocks a request: until the first scan or snapshot lands the catalog is empty
+        if self._thread is None:
+            self._sync_from_shared()
+        with self._lock:
+            if self._lists is None:
+                compose = [p for p, e in self._catalog.items() if e['kind'] == 'compose']
+                env = sorted(p for p, e in self._catalog.items() if e['kind'] == 'env')
+                entries = [dict(e, path=p, root=self.root_of(p)) for p, e in sorted(self._catalog.items())]
+                self._lists = (relative_paths(compose, self.base_dir), env, entries)
+            return self._lists
+
+    def _sync_from_shared(self):
+        """Follower: adopt the leader's index when its version moves"""
+        now = time.time()
+        if now - self._synced_at < INDEX_SYNC_INTERVAL:
+            return
+        self._synced_at = now
+        if not self._ready.is_set():
+            self.follow()
+        if self.shared_cache is None:
+            return
+        version = self.shared_cache.get('compose:index:version')
+        if version is None or version == self._version:
+            return
+        data = self.shared_cache.get('compose:index')
+        if not data:
+            return
+        with self._lock:
+            self._catalog = {path: {'kind': kind, 'size': size, 'mtime': mtime}
+                             for path, (kind, size, mtime) in (data.get('files') or {}).items()}
+            self._summaries = {path: tuple(s) for path, s in (data.get('services') or {}).items()}
+            self._version = data.get('version', version)
+            self._lists = None
+        self._ready.set()
+
+    def follow(self):
+        """Follower: load the snapshot and wait for the leader's catalog in the background"""
+        with self._lock:
+            if self._follow_thread is not None:
+                return
+            self._follow_thread = threading.Thread(target=self._follow, name='compose-index-follow',
+                                                     daemon=True)
+        self._follow_thread.start()
+
+    def _follow(self):
+        """Follower, off the request path: serve the snapshot, and scan here if the leader never publishes"""
+        try:
+            if self.shared_cache is None:
+                self._full_scan()
+                return
+            if self.shared_cache.get('compose:index:version') is None:
+                self._adopt_snapshot()
+            deadline = time.time() + INDEX_WAIT
+            while time.time() < deadline:
+                if self._thread is not None or self.shared_cache.get('compose:index:version') is not None:
+                    return
+                time.sleep(1)
+            if self._thread is None:
+                logger.info("No shared compose index yet, scanning in this worker")
+                self._full_scan()
+        except Exception as e:
+            logger.error(f"Compose index fallback failed: {e}")
+
+    def _publish(self):
+        # Summaries travel with the catalog, so no worker parses compose files to look up a service
+        self._refresh_summaries()
+        with self._lock:
+            self._version = time.time()
+            self._lists = None
+            files = {p: (e['kind'], e['size'], e['mtime']) for p, e in self._catalog.items()}
+            services = {p: list(s) for p, s in self._summaries.items()}
+            data = {'version': self._version, 'files': files, 'services': services}
+        self._dirty = True
+        self._ready.set()
+        if self.shared_cache is not None:
+            self.shared_cache.set('compose:index', data)
+            self.shared_cache.set('compose:index:version', data['version'])
+
+    def _full_scan(self):
+        started = time.time()
+        roots = []
+        for root in self.roots:
+            if not os.path.isdir(root):
+                logger.warning(f"Compose directory doesn't exist: {root}")
+                continue
+            roots.append(root)
+        catalog, dirs = self.scanner.scan(roots)
+        if self._inotify is not None:
+            self._watch_all(dirs)
+            self._watch_files(catalog)
+        with self._lock:
+            self._catalog = catalog
+            self._dirs = set(dirs)
+        self._publish()
+        compose = sum(1 for e in catalog.values() if e['kind'] == 'compose')
+        logger.info(f"Indexed {compose} compose and {len(catalog) - compose} .env files "
+                    f"in {len(dirs)} directories ({time.time() - started:.1f}s)")
+
+    def _watch_all(self, dirs):
+        for directory in dirs:
+            if directory in self._watched:
+                continue
+            try:
+                wd = self._inotify.add_watch(directory)
+            except OSError as e:
+                if e.errno == errno.ENOSPC and not self._watch_exhausted:
+                    self._watch_exhausted = True
+                    logger.warning(f"Out of inotify watches at {directory}; "
+                                   f"falling back to rescans every {COMPOSE_POLL_INTERVAL}s")
+                continue
+            self._watches[wd] = directory
+            self._watched[directory] = wd
+
+    def _watch_files(self, paths):
+        for path in paths:
+            if self._watch_exhausted:
+                return
+            try:
+                wd = self._inotify.add_watch(path, FILE_WATCH_MASK)
+            except OSError as e:
+                if e.errno == errno.ENOSPC:
+                    self._watch_exhausted = True
+                    logger.warning(f"Out of inotify watches at {path}; "
+                                   f"falling back to rescans every {COMPOSE_POLL_INTERVAL}s")
+                continue
+            self._file_watches[wd] = path
+
+    def _forget_tree(self, directory):
+        prefix = directory + os.sep
+        with self._lock:
+            self._catalog = {p: e for p, e in self._catalog.items() if not p.startswith(prefix)}
+            self._dirs = {d for d in self._dirs if d != directory and not d.startswith(prefix)}
+        for path in [p for p in self._watched if p == directory or p.startswith(prefix)]:
+            self._watches.pop(self._watched.pop(path), None)
+        for wd in [wd for wd, p in self._file_watches.items() if p.startswith(prefix)]:
+            del self._file_watches[wd]
+
+    def _apply_events(self, events):
+        """Update the index from inotify events; returns whether anything changed"""
+        changed = False
+        for wd, mask, name in events:
+            if mask & IN_Q_OVERFLOW:
+                logger.warning("inotify queue overflowed, rescanning compose directories")
+                self._full_scan()
+                return False
+            if wd in self._file_watches:
+                path = self._file_watches[wd]
+                if mask & IN_IGNORED:
+                    del self._file_watches[wd]
+                elif mask & IN_CLOSE_WRITE:
+                    changed = self._refresh_entry(path) or changed
+                continue
+            directory = self._watches.get(wd)
+            if mask & IN_IGNORED:
+                if directory is not None:
+                    self._watches.pop(wd, None)
+                    if self._watched.get(directory) == wd:
+                        del self._watched[directory]
+                continue
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+            if mask & IN_ISDIR:
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    root = self.root_of(path)
+                    if root is None or not self.scanner.should_descend(path, root):
+                        continue
+                    # Watch before scanning so files created meanwhile are not missed
+                    self._watch_all([path])
+                    depth = len(os.path.relpath(path, root).split(os.sep))
+                    catalog, dirs = self.scanner.scan_tree(path, root, depth)
+                    with self._lock:
+                        self._catalog.update(catalog)
+                        self._dirs.update(dirs)
+                    self._watch_all(dirs)
+                    self._watch_files(catalog)
+                    changed = changed or bool(catalog)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._forget_tree(path)
+                    changed = True
+                continue
+            if file_kind(name) is None:
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                if self._refresh_entry(path):
+                    self._watch_files([path])
+                    changed = True
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                with self._lock:
+                    changed = self._catalog.pop(path, None) is not None or changed
+        return changed
+
+    def _refresh_entry(self, path):
+        """Re-stat one file into the catalog; returns whether its record changed"""
+        entry = catalog_entry(path, file_kind(os.path.basename(path)))
+        with self._lock:
+            if entry is None:
+                return self._catalog.pop(path, None) is not None
+            if self._catalog.get(path) == entry:
+                return False
+            self._catalog[path] = entry
+            return True
+
+    def _snapshot_key(self):
+        """Settings a snapshot was built with; any change invalidates it"""
+        return {
+            'roots': self.roots,
+            'ignore': self.scanner.ignore,
+            'max_depth': self.scanner.max_depth,
+            'stop_at_compose': self.scanner.stop_at_compose
+        }
+
+    def _load_snapshot(self):
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return None
+        try:
+            with gzip.open(self.snapshot_path, 'rt') as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable compose catalog snapshot {self.snapshot_path}: {e}")
+            return None
+        if data.get('format') != SNAPSHOT_FORMAT or data.get('key') != self._snapshot_key():
+            logger.info("Compose catalog snapshot was built with other settings, ignoring it")
+            return None
+        return data
+
+    def _apply_snapshot(self, data):
+        with self._lock:
+            self._catalog = {path: {'kind': kind, 'size': size, 'mtime': mtime}
+                             for path, (kind, size, mtime) in data.get('files', {}).items()}
+            self._dirs = set(data.get('dirs', {}))
+            self._summaries = {path: tuple(s) for path, s in data.get('services', {}).items()}
+            self._version = data.get('version', 0)
+            self._lists = None
+        self._ready.set()
+
+    def _adopt_snapshot(self):
+        """Follower: serve the snapshot once while the leader is still starting"""
+        if self._snapshot_checked:
+            return False
+        self._snapshot_checked = True
+        data = self._load_snapshot()
+        if data is None or self._ready.is_set():
+            # The leader's catalog arrived while the snapshot loaded
+            return False
+        self._apply_snapshot(data)
+        logger.info(f"Serving {len(self._catalog)} catalogued files from the snapshot until the leader publishes")
+        return True
+
+    def _resume_from_snapshot(self):
+        """Leader: publish the snapshot, then list again only the directories that changed"""
+        self._snapshot_checked = True
+        data = self._load_snapshot()
+        if data is None:
+            return False
+        started = time.time()
+        self._apply_snapshot(data)
+        self._publish()
+        if self._inotify is not None:
+            # Watch before checking so changes made meanwhile are not missed
+            self._watch_all(sorted(self._dirs))
+            self._watch_files(list(self._catalog))
+        changed, stale = self._validate_snapshot(data.get('dirs', {}))
+        if changed:
+            self._publish()
+        self._dirty = changed or stale > 0
+        logger.info(f"Resumed compose catalog from snapshot: {len(self._catalog)} files, "
+                    f"{stale} of {len(data.get('dirs', {}))} directories changed ({time.time() - started:.1f}s)")
+        return True
+
+    def _validate_snapshot(self, dir_mtimes):
+        """Re-list the directories whose mtime moved; returns (catalog changed, stale directories)"""
+        changed = False
+        stale = 0
+        for directory, mtime in dir_mtimes.items():
+            if directory not in self._dirs:
+                continue  # forgotten along with a parent
+            try:
+                current = os.stat(directory).st_mtime
+            except OSError:
+                self._forget_tree(directory)
+                changed = True
+                stale += 1
+                continue
+            if current != mtime:
+                stale += 1
+                changed = self._rescan_dir(directory) or changed
+        # In-place rewrites leave the directory mtime alone
+        for path in list(self._catalog):
+            changed = self._refresh_entry(path) or changed
+        return changed, stale
+
+    def _rescan_dir(self, directory):
+        """List one known directory again; returns whether the catalog changed"""
+        root = self.root_of(directory)
+        if root is None:
+            self._forget_tree(directory)
+            return True
+        depth = 0 if directory == root else len(os.path.relpath(directory, root).split(os.sep))
+        found = {}
+        subdirs = set(self.scanner._scan_dir(directory, root, depth, found))
+        changed = False
+        with self._lock:
+            for path in [p for p in self._catalog if os.path.dirname(p) == directory and p not in found]:
+                del self._catalog[path]
+                changed = True
+            for path, entry in found.items():
+                if self._catalog.get(path) != entry:
+                    self._catalog[path] = entry
+                    changed = True
+            known = {d for d in self._dirs if os.path.dirname(d) == directory}
+        if self._inotify is not None:
+            self._watch_files(found)
+        for gone in known - subdirs:
+            self._forget_tree(gone)
+            changed = True
+        for new in subdirs - known:
+            if self._inotify is not None:
+                self._watch_all([new])
+            catalog, dirs = self.scanner.scan_tree(new, root, depth + 1)
+            with self._lock:
+                self._catalog.update(catalog)
+                self._dirs.update(dirs)
+            if self._inotify is not None:
+                self._watch_all(dirs)
+                self._watch_files(catalog)
+            changed = changed or bool(catalog)
+        return changed
+
+    def _save_snapshot(self):
+        """Write the catalog, directory mtimes and service summaries to snapshot_path"""
+        if not self.snapshot_path:
+            return
+        started = time.time()
+        self._dirty = False
+        with self._lock:
+            dirs = list(self._dirs)
+        # Directory mtimes are taken before the catalog is copied: a change in
+        # between leaves an older mtime, which only costs a re-list next boot
+        dir_mtimes = {}
+        for directory in dirs:
+            try:
+                dir_mtimes[directory] = os.stat(directory).st_mtime
+            except OSError:
+                continue
+        with self._lock:
+            data = {
+                'format': SNAPSHOT_FORMAT,
+                'key': self._snapshot_key(),
+                'version': self._version,
+                'dirs': dir_mtimes,
+                'files': {p: [e['kind'], e['size'], e['mtime']] for p, e in self._catalog.items()},
+                'services': {p: list(s) for p, s in self._summaries.items()}
+            }
+        payload = json.dumps(data, separators=(',', ':')).encode()
+        tmp_path = self.snapshot_path + '.tmp'
+        try:
+            with gzip.open(tmp_path, 'wb', compresslevel=5) as f:
+                f.write(payload)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            logger.warning(f"Failed to save compose catalog snapshot: {e}")
+            return
+        logger.debug(f"Saved compose catalog snapshot ({len(data['files'])} files, "
+                     f"{len(dir_mtimes)} directories, {time.time() - started:.1f}s)")
+
+    def _worker(self):
+        try:
+            self._inotify = Inotify()
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({e}); rescanning compose directories every {COMPOSE_POLL_INTERVAL}s")
+        if self.shared_cache is not None:
+            # Requests from before this start are covered by the first scan
+            self._rescan_seen = self.shared_cache.get('compose:index:rescan')
+        try:
+            if not self._resume_from_snapshot():
+                self._full_scan()
+            if self._dirty:
+                self._save_snapshot()
+        except Exception as e:
+            logger.error(f"Compose index scan failed: {e}")
+        last_scan = time.time()
+        last_save = time.time()
+
+        while True:
+            try:
+                if self._watch_exhausted and self._inotify is not None:
+                    self._inotify.close()
+                    self._inotify = None
+                    self._watches.clear()
+                    self._watched.clear()
+                    self._file_watches.clear()
+                if self._inotify is not None:
+                    interval = COMPOSE_RESCAN_INTERVAL
+                    if self._apply_events(self._inotify.read(timeout=5)):
+                        self._publish()
+                else:
+                    interval = COMPOSE_POLL_INTERVAL
+                    self._rescan.wait(5)
+                if self._rescan_requested() or time.time() - last_scan >= interval:
+                    self._full_scan()
+                    last_scan = time.time()
+                if self._dirty and time.time() - last_save >= SNAPSHOT_INTERVAL:
+                    self._save_snapshot()
+                    last_save = time.time()
+            except Exception as e:
+                logger.error(f"Compose index error: {e}")
+                time.sleep(5)
+
+
+def default_project_name(path, document):
+    """Project name docker compose derives for a compose file"""
+    if isinstance(document, dict) and document.get('name'):
+        return str(document['name'])
+    directory = os.path.basename(os.path.dirname(path))
+    return re.sub(r'[^a-z0-9_-]', '', directory.lower())
+
+
+class ComposeServiceIndex:
+    """(host, project, service) -> compose file, for opening a container's compose file.
+
+    Containers deployed by compose carry their config files in labels, which
+    are resolved once per (host, project, service) and remembered (the most
+    recent SERVICE_LABEL_CACHE of them). Local containers whose labels point
+    outside our directories fall back to a (project, service) map built from
+    the parsed files of the compose index, rebuilt when the index changes.
+    Remote containers only match a label path that is a file of the index,
+    i.e. one deployed from here; anything else lives on the remote machine.
+    """
+
+    def __init__(self, compose_index, resolve):
+        self.compose_index = compose_index
+        self.resolve = resolve  # label path -> local path or None
+        self._labels = OrderedDict()  # (host, project, service) -> path, least recently used first
+        self._labels_lock = threading.Lock()
+        self._services = {}
+        self._by_service = {}
+        self._built_version = None
+        self._forced_at = 0
+        self._lock = threading.Lock()
+
+    def lookup(self, host, project, service, labels=None):
+        """Full path of the compose file defining service, or None"""
+        key = (host, project, service)
+        with self._labels_lock:
+            path = self._labels.get(key)
+            if path:
+                self._labels.move_to_end(key)
+        if path and self._defines(path, service):
+            return path
+
+        local = host == 'local'
+        labels = labels or {}
+        candidates = [f.strip() for f in (labels.get('com.docker.compose.project.config_files') or '').split(',') if f.strip()]
+        for candidate in candidates:
+            if local:
+                path = self.resolve(candidate)
+            else:
+                path = candidate if self.compose_index.contains(candidate) else None
+            if path and self._defines(path, service):
+                self._remember(key, path)
+                return path
+        if not local:
+            return None
+
+        for rebuild in (False, True):
+            if rebuild:
+                # Services may have been renamed inside an existing file
+                if time.time() - self._forced_at < SERVICE_REBUILD_INTERVAL:
+                    break
+                self._forced_at = time.time()
+            self._ensure_built(force=rebuild)
+            path = self._services.get((project, service))
+            if path is None:
+                paths = self._by_service.get(service) or []
+                path = paths[0] if len(paths) == 1 else None
+            if path and self._defines(path, service):
+                self._remember(key, path)
+                return path
+        return None
+
+    def _remember(self, key, path):
+        with self._labels_lock:
+            self._labels[key] = path
+            self._labels.move_to_end(key)
+            while len(self._labels) > SERVICE_LABEL_CACHE:
+                self._labels.popitem(last=False)
+
+    def _defines(self, path, service):
+        try:
+            document = load_compose(path)
+        except Exception:
+            return False
+        return isinstance(document, dict) and service in (document.get('services') or {})
+
+    def _ensure_built(self, force=False):
+        version = self.compose_index.version
+        if not force and version == self._built_version:
+            return
+        with self._lock:
+            services, by_service = {}, {}
+            # Summaries come parsed with the catalog (shared or from the snapshot), so this parses nothing
+            for path, (project, names) in sorted(self.compose_index.service_summaries().items()):
+                for service in names:
+                    services.setdefault((project, service), path)
+                    by_service.setdefault(service, []).append(path)
+            self._services = services
+            self._by_service = by_service
+            self._built_version = version
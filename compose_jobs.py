@@ -0,0 +1,502 @@
+# compose_jobs.py - Background job queue for docker-compose operations
+
+import os
+import time
+import fcntl
+import signal
+import uuid
+import hashlib
+import logging
+import threading
+import subprocess
+from contextlib import contextmanager
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from event_stream import format_sse, STREAM_KEEPALIVE, STREAM_MAX_AGE
+
+logger = logging.getLogger(__name__)
+
+COMPOSE_JOB_WORKERS = int(os.environ.get('COMPOSE_JOB_WORKERS', '4'))  # compose jobs run at once per worker
+COMPOSE_JOB_HISTORY = int(os.environ.get('COMPOSE_JOB_HISTORY', '100'))  # finished jobs kept per worker
+COMPOSE_COMMAND_TIMEOUT = 300  # seconds per docker-compose command
+COMPOSE_JOB_STREAMS = int(os.environ.get('COMPOSE_JOB_STREAMS', '2'))  # open output streams per worker
+JOB_OUTPUT_LINES = 2000  # output lines kept per job, for late subscribers
+JOB_RESULT_LINES = 200  # stdout/stderr lines a finished command hands back to its caller
+JOB_STATUS_LINES = 100  # output lines included in a status snapshot
+JOB_CHUNK_LINES = 200  # output lines per shared chunk, read by streams in other workers
+JOB_SHARED_LINES = 10000  # output lines kept in shared chunks, enough for a reader polling during bursts
+JOB_PUBLISH_INTERVAL = 0.5  # seconds between shared snapshots while output flows
+FILE_LOCK_RETRY = 1  # seconds before a job whose file is busy in another worker tries again
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+
+
+class ComposeJob:
+    """One queued compose operation: its state, timings, commands and output"""
+
+    def __init__(self, kind, description='', host=None, file=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.description = description
+        self.host = host
+        self.file = file
+        self.state = QUEUED
+        self.message = 'Queued'
+        self.result = None  # response body of the operation once finished
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.steps = []
+        self.output = deque(maxlen=JOB_OUTPUT_LINES)  # (seq, stream, line), a ring for late subscribers
+        self.line_count = 0  # seq of the newest line
+        self.manager = None
+        self._lock = threading.Lock()
+        self._output_changed = threading.Condition(self._lock)
+        self._published_at = 0
+        self._published_seq = 0  # last line written to the shared chunks
+        self._publish_lock = threading.Lock()  # keeps chunk and snapshot writes in order
+        self._flush_pending = False
+
+    def log(self, text, stream='info'):
+        """Add lines to the job output"""
+        with self._lock:
+            for line in text.splitlines():
+                self.line_count += 1
+                self.output.append((self.line_count, stream, line))
+            self._output_changed.notify_all()
+            backlog = self.line_count - self._published_seq
+        # A full chunk goes out at once, long before the ring could drop any of it
+        if backlog >= JOB_CHUNK_LINES or time.time() - self._published_at >= JOB_PUBLISH_INTERVAL:
+            self._changed()
+        elif not self._flush_pending:
+            # Publish the tail of a burst too, not only the lines before the next one
+            self._flush_pending = True
+            threading.Timer(JOB_PUBLISH_INTERVAL, self._flush).start()
+
+    def _flush(self):
+        self._flush_pending = False
+        self._changed()
+
+    def lines_after(self, seq, timeout=None):
+        """(lines newer than seq, finished), waiting up to timeout for either"""
+        with self._lock:
+            if self.line_count <= seq and not self.finished and timeout:
+                self._output_changed.wait(timeout)
+            lines = [entry for entry in self.output if entry[0] > seq]
+            return lines, bool(self.finished)
+
+    def run(self, cmd, cwd=None, env=None, timeout=COMPOSE_COMMAND_TIMEOUT, check=False):
+        """subprocess.run with text output streamed into the job as it is written.
+
+        Only the last JOB_RESULT_LINES lines of stdout and stderr are kept for
+        the returned CompletedProcess, so chatty pulls do not pile up in
+        memory. Raises subprocess.TimeoutExpired, and CalledProcessError when
+        check is set, just like subprocess.run.
+        """
+        step = {'command': ' '.join(cmd), 'started': time.time(), 'finished': None, 'exit_code': None}
+        with self._lock:
+            self.steps.append(step)
+            self.message = f"Running {step['command']}"
+        self.log(f"$ {step['command']}")
+        self._changed()
+
+        # Own process group, so a timeout also stops the helpers compose starts
+        process = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                   text=True, errors='replace', bufsize=1, start_new_session=True)
+        tails = {'stdout': deque(maxlen=JOB_RESULT_LINES), 'stderr': deque(maxlen=JOB_RESULT_LINES)}
+
+        def pump(pipe, stream):
+            # Universal newlines also split the \r-separated progress lines of pulls
+            with pipe:
+                for line in pipe:
+                    line = line.rstrip('\n')
+                    tails[stream].append(line)
+                    self.log(line, stream)
+
+        readers = [threading.Thread(target=pump, args=(process.stdout, 'stdout'), daemon=True),
+                   threading.Thread(target=pump, args=(process.stderr, 'stderr'), daemon=True)]
+        for reader in readers:
+            reader.start()
+        try:
+            returncode = process.wait(timeout=timeout)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(process.pid, signal.SIGKILL)
+            except OSError:
+                process.kill()
+            process.wait()
+            for reader in readers:
+                reader.join(5)
+            step['finished'] = time.time()
+            self.log(f"Timed out after {timeout}s")
+            self._changed()
+            raise
+        for reader in readers:
+            reader.join()
+        step['finished'] = time.time()
+        step['exit_code'] = returncode
+        self._changed()
+        result = subprocess.CompletedProcess(cmd, returncode, '\n'.join(tails['stdout']), '\n'.join(tails['stderr']))
+        if check and returncode != 0:
+            raise subprocess.CalledProcessError(returncode, cmd, result.stdout, result.stderr)
+        return result
+
+    def unpublished_chunks(self):
+        """{chunk index: [[seq, stream, line], ...]} for the chunks holding lines not yet shared.
+
+        Chunk i holds lines i * JOB_CHUNK_LINES + 1 to (i + 1) * JOB_CHUNK_LINES;
+        chunks are returned whole, so a partly filled one is simply rewritten.
+        """
+        with self._lock:
+            if self.line_count <= self._published_seq:
+                return {}
+            first = self._published_seq // JOB_CHUNK_LINES
+            self._published_seq = self.line_count
+            chunks = {}
+            for seq, stream, line in self.output:
+                index = (seq - 1) // JOB_CHUNK_LINES
+                if index >= first:
+                    chunks.setdefault(index, []).append([seq, stream, line])
+            return chunks
+
+    def to_dict(self, output_lines=JOB_STATUS_LINES):
+        """Snapshot with the last output_lines lines of output (None for all)"""
+        with self._lock:
+            output = [line for _, _, line in self.output]
+            steps = [dict(step) for step in self.steps]
+            line_count = self.line_count
+        if output_lines is not None:
+            output = output[-output_lines:] if output_lines else []
+        end = self.finished or time.time()
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'description': self.description,
+            'host': self.host,
+            'file': self.file,
+            'state': self.state,
+            'message': self.message,
+            'created': self.created,
+            'started': self.started,
+            'finished': self.finished,
+            'queued_seconds': round((self.started or end) - self.created, 3),
+            'run_seconds': round(end - self.started, 3) if self.started else None,
+            'steps': steps,
+            'output': output,
+            'output_seq': line_count,  # seq of the last line in output
+            'result': self.result
+        }
+
+    def _changed(self):
+        self._published_at = time.time()
+        if self.manager is not None:
+            self.manager._publish(self)
+
+
+class ComposeJobManager:
+    """Runs compose jobs on a bounded pool, one at a time per compose file.
+
+    Requests submit a job and answer with its id straight away instead of
+    holding a gunicorn thread for minutes. Job snapshots are mirrored to the
+    shared cache, so the status of a job can be asked of any worker.
+
+    Jobs on the same file wait in a FIFO of their own and only reach the pool
+    when the one before them is done, so they never hold a pool thread while
+    waiting. With a lock_dir, a flock per file also keeps other workers off
+    it; a job that finds its file busy there retries after FILE_LOCK_RETRY.
+    A job touching several files, such as a batch update, takes each of them
+    in turn with hold_file.
+    """
+
+    def __init__(self, shared_cache=None, workers=COMPOSE_JOB_WORKERS, history=COMPOSE_JOB_HISTORY,
+                 lock_dir=None):
+        self.shared_cache = shared_cache
+        self.history = history
+        self.lock_dir = lock_dir
+        self._executor = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='compose-job')
+        self._jobs = OrderedDict()  # id -> ComposeJob, oldest first
+        self._waiting = {}  # compose file with a job in flight -> deque of (job, func) queued behind it
+        self._streams = 0
+        self._listeners = []
+        self._lock = threading.Lock()
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+
+    def add_listener(self, callback):
+        """Call callback(job_dict) whenever a job is queued, starts or finishes"""
+        self._listeners.append(callback)
+
+    def submit(self, kind, func, description='', host=None, file=None):
+        """Queue func(job), which returns the operation's response body; returns the job.
+
+        A body with success False or status 'error' marks the job failed.
+        """
+        file = self._file_key(file)
+        job = ComposeJob(kind, description, host, file)
+        job.manager = self
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+            queued_behind = file is not None and file in self._waiting
+            if queued_behind:
+                self._waiting[file].append((job, func))
+            elif file is not None:
+                self._waiting[file] = deque()
+        self._publish(job)
+        self._notify(job)
+        if not queued_behind:
+            self._executor.submit(self._start, job, func)
+        logger.info(f"Queued {kind} job {job.id}: {description}")
+        return job
+
+    @contextmanager
+    def hold_file(self, job, file):
+        """Run one step of a running job on file, as if it were a job queued on it.
+
+        Waits behind the jobs already queued on file in this worker, then for
+        its flock, so the step never overlaps another job on the same file.
+        Does nothing for a file of None.
+        """
+        file = self._file_key(file)
+        if file is None:
+            yield
+            return
+        with self._lock:
+            turn = None
+            if file in self._waiting:
+                turn = threading.Event()
+                self._waiting[file].append((job, turn))
+            else:
+                self._waiting[file] = deque()
+        try:
+            if turn is not None:
+                self._waiting_for(job, f"Waiting for {file}")
+                turn.wait()
+            fd = self._lock_file(file)
+            while fd is False:
+                self._waiting_for(job, 'Waiting for another worker')
+                time.sleep(FILE_LOCK_RETRY)
+                fd = self._lock_file(file)
+            job.message = 'Running'
+            self._publish(job)
+            try:
+                yield
+            finally:
+                self._unlock_file(fd)
+        finally:
+            self._start_next(file)
+
+    def get(self, job_id):
+        """Snapshot of a job from this worker or, failing that, the shared cache"""
+        job = self._jobs.get(job_id)
+        if job is not None:
+            return job.to_dict()
+        if self.shared_cache is not None:
+            return self.shared_cache.get(f"job:{job_id}")
+        return None
+
+    def recent(self):
+        """Snapshots of this worker's jobs without output, newest first"""
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return [job.to_dict(output_lines=0) for job in reversed(jobs)]
+
+    def open_stream(self, job_id, after=0, max_streams=COMPOSE_JOB_STREAMS):
+        """SSE frames of a job's output from line after+1 until it finishes.
+
+        None when this worker already serves max_streams streams. Output
+        frames carry the seq of their last line as the event id, so a browser
+        that reconnects resumes where it left off. A reader that falls more
+        than JOB_OUTPUT_LINES (JOB_SHARED_LINES for a job in another worker)
+        behind gets a 'skipped' frame with the number of lines it missed.
+        """
+        if self._streams >= max_streams:
+            return None
+        job = self._jobs.get(job_id)
+        frames = self._local_frames(job, after) if job is not None else self._shared_frames(job_id, after)
+        return self._counted(frames)
+
+    def _counted(self, frames):
+        # Counted from the first frame: a response that is never iterated never runs finally
+        with self._lock:
+            self._streams += 1
+        try:
+            yield "retry: 5000\n\n"
+            yield from frames
+        finally:
+            with self._lock:
+                self._streams -= 1
+
+    def _local_frames(self, job, seq):
+        started = time.time()
+        state = None
+        while time.time() - started < STREAM_MAX_AGE:
+            lines, finished = job.lines_after(seq, timeout=STREAM_KEEPALIVE)
+            if (job.state, job.message) != state:
+                state = (job.state, job.message)
+                yield format_sse('state', {'state': job.state, 'message': job.message})
+            if lines and lines[0][0] > seq + 1:
+                # Fell behind by more than the ring holds
+                yield format_sse('skipped', {'lines': lines[0][0] - seq - 1})
+            if lines:
+                seq = lines[-1][0]
+                yield format_sse('output', {'lines': [list(entry) for entry in lines]}, seq)
+            elif finished:
+                yield format_sse('done', job.to_dict(output_lines=0))
+                return
+            else:
+                yield ': keepalive\n\n'
+
+    def _shared_frames(self, job_id, seq):
+        """Follow a job running in another worker through its shared snapshot and output chunks"""
+        started = time.time()
+        idle_since = time.time()
+        state = None
+        while time.time() - started < STREAM_MAX_AGE:
+            job = self.shared_cache.get(f"job:{job_id}") if self.shared_cache is not None else None
+            if job is None:
+                yield format_sse('done', {'id': job_id, 'state': FAILED, 'message': 'Unknown job', 'result': None})
+                return
+            if (job['state'], job['message']) != state:
+                state = (job['state'], job['message'])
+                yield format_sse('state', {'state': job['state'], 'message': job['message']})
+            oldest = job['output_seq'] - JOB_SHARED_LINES
+            if seq < oldest:
+                yield format_sse('skipped', {'lines': oldest - seq})
+                seq = oldest
+            caught_up = True
+            while seq < job['output_seq']:
+                chunk = self.shared_cache.get(f"job:{job_id}:out:{seq // JOB_CHUNK_LINES}") or []
+                lines = [entry for entry in chunk if entry[0] > seq]
+                if not lines:
+                    break  # not written yet, try again on the next round
+                seq = lines[-1][0]
+                idle_since = time.time()
+                caught_up = False
+                yield format_sse('output', {'lines': lines}, seq)
+            if job['finished']:
+                job['output'] = []
+                yield format_sse('done', job)
+                return
+            if time.time() - idle_since >= STREAM_KEEPALIVE:
+                idle_since = time.time()
+                yield ': keepalive\n\n'
+            if caught_up:
+                # Straight back for more while output is flowing
+                time.sleep(JOB_PUBLISH_INTERVAL)
+
+    def _start(self, job, func):
+        """Pool thread: run the job once no other worker holds its file"""
+        fd = self._lock_file(job.file)
+        if fd is False:
+            self._waiting_for(job, 'Waiting for another worker')
+            threading.Timer(FILE_LOCK_RETRY, self._executor.submit, args=(self._start, job, func)).start()
+            return
+        try:
+            self._run(job, func)
+        finally:
+            self._unlock_file(fd)
+            self._start_next(job.file)
+
+    def _waiting_for(self, job, message):
+        if job.message != message:
+            job.message = message
+            self._publish(job)
+
+    def _run(self, job, func):
+        job.state = RUNNING
+        job.started = time.time()
+        job.message = 'Running'
+        self._publish(job)
+        self._notify(job)
+        try:
+            result = func(job) or {}
+            failed = result.get('success') is False or result.get('status') == 'error'
+            job.state = FAILED if failed else COMPLETED
+            job.message = result.get('message') or ('Failed' if failed else 'Completed')
+            job.result = result
+        except Exception as e:
+            logger.error(f"Compose job {job.id} ({job.kind}) failed: {e}", exc_info=True)
+            job.state = FAILED
+            job.message = str(e)
+            job.result = {'status': 'error', 'message': str(e)}
+        with job._lock:
+            job.finished = time.time()
+            job._output_changed.notify_all()
+        logger.info(f"{job.kind} job {job.id} {job.state} in {job.finished - job.started:.1f}s")
+        self._publish(job)
+        self._notify(job)
+
+    def _start_next(self, file):
+        """Hand the next job queued on file to the pool, or wake the hold_file step it is"""
+        if file is None:
+            return
+        with self._lock:
+            queue = self._waiting.get(file)
+            if not queue:
+                self._waiting.pop(file, None)
+                return
+            job, func = queue.popleft()
+        if isinstance(func, threading.Event):
+            func.set()
+        else:
+            self._executor.submit(self._start, job, func)
+
+    @staticmethod
+    def _file_key(file):
+        # One spelling per file, whether it came from a request or a container label
+        return os.path.normpath(os.path.abspath(file)) if file else None
+
+    def _lock_file(self, file):
+        """Descriptor holding the cross-worker flock of file, None if not needed, False if busy"""
+        if file is None or not self.lock_dir:
+            return None
+        name = hashlib.sha1(file.encode()).hexdigest()[:16]
+        try:
+            fd = os.open(os.path.join(self.lock_dir, f"{name}.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError as e:
+            logger.warning(f"Cannot open job lock for {file}, running without it: {e}")
+            return None
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        return fd
+
+    @staticmethod
+    def _unlock_file(fd):
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self._jobs[job_id]
+            if self.shared_cache is not None:
+                self.shared_cache.delete_prefix(f"job:{job_id}")
+
+    def _publish(self, job):
+        if self.shared_cache is None:
+            return
+        # Output before the snapshot, so a reader never sees an output_seq it cannot fetch yet
+        kept = JOB_SHARED_LINES // JOB_CHUNK_LINES + 1
+        with job._publish_lock:
+            for index, lines in job.unpublished_chunks().items():
+                self.shared_cache.set(f"job:{job.id}:out:{index}", lines)
+                if index >= kept:
+                    self.shared_cache.delete(f"job:{job.id}:out:{index - kept}")
+            self.shared_cache.set(f"job:{job.id}", job.to_dict())
+
+    def _notify(self, job):
+        data = job.to_dict(output_lines=0)
+        for callback in self._listeners:
+            try:
+                callback(data)
+            except Exception as e:
+                logger.error(f"Compose job listener {getattr(callback, '__name__', callback)} failed: {e}")
@@ -0,0 +1,123 @@
+# compose_yaml.py - Compose YAML parsing (libyaml when available) and a parsed-file cache
+
+import os
+import pickle
+import logging
+import threading
+from collections import OrderedDict
+
+import yaml
+
+try:
+    from yaml import CSafeLoader as _BaseLoader, CSafeDumper as _BaseDumper
+    LIBYAML = True
+except ImportError:
+    from yaml import SafeLoader as _BaseLoader, SafeDumper as _BaseDumper
+    LIBYAML = False
+
+logger = logging.getLogger(__name__)
+
+COMPOSE_CACHE_MB = float(os.environ.get('COMPOSE_CACHE_MB', '32'))  # budget for cached documents
+COMPOSE_CACHE_ENTRIES = 1024
+
+
+class ComposeLoader(_BaseLoader):
+    """yaml.SafeLoader, backed by libyaml when PyYAML was built with it"""
+
+
+class ComposeDumper(_BaseDumper):
+    """yaml.SafeDumper, backed by libyaml when available"""
+
+
+# yaml.dump's default Dumper wrote tuples as !!python/tuple; write them as plain lists
+ComposeDumper.add_representer(tuple, yaml.representer.SafeRepresenter.represent_list)
+
+
+def safe_load(stream):
+    """Drop-in for yaml.safe_load"""
+    return yaml.load(stream, Loader=ComposeLoader)
+
+
+def safe_dump(data, stream=None, **kwargs):
+    """Drop-in for yaml.dump / yaml.safe_dump of plain data"""
+    return yaml.dump(data, stream, Dumper=ComposeDumper, **kwargs)
+
+
+class ParsedComposeCache:
+    """LRU of parsed YAML documents keyed by (realpath, st_mtime_ns, st_size).
+
+    Documents are kept pickled: the pickle size is what counts against the
+    byte budget, and every caller gets its own copy to modify without
+    touching the cache. Unpickling is far cheaper than parsing YAML, so each
+    file is parsed once per change no matter how many endpoints read it.
+    """
+
+    def __init__(self, max_bytes=COMPOSE_CACHE_MB * 1024 * 1024, max_entries=COMPOSE_CACHE_ENTRIES):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> pickled document
+        self._latest = {}  # realpath -> key of its cached version
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, path):
+        """Parsed document for path; raises OSError or yaml.YAMLError like safe_load would"""
+        real = os.path.realpath(path)
+        st = os.stat(real)
+        key = (real, st.st_mtime_ns, st.st_size)
+        with self._lock:
+            blob = self._entries.get(key)
+            if blob is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+        if blob is not None:
+            return pickle.loads(blob)
+
+        with open(real, 'r') as f:
+            document = safe_load(f)
+        blob = pickle.dumps(document, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self.misses += 1
+            stale = self._latest.get(real)
+            if stale is not None and stale != key:
+                self._drop(stale)
+            if key not in self._entries and len(blob) <= self.max_bytes:
+                self._entries[key] = blob
+                self._latest[real] = key
+                self._bytes += len(blob)
+                while self._bytes > self.max_bytes or len(self._entries) > self.max_entries:
+                    self._drop(next(iter(self._entries)))
+        return document
+
+    def invalidate(self, path):
+        with self._lock:
+            key = self._latest.get(os.path.realpath(path))
+            if key is not None:
+                self._drop(key)
+
+    def _drop(self, key):
+        blob = self._entries.pop(key, None)
+        if blob is not None:
+            self._bytes -= len(blob)
+        if self._latest.get(key[0]) == key:
+            del self._latest[key[0]]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+
+compose_cache = ParsedComposeCache()
+
+
+def load_compose(path):
+    """safe_load of a compose file, parsed at most once per change"""
+    return compose_cache.load(path)
@@ -0,0 +1,514 @@
+# container_inventory.py - Container snapshots and the event-driven in-memory inventory
+
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Re-inspect containers at least this often even if their summary looks unchanged,
+# so details the list endpoint does not expose (e.g. StartedAt after a quick restart)
+# cannot go stale forever.
+INSPECT_MAX_AGE = 300
+
+# Removed rows remembered for ?since= deltas; older clients get a full list
+ROW_TOMBSTONE_LIMIT = 1000
+
+
+def _summary_fingerprint(summary):
+    """Fields of a sparse container summary that invalidate a cached inspect"""
+    names = summary.get('Names') or ['']
+    return (names[0], summary.get('ImageID'), summary.get('State'))
+
+
+def _summary_from_inspect(attrs):
+    """Shape inspect output like a sparse list entry"""
+    config = attrs.get('Config') or {}
+    return {
+        'Id': attrs['Id'],
+        'Names': ['/' + attrs.get('Name', '').lstrip('/')],
+        'ImageID': attrs.get('Image', ''),
+        'State': (attrs.get('State') or {}).get('Status'),
+        'Created': attrs.get('Created'),
+        'Labels': config.get('Labels') or {},
+    }
+
+
+class ContainerSnapshotBuilder:
+    """Build per-host container snapshots with a bounded number of Docker API calls.
+
+    A snapshot costs one sparse container list and one image list per host.
+    Containers are only inspected when their summary changed since the previous
+    snapshot (or their cached inspect is older than INSPECT_MAX_AGE).
+    """
+
+    def __init__(self):
+        self._inspect_cache = {}  # (host, container id) -> (fingerprint, inspected_at, attrs)
+        self._image_tags = {}  # host -> {image id: [tags]} from the last snapshot
+        self._lock = threading.Lock()
+
+    def build(self, client, host_name):
+        """Return a list of container records for one host"""
+        summaries = client.api.containers(all=True)
+        image_tags = self._get_image_tags(client, host_name)
+        with self._lock:
+            self._image_tags[host_name] = image_tags
+
+        records = []
+        seen_ids = set()
+        inspected = 0
+        now = time.time()
+
+        for summary in summaries:
+            container_id = summary['Id']
+            seen_ids.add(container_id)
+            fingerprint = _summary_fingerprint(summary)
+            cache_key = (host_name, container_id)
+
+            with self._lock:
+                cached = self._inspect_cache.get(cache_key)
+
+            if cached and cached[0] == fingerprint and now - cached[1] < INSPECT_MAX_AGE:
+                attrs = cached[2]
+            else:
+                try:
+                    attrs = client.api.inspect_container(container_id)
+                    inspected += 1
+                except Exception as e:
+                    # Container vanished between list and inspect
+                    logger.debug(f"Failed to inspect container {container_id} on {host_name}: {e}")
+                    continue
+                with self._lock:
+                    self._inspect_cache[cache_key] = (fingerprint, now, attrs)
+
+            records.append(self._build_record(summary, attrs, image_tags, host_name))
+
+        # Drop cache entries for containers that no longer exist on this host
+        with self._lock:
+            for key in [k for k in self._inspect_cache if k[0] == host_name and k[1] not in seen_ids]:
+                del self._inspect_cache[key]
+
+        logger.debug(f"Snapshot for {host_name}: {len(records)} containers, {inspected} inspected")
+        return records
+
+    def build_one(self, client, host_name, container_id):
+        """Return a fresh record for a single container (inspects it)"""
+        attrs = client.api.inspect_container(container_id)
+        summary = _summary_from_inspect(attrs)
+        with self._lock:
+            self._inspect_cache[(host_name, attrs['Id'])] = (_summary_fingerprint(summary), time.time(), attrs)
+            image_tags = self._image_tags.setdefault(host_name, {})
+            known = summary['ImageID'] in image_tags
+        if not known:
+            self.refresh_image(client, host_name, summary['ImageID'])
+            with self._lock:
+                image_tags = self._image_tags.get(host_name, {})
+        return self._build_record(summary, attrs, image_tags, host_name)
+
+    def refresh_image(self, client, host_name, image_id):
+        """Re-read the tags of one image; returns the new tag list"""
+        try:
+            tags = client.api.inspect_image(image_id).get('RepoTags') or []
+        except Exception as e:
+            # Image was deleted
+            logger.debug(f"Failed to inspect image {image_id} on {host_name}: {e}")
+            tags = []
+        tags = [t for t in tags if t != '<none>:<none>']
+        with self._lock:
+            self._image_tags.setdefault(host_name, {})[image_id] = tags
+        return tags
+
+    def forget_container(self, host_name, container_id):
+        """Drop cached inspect data for a destroyed container"""
+        with self._lock:
+            self._inspect_cache.pop((host_name, container_id), None)
+
+    def forget_host(self, host_name):
+        """Drop cached inspect data for a removed host"""
+        with self._lock:
+            for key in [k for k in self._inspect_cache if k[0] == host_name]:
+                del self._inspect_cache[key]
+            self._image_tags.pop(host_name, None)
+
+    def _get_image_tags(self, client, host_name):
+        """Map image id -> repo tags with a single image list call"""
+        image_tags = {}
+        try:
+            for image in client.api.images(all=True):
+                tags = [t for t in (image.get('RepoTags') or []) if t != '<none>:<none>']
+                image_tags[image['Id']] = tags
+        except Exception as e:
+            logger.warning(f"Failed to list images on {host_name}: {e}")
+        return image_tags
+
+    def _build_record(self, summary, attrs, image_tags, host_name):
+        """Combine a container summary with its (possibly cached) inspect data"""
+        container_id = summary['Id']
+        names = summary.get('Names') or []
+        name = names[0].lstrip('/') if names else attrs.get('Name', '').lstrip('/')
+        image_id = summary.get('ImageID') or attrs.get('Image', '')
+        state = attrs.get('State', {}) or {}
+
+        return {
+            'id': container_id,
+            'short_id': container_id[:12],
+            'name': name,
+            'status': summary.get('State') or state.get('Status', 'unknown'),
+            'image_id': image_id,
+            'image_tags': image_tags.get(image_id, []),
+            'labels': summary.get('Labels') or {},
+            'created': attrs.get('Created', ''),
+            'started_at': state.get('StartedAt', ''),
+            'host': host_name,
+            'attrs': attrs,
+        }
+
+
+def shareable_record(record):
+    """Copy of a record with only the inspect fields list endpoints read"""
+    attrs = record.get('attrs') or {}
+    shared = dict(record)
+    shared['attrs'] = {
+        'HostConfig': {'PortBindings': (attrs.get('HostConfig') or {}).get('PortBindings')},
+        'Mounts': attrs.get('Mounts') or []
+    }
+    return shared
+
+
+def record_image(record, default='unknown'):
+    """Primary image tag of a snapshot record"""
+    tags = record.get('image_tags') or []
+    return tags[0] if tags else default
+
+
+def record_ports(record):
+    """Host port -> container port mapping from a snapshot record"""
+    ports = {}
+    port_bindings = record['attrs'].get('HostConfig', {}).get('PortBindings')
+    if port_bindings:
+        for container_port, host_config in port_bindings.items():
+            if host_config and len(host_config) > 0:
+                host_port = host_config[0].get('HostPort')
+                if host_port:
+                    ports[host_port] = container_port
+    return ports
+
+
+# Container event actions that change what we show for a container
+REFRESH_ACTIONS = {'create', 'start', 'restart', 'die', 'stop', 'kill', 'oom',
+                   'pause', 'unpause', 'rename', 'update'}
+# Image event actions that change an image's tags
+IMAGE_ACTIONS = {'tag', 'untag', 'delete'}
+# Seconds to wait before resubscribing after the events stream breaks
+RESUBSCRIBE_DELAY = 5
+
+
+class ContainerInventory:
+    """Per-host in-memory container tables kept current by the Docker events stream.
+
+    Each watched host has a long-lived ``events()`` subscription. After every
+    (re)subscribe the host's table is rebuilt from a full snapshot, then container
+    events are applied as single-container deltas. Until the first sync finishes,
+    ``get_records`` returns None and callers fall back to a live snapshot.
+    """
+
+    def __init__(self, snapshot_builder, client_getter):
+        self.snapshot_builder = snapshot_builder
+        self._get_client = client_getter
+        self._tables = {}  # host -> {container id: record}
+        self._names = {}  # host -> {container name: container id}
+        self._synced = set()
+        self._watchers = {}  # host -> (thread, stop event)
+        self._streams = {}  # host -> open events stream
+        self._listeners = []
+        self._lock = threading.RLock()
+
+    def watch(self, host_name):
+        """Start keeping a host's table in sync (no-op if already watched)"""
+        with self._lock:
+            if host_name in self._watchers:
+                return
+            stop_event = threading.Event()
+            thread = threading.Thread(
+                target=self._watch_worker,
+                args=(host_name, stop_event),
+                name=f"inventory-{host_name}",
+                daemon=True
+            )
+            self._watchers[host_name] = (thread, stop_event)
+        thread.start()
+        logger.info(f"Started container inventory watcher for {host_name}")
+
+    def unwatch(self, host_name):
+        """Stop watching a host and drop its table"""
+        with self._lock:
+            watcher = self._watchers.pop(host_name, None)
+            stream = self._streams.pop(host_name, None)
+            self._drop_table(host_name)
+        if watcher:
+            watcher[1].set()
+        if stream:
+            try:
+                stream.close()
+            except Exception:
+                pass
+        self.snapshot_builder.forget_host(host_name)
+
+    def add_listener(self, callback):
+        """Call callback(host_name, change, record) on every table change.
+
+        change is 'update' (record is the new record), 'remove' (the removed
+        record) or 'resync' (record is None, the whole table was replaced).
+        """
+        self._listeners.append(callback)
+
+    def is_synced(self, host_name):
+        with self._lock:
+            return host_name in self._synced
+
+    def get_records(self, host_name):
+        """Current records for a host, or None if the host is not in sync"""
+        with self._lock:
+            if host_name not in self._synced:
+                return None
+            return list(self._tables.get(host_name, {}).values())
+
+    def get_record(self, host_name, key):
+        """Look up a container by full id, name or short id prefix"""
+        with self._lock:
+            table = self._tables.get(host_name, {})
+            if key in table:
+                return table[key]
+            container_id = self._names.get(host_name, {}).get(key)
+            if container_id:
+                return table.get(container_id)
+            matches = [r for cid, r in table.items() if cid.startswith(key)]
+            return matches[0] if len(matches) == 1 else None
+
+    def resync(self, host_name, client):
+        """Replace a host's table with a full snapshot"""
+        records = self.snapshot_builder.build(client, host_name)
+        with self._lock:
+            self._tables[host_name] = {r['id']: r for r in records}
+            self._names[host_name] = {r['name']: r['id'] for r in records}
+            self._synced.add(host_name)
+        logger.debug(f"Inventory for {host_name} resynced with {len(records)} containers")
+        self._notify(host_name, 'resync', None)
+
+    def apply_event(self, host_name, client, event):
+        """Apply one decoded Docker event to a host's table"""
+        event_type = event.get('Type')
+        action = (event.get('Action') or event.get('status') or '').split(':')[0]
+        actor_id = (event.get('Actor') or {}).get('ID') or event.get('id')
+        if not actor_id:
+            return
+
+        if event_type == 'container':
+            if action == 'destroy':
+                self._remove(host_name, actor_id)
+            elif action in REFRESH_ACTIONS:
+                try:
+                    record = self.snapshot_builder.build_one(client, host_name, actor_id)
+                except Exception as e:
+                    # Already gone again (e.g. --rm containers)
+                    logger.debug(f"Failed to refresh container {actor_id} on {host_name}: {e}")
+                    self._remove(host_name, actor_id)
+                    return
+                self._put(host_name, record)
+        elif event_type == 'image' and action in IMAGE_ACTIONS:
+            tags = self.snapshot_builder.refresh_image(client, host_name, actor_id)
+            with self._lock:
+                for record in self._tables.get(host_name, {}).values():
+                    if record['image_id'] == actor_id:
+                        record['image_tags'] = tags
+
+    def _put(self, host_name, record):
+        with self._lock:
+            table = self._tables.setdefault(host_name, {})
+            names = self._names.setdefault(host_name, {})
+            previous = table.get(record['id'])
+            if previous and names.get(previous['name']) == record['id']:
+                del names[previous['name']]
+            table[record['id']] = record
+            names[record['name']] = record['id']
+        self._notify(host_name, 'update', record)
+
+    def _remove(self, host_name, container_id):
+        with self._lock:
+            record = self._tables.get(host_name, {}).pop(container_id, None)
+            if record:
+                names = self._names.get(host_name, {})
+                if names.get(record['name']) == container_id:
+                    del names[record['name']]
+        self.snapshot_builder.forget_container(host_name, container_id)
+        if record:
+            self._notify(host_name, 'remove', record)
+
+    def _notify(self, host_name, change, record):
+        for callback in self._listeners:
+            try:
+                callback(host_name, change, record)
+            except Exception as e:
+                logger.error(f"Inventory listener failed for {host_name}: {e}")
+
+    def _drop_table(self, host_name):
+        self._synced.discard(host_name)
+        self._tables.pop(host_name, None)
+        self._names.pop(host_name, None)
+
+    def _watch_worker(self, host_name, stop_event):
+        """Subscribe to events, resync, then apply deltas until the stream breaks"""
+        while not stop_event.is_set():
+            client = self._get_client(host_name)
+            if client is None:
+                stop_event.wait(RESUBSCRIBE_DELAY)
+                continue
+
+            stream = None
+            try:
+                # Subscribe before the snapshot so no event can fall in between
+                stream = client.events(decode=True, filters={'type': ['container', 'image']})
+                with self._lock:
+                    if stop_event.is_set():
+                        break
+                    self._streams[host_name] = stream
+                self.resync(host_name, client)
+
+                for event in stream:
+                    if stop_event.is_set():
+                        break
+                    try:
+                        self.apply_event(host_name, client, event)
+                    except Exception as e:
+                        logger.warning(f"Failed to apply event on {host_name}: {e}")
+            except Exception as e:
+                if not stop_event.is_set():
+                    logger.warning(f"Event stream for {host_name} lost: {e}")
+            finally:
+                if stream is not None:
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+                with self._lock:
+                    if self._streams.get(host_name) is stream:
+                        self._streams.pop(host_name, None)
+                    self._synced.discard(host_name)
+
+            stop_event.wait(RESUBSCRIBE_DELAY)
+
+
+class RowVersionTracker:
+    """Versions a list response row by row.
+
+    Every ``update()`` fingerprints the stable fields of the freshly built rows
+    (all but ``volatile_fields``, such as live stats and uptime) and bumps a
+    monotonically increasing version for each row that was added, changed or
+    removed. Clients can then revalidate with just the version (for ETags) or
+    ask for the rows that changed after a version they already have.
+
+    With a shared cache the versions and the epoch live there, so every worker
+    process hands out the same numbers; the epoch only changes when that state
+    is lost and versions stop being comparable.
+    """
+
+    def __init__(self, key_fields=('host', 'id'), volatile_fields=(), shared_cache=None, name='rows'):
+        self.key_fields = key_fields
+        self.volatile_fields = frozenset(volatile_fields)
+        self.shared_cache = shared_cache
+        self.cache_key = f"versions:{name}"
+        self._state = self._new_state()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _new_state():
+        return {
+            'epoch': uuid.uuid4().hex[:8],
+            'version': 0,
+            'horizon': 0,  # oldest version changes_since() can answer from
+            'rows': {},  # key -> [version, fingerprint]
+            'tombstones': []  # [key, version it was removed at], oldest first
+        }
+
+    @property
+    def epoch(self):
+        return self._state['epoch']
+
+    def key(self, row):
+        return json.dumps([row.get(field) for field in self.key_fields])
+
+    def _fingerprint(self, row):
+        stable = {k: v for k, v in row.items() if k not in self.volatile_fields}
+        data = json.dumps(stable, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.blake2b(data.encode(), digest_size=8).hexdigest()
+
+    @staticmethod
+    def _diff(state, fingerprints, retain):
+        changed = [key for key, fingerprint in fingerprints.items()
+                   if key not in state['rows'] or state['rows'][key][1] != fingerprint]
+        removed = [key for key in state['rows']
+                   if key not in fingerprints and not (retain and retain(json.loads(key)))]
+        return changed, removed
+
+    @staticmethod
+    def _apply(state, fingerprints, changed, removed):
+        tombstones = OrderedDict(state['tombstones'])
+        for key in changed:
+            state['version'] += 1
+            state['rows'][key] = [state['version'], fingerprints[key]]
+            tombstones.pop(key, None)
+        for key in removed:
+            del state['rows'][key]
+            state['version'] += 1
+            tombstones[key] = state['version']
+        while len(tombstones) > ROW_TOMBSTONE_LIMIT:
+            _, removed_at = tombstones.popitem(last=False)
+            state['horizon'] = removed_at
+        state['tombstones'] = [[key, version] for key, version in tombstones.items()]
+
+    def update(self, rows, retain=None):
+        """Record the current full row set and return the resulting version.
+
+        Keys missing from rows count as removed unless retain([field values])
+        is true, e.g. for the rows of a host that did not answer this time.
+        """
+        fingerprints = {self.key(row): self._fingerprint(row) for row in rows}
+        with self._lock:
+            state = self._state
+            if self.shared_cache is not None:
+                state = self.shared_cache.get(self.cache_key) or state
+            changed, removed = self._diff(state, fingerprints, retain)
+            if changed or removed:
+                if self.shared_cache is None:
+                    self._apply(state, fingerprints, changed, removed)
+                else:
+                    # Diff again inside the write transaction, another worker may have got there first
+                    def bump(current):
+                        current = current or self._new_state()
+                        changed, removed = self._diff(current, fingerprints, retain)
+                        if not (changed or removed):
+                            return None
+                        self._apply(current, fingerprints, changed, removed)
+                        return current
+                    shared = self.shared_cache.update(self.cache_key, bump)
+                    if shared is not None:
+                        state = shared
+                    else:
+                        # Shared cache unavailable: keep versioning in this worker
+                        self._apply(state, fingerprints, changed, removed)
+            self._state = state
+            return state['version']
+
+    def changes_since(self, since):
+        """(changed keys, removed keys) after version `since`, or None if unknown"""
+        with self._lock:
+            state = self._state
+            if since < state['horizon'] or since > state['version']:
+                return None
+            changed = [key for key, (version, _) in state['rows'].items() if version > since]
+            removed = [json.loads(key) for key, version in state['tombstones'] if version > since]
+            return changed, removed
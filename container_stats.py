@@ -0,0 +1,483 @@
+# container_stats.py - Background CPU/memory statistics collection for containers
+
+import os
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import docker
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+from call_context import background_calls
+
+logger = logging.getLogger(__name__)
+
+STATS_ENABLED = os.environ.get('STATS_ENABLED', 'true').lower() == 'true'
+STATS_INTERVAL = float(os.environ.get('STATS_INTERVAL', '10'))  # seconds between sweeps
+STATS_CONCURRENCY = int(os.environ.get('STATS_CONCURRENCY', '4'))  # stats calls in flight per host
+STATS_USE_CGROUPS = os.environ.get('STATS_USE_CGROUPS', 'true').lower() == 'true'
+CGROUP_ROOT = os.environ.get('STATS_CGROUP_ROOT', '/sys/fs/cgroup')
+CGROUP_OPEN_FILES = int(os.environ.get('STATS_CGROUP_OPEN_FILES', '1024'))  # cgroup files kept open
+
+EMPTY_STATS = {'cpu_percent': 0, 'memory_usage': 0, 'memory_limit': 0, 'memory_percent': 0,
+               'block_read': 0, 'block_write': 0}
+
+MB = 1024 * 1024
+
+
+def host_memory_total():
+    """Physical memory of this machine in bytes (0 if unknown)"""
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (ValueError, OSError, AttributeError):
+        return 0
+
+
+def calculate_cpu_percent(current, previous):
+    """CPU% between two raw Docker stats samples (100% == one full core)"""
+    try:
+        cpu = current['cpu_stats']
+        prev_cpu = previous['cpu_stats']
+        cpu_delta = cpu['cpu_usage']['total_usage'] - prev_cpu['cpu_usage']['total_usage']
+        system_delta = cpu.get('system_cpu_usage', 0) - prev_cpu.get('system_cpu_usage', 0)
+        if cpu_delta <= 0 or system_delta <= 0:
+            return 0.0
+        online_cpus = cpu.get('online_cpus') or len(cpu['cpu_usage'].get('percpu_usage') or []) or 1
+        return round(cpu_delta / system_delta * online_cpus * 100, 2)
+    except (KeyError, TypeError):
+        return 0.0
+
+
+def calculate_memory(stats):
+    """Working-set memory (usage minus inactive page cache) and limit, in bytes"""
+    memory = stats.get('memory_stats') or {}
+    usage = memory.get('usage', 0) or 0
+    details = memory.get('stats') or {}
+    # cgroup v2 reports inactive_file, cgroup v1 total_inactive_file
+    inactive = details.get('inactive_file', details.get('total_inactive_file', 0)) or 0
+    working_set = usage - inactive if inactive < usage else usage
+    return working_set, memory.get('limit', 0) or 0
+
+
+def calculate_block_io(stats):
+    """Total bytes read and written to block devices"""
+    read = write = 0
+    for entry in (stats.get('blkio_stats') or {}).get('io_service_bytes_recursive') or []:
+        op = (entry.get('op') or '').lower()
+        if op == 'read':
+            read += entry.get('value', 0)
+        elif op == 'write':
+            write += entry.get('value', 0)
+    return read, write
+
+
+def build_sample(cpu_percent, working_set, limit, block_read, block_write):
+    """Published stats for one container; sizes in MB"""
+    return {
+        'cpu_percent': cpu_percent,
+        'memory_usage': round(working_set / MB, 2),
+        'memory_limit': round(limit / MB, 2),
+        'memory_percent': round(working_set / limit * 100, 2) if limit else 0,
+        'block_read': round(block_read / MB, 2),
+        'block_write': round(block_write / MB, 2),
+        'timestamp': time.time()
+    }
+
+
+class CgroupStatsReader:
+    """Reads container accounting straight from the cgroup filesystem.
+
+    Handles cgroup v2 (unified) and v1 hierarchies with both the systemd
+    (``system.slice/docker-<id>.scope``) and cgroupfs (``docker/<id>``) drivers.
+    Accounting files are kept open and re-read with pread, so sampling a whole
+    host is a handful of syscalls per container. At most max_open descriptors
+    (and never more than a quarter of the open file limit) stay open; the
+    least recently read containers are closed first. ``root`` can point at
+    any tree laid out like /sys/fs/cgroup, e.g. a host mount or a synthetic
+    test tree.
+    """
+
+    V1_CONTROLLERS = {'cpu': ('cpuacct', 'cpu,cpuacct'), 'memory': ('memory',), 'io': ('blkio',)}
+
+    def __init__(self, root=CGROUP_ROOT, max_open=CGROUP_OPEN_FILES):
+        self.root = root
+        self.version = 2 if os.path.exists(os.path.join(root, 'cgroup.controllers')) else 1
+        self.max_open = max(1, max_open)
+        if resource is not None:
+            soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+            if soft_limit != resource.RLIM_INFINITY:
+                # The metrics archive may take half the limit; sockets and SQLite need the rest
+                self.max_open = max(1, min(self.max_open, soft_limit // 4))
+        self._dirs = {}  # container id -> {controller: directory}
+        self._fds = OrderedDict()  # container id -> {file path: fd}, least recently read first
+        self._open = 0  # descriptors held in _fds
+        self._lock = threading.Lock()
+
+    def available(self):
+        return os.path.isdir(self.root)
+
+    def read(self, container_id):
+        """Raw counters for a container, or None if it has no cgroup under root"""
+        dirs = self._container_dirs(container_id)
+        if dirs is None:
+            return None
+        try:
+            if self.version == 2:
+                return self._read_v2(container_id, dirs)
+            return self._read_v1(container_id, dirs)
+        except OSError:
+            # Container went away between listing and reading
+            self.forget(container_id)
+            return None
+
+    def forget(self, container_id):
+        """Close cached descriptors for a container"""
+        with self._lock:
+            self._dirs.pop(container_id, None)
+            self._close_fds(container_id)
+
+    def retain(self, container_ids):
+        """Forget every container not in container_ids, e.g. the ones that stopped"""
+        keep = set(container_ids)
+        with self._lock:
+            for container_id in [cid for cid in self._dirs if cid not in keep]:
+                del self._dirs[container_id]
+            for container_id in [cid for cid in self._fds if cid not in keep]:
+                self._close_fds(container_id)
+
+    def close(self):
+        for container_id in list(self._fds):
+            self.forget(container_id)
+
+    def _close_fds(self, container_id):
+        # Called with self._lock held
+        fds = self._fds.pop(container_id, {})
+        self._open -= len(fds)
+        for fd in fds.values():
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def _container_dirs(self, container_id):
+        with self._lock:
+            if container_id in self._dirs:
+                return self._dirs[container_id]
+
+        dirs = {}
+        if self.version == 2:
+            path = self._find_dir(self.root, container_id)
+            if path:
+                dirs = {'cpu': path, 'memory': path, 'io': path}
+        else:
+            for controller, names in self.V1_CONTROLLERS.items():
+                for name in names:
+                    path = self._find_dir(os.path.join(self.root, name), container_id)
+                    if path:
+                        dirs[controller] = path
+                        break
+        if 'cpu' not in dirs or 'memory' not in dirs:
+            return None
+
+        with self._lock:
+            self._dirs[container_id] = dirs
+        return dirs
+
+    def _find_dir(self, base, container_id):
+        for path in (os.path.join(base, 'system.slice', f'docker-{container_id}.scope'),
+                     os.path.join(base, 'docker', container_id)):
+            if os.path.isdir(path):
+                return path
+        return None
+
+    def _read_file(self, container_id, path):
+        # Read under the lock, so an eviction never closes a descriptor while it is in use
+        with self._lock:
+            fds = self._fds.get(container_id)
+            if fds is None:
+                fds = self._fds[container_id] = {}
+            else:
+                self._fds.move_to_end(container_id)
+            fd = fds.get(path)
+            if fd is None:
+                fd = os.open(path, os.O_RDONLY)
+                fds[path] = fd
+                self._open += 1
+                while self._open > self.max_open and len(self._fds) > 1:
+                    self._close_fds(next(iter(self._fds)))
+            return os.pread(fd, 65536, 0).decode()
+
+    def _read_optional(self, container_id, path):
+        try:
+            return self._read_file(container_id, path)
+        except FileNotFoundError:
+            return ''
+
+    def _read_v2(self, container_id, dirs):
+        now = time.monotonic_ns()
+        cpu_stat = parse_flat_keyed(self._read_file(container_id, os.path.join(dirs['cpu'], 'cpu.stat')))
+        memory_stat = parse_flat_keyed(self._read_file(container_id, os.path.join(dirs['memory'], 'memory.stat')))
+        usage = int(self._read_file(container_id, os.path.join(dirs['memory'], 'memory.current')))
+        limit = self._read_optional(container_id, os.path.join(dirs['memory'], 'memory.max')).strip()
+
+        read = write = 0
+        for line in self._read_optional(container_id, os.path.join(dirs['io'], 'io.stat')).splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key == 'rbytes':
+                    read += int(value)
+                elif key == 'wbytes':
+                    write += int(value)
+
+        return {
+            'timestamp_ns': now,
+            'cpu_usage_ns': cpu_stat.get('usage_usec', 0) * 1000,
+            'memory_usage': usage,
+            'memory_inactive': memory_stat.get('inactive_file', 0),
+            'memory_limit': int(limit) if limit.isdigit() else 0,
+            'block_read': read,
+            'block_write': write
+        }
+
+    def _read_v1(self, container_id, dirs):
+        now = time.monotonic_ns()
+        cpu_usage = int(self._read_file(container_id, os.path.join(dirs['cpu'], 'cpuacct.usage')))
+        memory_stat = parse_flat_keyed(self._read_file(container_id, os.path.join(dirs['memory'], 'memory.stat')))
+        usage = int(self._read_file(container_id, os.path.join(dirs['memory'], 'memory.usage_in_bytes')))
+        limit = self._read_optional(container_id, os.path.join(dirs['memory'], 'memory.limit_in_bytes')).strip()
+
+        read = write = 0
+        if 'io' in dirs:
+            io_file = os.path.join(dirs['io'], 'blkio.throttle.io_service_bytes')
+            for line in self._read_optional(container_id, io_file).splitlines():
+                parts = line.split()
+                if len(parts) == 3 and parts[1] == 'Read':
+                    read += int(parts[2])
+                elif len(parts) == 3 and parts[1] == 'Write':
+                    write += int(parts[2])
+
+        return {
+            'timestamp_ns': now,
+            'cpu_usage_ns': cpu_usage,
+            'memory_usage': usage,
+            'memory_inactive': memory_stat.get('total_inactive_file', memory_stat.get('inactive_file', 0)),
+            'memory_limit': int(limit) if limit.isdigit() else 0,
+            'block_read': read,
+            'block_write': write
+        }
+
+
+def parse_flat_keyed(content):
+    """Parse 'key value' lines of a cgroup stat file into ints"""
+    values = {}
+    for line in content.splitlines():
+        key, _, value = line.partition(' ')
+        try:
+            values[key] = int(value)
+        except ValueError:
+            continue
+    return values
+
+
+class ContainerStatsCollector:
+    """Periodically samples running containers on every connected host.
+
+    Samples are taken off the request path; the container list endpoints read
+    the latest values with ``get()``. Where the daemon supports it, stats are
+    fetched with ``one-shot`` (no built-in one second wait) and the CPU delta is
+    computed against our own previous sample. Containers on the local host are
+    read from the cgroup filesystem when it is visible, falling back to the
+    Docker API per container otherwise.
+    """
+
+    def __init__(self, host_manager, interval=STATS_INTERVAL, concurrency=STATS_CONCURRENCY,
+                 cgroup_root=CGROUP_ROOT, use_cgroups=STATS_USE_CGROUPS):
+        self.host_manager = host_manager
+        self.interval = interval
+        self.concurrency = concurrency
+        self.cgroups = None
+        if use_cgroups:
+            reader = CgroupStatsReader(cgroup_root)
+            if reader.available():
+                self.cgroups = reader
+                logger.info(f"Reading local container stats from cgroup v{reader.version} at {cgroup_root}")
+        self._host_memory = host_memory_total()
+        self._samples = {}  # (host, container id) -> published stats
+        self._raw = {}  # (host, container id) -> previous raw Docker stats
+        self._cgroup_raw = {}  # container id -> previous local cgroup counters
+        self._one_shot = {}  # host -> whether the daemon accepts one-shot stats
+        self._executors = {}  # host -> bounded pool for that host's stats calls
+        self._busy = set()  # hosts with a sweep still running
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Start the background sampling thread"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._worker, name='container-stats', daemon=True)
+        self._thread.start()
+        logger.info(f"Container stats collector started (interval {self.interval}s, {self.concurrency} per host)")
+
+    def add_listener(self, callback):
+        """Call callback(host_name, samples, removed) after every host sweep.
+
+        samples maps container id -> stats for the containers sampled in the
+        sweep; removed lists container ids that stopped or disappeared.
+        """
+        self._listeners.append(callback)
+
+    def is_running(self):
+        return self._thread is not None
+
+    def get(self, host_name, container_id):
+        """Latest stats for a container, zeros if not sampled yet"""
+        with self._lock:
+            return self._samples.get((host_name, container_id), EMPTY_STATS)
+
+    def get_host(self, host_name):
+        """Latest stats of every sampled container on a host, by container id"""
+        with self._lock:
+            return {cid: sample for (host, cid), sample in self._samples.items() if host == host_name}
+
+    def _worker(self):
+        while True:
+            started = time.time()
+            try:
+                self.collect_once()
+            except Exception as e:
+                logger.error(f"Stats collection error: {e}")
+            time.sleep(max(1.0, self.interval - (time.time() - started)))
+
+    def collect_once(self):
+        """Sample all connected hosts in parallel"""
+        self._drop_removed_hosts()
+        self.host_manager.fan_out(self.collect_host, timeout=self.interval)
+
+    def collect_host(self, host_name, client):
+        """Sample every running container on one host with bounded concurrency"""
+        with self._lock:
+            if host_name in self._busy:
+                # Previous sweep of a slow host is still running
+                return 0
+            self._busy.add(host_name)
+            executor = self._executors.get(host_name)
+            if executor is None:
+                executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix=f'stats-{host_name}')
+                self._executors[host_name] = executor
+
+        try:
+            sweep_started = time.time()
+            running = [r['id'] for r in self.host_manager.get_container_snapshot(host_name)
+                       if r['status'] == 'running']
+            remaining = running
+            if host_name == 'local' and self.cgroups is not None:
+                remaining = [cid for cid in running if self._sample_cgroup(cid) is None]
+            samples = list(executor.map(lambda cid: self._sample(client, host_name, cid), remaining))
+
+            with self._lock:
+                # Forget containers that stopped or disappeared
+                running_keys = {(host_name, cid) for cid in running}
+                gone = [k for k in self._samples if k[0] == host_name and k not in running_keys]
+                for key in gone:
+                    del self._samples[key]
+                    self._raw.pop(key, None)
+                    self._cgroup_raw.pop(key[1], None)
+            if host_name == 'local' and self.cgroups is not None:
+                # Also drops containers that were read but never sampled
+                self.cgroups.retain(running)
+
+            with self._lock:
+                current = {cid: self._samples[(host_name, cid)] for cid in running
+                           if self._samples.get((host_name, cid), EMPTY_STATS).get('timestamp', 0) >= sweep_started}
+            self._notify(host_name, current, [cid for _, cid in gone])
+            return len(running) - len(remaining) + len([s for s in samples if s is not None])
+        finally:
+            with self._lock:
+                self._busy.discard(host_name)
+
+    def _sample(self, client, host_name, container_id):
+        key = (host_name, container_id)
+        try:
+            # Leave the host's reserved slots to interactive requests
+            with background_calls():
+                raw = self._read_stats(client, host_name, container_id)
+        except Exception as e:
+            logger.debug(f"Failed to read stats for {container_id} on {host_name}: {e}")
+            return None
+
+        with self._lock:
+            previous = self._raw.get(key)
+        if previous is None and (raw.get('precpu_stats') or {}).get('system_cpu_usage'):
+            # Non one-shot responses carry their own previous sample
+            previous = {'cpu_stats': raw['precpu_stats']}
+
+        cpu_percent = calculate_cpu_percent(raw, previous) if previous else 0.0
+        working_set, limit = calculate_memory(raw)
+        sample = build_sample(cpu_percent, working_set, limit, *calculate_block_io(raw))
+        with self._lock:
+            self._raw[key] = {'cpu_stats': raw.get('cpu_stats') or {}}
+            self._samples[key] = sample
+        return sample
+
+    def _sample_cgroup(self, container_id):
+        """Sample a local container from cgroup files; None if not found there"""
+        counters = self.cgroups.read(container_id)
+        if counters is None:
+            return None
+
+        with self._lock:
+            previous = self._cgroup_raw.get(container_id)
+        cpu_percent = 0.0
+        if previous:
+            elapsed = counters['timestamp_ns'] - previous['timestamp_ns']
+            used = counters['cpu_usage_ns'] - previous['cpu_usage_ns']
+            if elapsed > 0 and used > 0:
+                cpu_percent = round(used / elapsed * 100, 2)
+
+        usage = counters['memory_usage']
+        inactive = counters['memory_inactive']
+        working_set = usage - inactive if inactive < usage else usage
+        limit = counters['memory_limit']
+        if not limit or (self._host_memory and limit > self._host_memory):
+            # Unlimited containers are bounded by the host, as docker stats reports
+            limit = self._host_memory
+
+        sample = build_sample(cpu_percent, working_set, limit, counters['block_read'], counters['block_write'])
+        with self._lock:
+            self._cgroup_raw[container_id] = counters
+            self._samples[('local', container_id)] = sample
+        return sample
+
+    def _notify(self, host_name, samples, removed):
+        for callback in self._listeners:
+            try:
+                callback(host_name, samples, removed)
+            except Exception as e:
+                logger.error(f"Stats listener {getattr(callback, '__name__', callback)} failed: {e}")
+
+    def _read_stats(self, client, host_name, container_id):
+        if self._one_shot.get(host_name, True):
+            try:
+                return client.api.stats(container_id, stream=False, one_shot=True)
+            except docker.errors.InvalidVersion:
+                logger.info(f"Host {host_name} does not support one-shot stats, using blocking stats")
+                self._one_shot[host_name] = False
+        return client.api.stats(container_id, stream=False)
+
+    def _drop_removed_hosts(self):
+        known = set(self.host_manager.host_configs)
+        with self._lock:
+            for host_name in [h for h in self._executors if h not in known]:
+                self._executors.pop(host_name).shutdown(wait=False)
+                self._one_shot.pop(host_name, None)
+            for key in [k for k in self._samples if k[0] not in known]:
+                del self._samples[key]
+                self._raw.pop(key, None)
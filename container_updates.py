@@ -8,10 +8,11 @@ import requests
 import subprocess
 import re
 from datetime import datetime, timezone
-from typing import Dict, List, Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 import docker
-import yaml
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from container_inventory import record_image
+from compose_yaml import load_compose, compose_cache
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +43,11 @@ class ContainerUpdateManager:
         }
 
         self.settings = self.load_settings()
+        self._listeners: List[Callable[[Dict], None]] = []
+
+    def add_listener(self, callback: Callable[[Dict], None]):
+        """Call callback(update_results) whenever new check results are saved"""
+        self._listeners.append(callback)
 
     def load_settings(self) -> Dict:
         """Load container update settings"""
@@ -74,27 +80,28 @@ class ContainerUpdateManager:
                 client = host_manager.get_client(host_name)
                 if client:
                     try:
-                        containers = client.containers.list(all=True)
+                        containers = host_manager.get_container_snapshot(host_name)
 
-                        for container in containers:
-                            labels = container.labels or {}
+                        for record in containers:
+                            labels = record['labels']
+                            image_full = record_image(record, default=record['image_id'])
 
                             # Get image information
-                            image_info = self.parse_image_name(container.image.tags[0] if container.image.tags else container.image.id)
+                            image_info = self.parse_image_name(image_full)
 
                             container_info = {
-                                'id': container.short_id,
-                                'name': container.name,
+                                'id': record['short_id'],
+                                'name': record['name'],
                                 'host': host_name,
-                                'status': container.status,
-                                'image_full': container.image.tags[0] if container.image.tags else container.image.id,
+                                'status': record['status'],
+                                'image_full': image_full,
                                 'image_name': image_info['name'],
                                 'image_tag': image_info['tag'],
                                 'image_registry': image_info['registry'],
                                 'compose_project': labels.get('com.docker.compose.project'),
                                 'compose_service': labels.get('com.docker.compose.service'),
                                 'compose_file': labels.get('com.docker.compose.project.config_files'),
-                                'created': container.attrs.get('Created', ''),
+                                'created': record['created'],
                                 'is_compose_managed': bool(labels.get('com.docker.compose.project')),
                                 'update_available': False,
                                 'latest_version': None,
@@ -544,6 +551,16 @@ class ContainerUpdateManager:
         except Exception as e:
             logger.error(f"Failed to save update cache: {e}")
 
+        self.notify_listeners(update_results)
+
+    def notify_listeners(self, update_results: Dict):
+        """Pass check results to every registered listener"""
+        for callback in self._listeners:
+            try:
+                callback(update_results)
+            except Exception as e:
+                logger.error(f"Update results listener failed: {e}")
+
     def load_update_cache(self) -> Dict:
         """Load cached update results"""
         try:
@@ -555,8 +572,11 @@ class ContainerUpdateManager:
 
         return {'containers': {}, 'last_check': 0}
 
-    def update_container(self, container_id: str, host: str, target_tag: str, host_manager) -> Dict:
-        """Update a specific container to a new tag"""
+    def update_container(self, container_id: str, host: str, target_tag: str, host_manager, job=None) -> Dict:
+        """Update a specific container to a new tag.
+
+        With a compose job, command output and progress go to the job's output.
+        """
         try:
             logger.info(f"Updating container {container_id} on {host} to {target_tag}")
 
@@ -572,9 +592,9 @@ class ContainerUpdateManager:
             # Check if it's a compose-managed container
             labels = container.labels or {}
             if labels.get('com.docker.compose.project'):
-                return self.update_compose_container(container, target_tag, host, host_manager)
+                return self.update_compose_container(container, target_tag, host, host_manager, job)
             else:
-                return self.update_standalone_container(container, target_tag, client)
+                return self.update_standalone_container(container, target_tag, client, job)
 
         except Exception as e:
             logger.error(f"Failed to update container {container_id}: {e}")
@@ -583,7 +603,7 @@ class ContainerUpdateManager:
                 'error': str(e)
             }
 
-    def update_compose_container(self, container, target_tag: str, host: str, host_manager) -> Dict:
+    def update_compose_container(self, container, target_tag: str, host: str, host_manager, job=None) -> Dict:
         """Update a compose-managed container"""
         try:
             labels = container.labels
@@ -609,8 +629,11 @@ class ContainerUpdateManager:
             if not update_result['success']:
                 return update_result
 
+            if job is not None:
+                job.log(f"{config_file}: {service} image {update_result['old_image']} -> {update_result['new_image']}")
+
             # Deploy the updated compose
-            return self.deploy_updated_compose(config_file, service, host, host_manager)
+            return self.deploy_updated_compose(config_file, service, host, host_manager, job)
 
         except Exception as e:
             logger.error(f"Failed to update compose container: {e}")
@@ -631,8 +654,8 @@ class ContainerUpdateManager:
             with open(backup_file, 'w') as f:
                 f.write(original_content)
 
-            # Validate service and get current image via yaml parse (read-only)
-            compose_data = yaml.safe_load(original_content)
+            # Validate service and get current image via the parsed-file cache
+            compose_data = load_compose(compose_file)
 
             if 'services' not in compose_data or service not in compose_data['services']:
                 return {
@@ -667,6 +690,7 @@ class ContainerUpdateManager:
 
             with open(compose_file, 'w') as f:
                 f.write(new_content)
+            compose_cache.invalidate(compose_file)
 
             logger.info(f"Updated {service} image: {current_image} -> {new_image}")
 
@@ -729,7 +753,7 @@ class ContainerUpdateManager:
 
         return '\n'.join(result_lines) if replaced else None
 
-    def deploy_updated_compose(self, compose_file: str, service: str, host: str, host_manager) -> Dict:
+    def deploy_updated_compose(self, compose_file: str, service: str, host: str, host_manager, job=None) -> Dict:
         """Deploy updated compose configuration"""
         try:
             compose_dir = os.path.dirname(compose_file)
@@ -752,28 +776,14 @@ class ContainerUpdateManager:
 
             # Pull new image
             pull_cmd = ['docker-compose', '-f', compose_filename, 'pull', service]
-            pull_result = subprocess.run(
-                pull_cmd,
-                cwd=compose_dir,
-                env=env,
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+            pull_result = self._run_compose(pull_cmd, compose_dir, env, job)
 
             if pull_result.returncode != 0:
                 logger.warning(f"Pull warnings: {pull_result.stderr}")
 
             # Recreate the service
             up_cmd = ['docker-compose', '-f', compose_filename, 'up', '-d', '--force-recreate', service]
-            up_result = subprocess.run(
-                up_cmd,
-                cwd=compose_dir,
-                env=env,
-                capture_output=True,
-                text=True,
-                timeout=300
-            )
+            up_result = self._run_compose(up_cmd, compose_dir, env, job)
 
             if up_result.returncode == 0:
                 return {
@@ -800,7 +810,13 @@ class ContainerUpdateManager:
                 'error': str(e)
             }
 
-    def update_standalone_container(self, container, target_tag: str, client) -> Dict:
+    def _run_compose(self, cmd: List[str], cwd: str, env: Dict, job=None):
+        """Run a docker-compose command, streaming its output into job when there is one"""
+        if job is not None:
+            return job.run(cmd, cwd=cwd, env=env, timeout=300)
+        return subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True, timeout=300)
+
+    def update_standalone_container(self, container, target_tag: str, client, job=None) -> Dict:
         """Update a standalone (non-compose) container"""
         try:
             # Get container configuration
@@ -816,6 +832,8 @@ class ContainerUpdateManager:
                 new_image = current_image + ':' + target_tag
 
             # Pull new image
+            if job is not None:
+                job.log(f"Pulling {new_image}")
             try:
                 client.images.pull(new_image)
             except Exception as e:
@@ -826,10 +844,12 @@ class ContainerUpdateManager:
 
             # Stop and remove old container
             was_running = container.status == 'running'
+            old_name = container.name
+            if job is not None:
+                job.log(f"Replacing container {old_name}")
             if was_running:
                 container.stop()
 
-            old_name = container.name
             container.remove()
 
             # Recreate container with new image
@@ -850,6 +870,8 @@ class ContainerUpdateManager:
                 working_dir=config.get('WorkingDir'),
                 labels=config.get('Labels', {})
             )
+            if job is not None:
+                job.log(f"Started {old_name} ({new_container.short_id}) from {new_image}")
 
             return {
                 'success': True,
@@ -0,0 +1,109 @@
+# event_stream.py - In-process publish/subscribe for Server-Sent Events
+
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+STREAM_MAX_CLIENTS = int(os.environ.get('STREAM_MAX_CLIENTS', '4'))  # open streams per worker
+STREAM_KEEPALIVE = 15  # seconds between comment frames on an idle stream
+STREAM_MAX_AGE = 600  # seconds before a stream is closed and the browser reconnects
+STREAM_QUEUE_SIZE = 256  # undelivered events per subscriber before it must resync
+
+
+def format_sse(event, data, event_id=None):
+    """Encode one Server-Sent Events frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    for line in json.dumps(data, separators=(',', ':')).splitlines():
+        lines.append(f"data: {line}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class Subscription:
+    """One connected stream: a bounded queue that degrades to a resync signal"""
+
+    def __init__(self, broker, topics=None):
+        self.broker = broker
+        self.topics = set(topics) if topics else None
+        self.queue = queue.Queue(maxsize=STREAM_QUEUE_SIZE)
+        self.overflowed = False
+
+    def offer(self, frame_id, event, data):
+        if self.topics is not None and event not in self.topics:
+            return
+        try:
+            self.queue.put_nowait((frame_id, event, data))
+        except queue.Full:
+            # Too slow to keep up: drop the backlog and tell the client to refetch
+            self.overflowed = True
+
+    def frames(self, keepalive=STREAM_KEEPALIVE, max_age=STREAM_MAX_AGE):
+        """Yield SSE frames until max_age, then unsubscribe"""
+        started = time.time()
+        try:
+            yield "retry: 5000\n\n"
+            yield format_sse('hello', {'topics': sorted(self.topics) if self.topics else None})
+            while time.time() - started < max_age:
+                if self.overflowed:
+                    self.overflowed = False
+                    while not self.queue.empty():
+                        try:
+                            self.queue.get_nowait()
+                        except queue.Empty:
+                            break
+                    yield format_sse('resync', {})
+                    continue
+                try:
+                    frame_id, event, data = self.queue.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event, data, frame_id)
+        finally:
+            self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fans published events out to every open stream in this process"""
+
+    def __init__(self, max_clients=STREAM_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def subscribe(self, topics=None):
+        """Register a new stream, or None when this worker is at capacity"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_clients:
+                return None
+            subscription = Subscription(self, topics)
+            self._subscribers.add(subscription)
+        logger.debug(f"Stream subscribed ({len(self._subscribers)} open)")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+        logger.debug(f"Stream closed ({len(self._subscribers)} open)")
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def publish(self, event, data):
+        """Queue an event for every subscriber; never blocks the publisher"""
+        with self._lock:
+            if not self._subscribers:
+                return
+            self._next_id += 1
+            frame_id = self._next_id
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.offer(frame_id, event, data)
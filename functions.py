@@ -2,9 +2,10 @@ import json
 import os
 import datetime
 import pytz
-import yaml
 import docker
 from functools import lru_cache
+from compose_yaml import load_compose, compose_cache, safe_dump
+from compose_index import ComposeScanner
 
 def initialize_docker_client(logger):
     """Initialize Docker client"""
@@ -71,78 +72,27 @@ def get_compose_files_cached(compose_dir, extra_dirs):
 def get_compose_files(compose_dir, extra_dirs, logger):
     """Get all compose files in the configured directories, returning relative paths"""
     try:
-        compose_files = []
         search_dirs = [compose_dir] + [d for d in extra_dirs if d]
-        
-        # Only allow these specific filenames
-        valid_filenames = ['docker-compose.yml', 'docker-compose.yaml', 'compose.yml', 'compose.yaml']
-        
-        for search_dir in search_dirs:
-            if logger:
-                logger.debug(f"Searching directory: {search_dir}")
-            if not os.path.exists(search_dir):
-                if logger:
+        if logger:
+            for search_dir in search_dirs:
+                if not os.path.exists(search_dir):
                     logger.warning(f"Search directory doesn't exist: {search_dir}")
-                continue
-                
-            for root, dirs, files in os.walk(search_dir, topdown=True):
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
-                for file in files:
-                    # Only include files that match exactly our valid filenames
-                    if file in valid_filenames:
-                        file_path = os.path.join(root, file)
-                        try:
-                            relative_path = os.path.relpath(file_path, compose_dir)
-                            relative_path = relative_path.replace(os.sep, '/')
-                            compose_files.append(relative_path)
-                            if logger:
-                                logger.debug(f"Found compose file: {relative_path}")
-                        except ValueError as e:
-                            if logger:
-                                logger.warning(f"Failed to compute relative path for {file_path}: {e}")
-                            continue
-                            
+        # Same crawl (and pruning rules) as the compose index
+        compose_files = ComposeScanner().relative_compose_files(search_dirs, compose_dir)
         if logger:
             logger.info(f"Total compose files found: {len(compose_files)}")
-        return sorted(compose_files)
+        return compose_files
     except Exception as e:
         if logger:
             logger.error(f"Failed to find compose files: {e}", exc_info=True)
         raise
 
-# Apply same fix to scan_all_compose_files function
 def scan_all_compose_files(compose_dir, extra_dirs, logger):
     """Scan for all compose files, returning relative paths"""
     try:
-        compose_files = []
-        search_dirs = [compose_dir] + [d for d in extra_dirs if d]
-        
-        # Only allow these specific filenames
-        valid_filenames = ['docker-compose.yml', 'docker-compose.yaml', 'compose.yml', 'compose.yaml']
-        
-        for search_dir in search_dirs:
-            if not os.path.exists(search_dir):
-                logger.warning(f"Scan directory doesn't exist: {search_dir}")
-                continue
-                
-            for root, dirs, files in os.walk(search_dir, topdown=True):
-                dirs[:] = [d for d in dirs if not d.startswith('.')]
-                for file in files:
-                    # Only include files that match exactly our valid filenames
-                    if file in valid_filenames:
-                        file_path = os.path.join(root, file)
-                        try:
-                            relative_path = os.path.relpath(file_path, compose_dir)
-                            relative_path = relative_path.replace(os.sep, '/')
-                            compose_files.append(relative_path)
-                            logger.debug(f"Found compose file during scan: {relative_path}")
-                        except ValueError as e:
-                            logger.warning(f"Failed to compute relative path for {file_path}: {e}")
-                            continue
-                            
-        logger.info(f"Total compose files found during scan: {len(compose_files)}")
+        compose_files = get_compose_files(compose_dir, extra_dirs, logger)
         get_compose_files_cached.cache_clear()
-        return sorted(compose_files)
+        return compose_files
     except Exception as e:
         logger.error(f"Failed to scan compose files: {e}", exc_info=True)
         raise
@@ -177,8 +127,7 @@ def resolve_compose_file_path(file_path, compose_dir, extra_dirs, logger):
 def extract_env_from_compose(compose_file_path, modify_compose=False, logger=None):
     """Extract environment variables from a compose file to create a .env file"""
     try:
-        with open(compose_file_path, 'r') as f:
-            compose_data = yaml.safe_load(f)
+        compose_data = load_compose(compose_file_path)
         env_vars = {}
         compose_modified = False
         if compose_data and 'services' in compose_data:
@@ -208,7 +157,8 @@ def extract_env_from_compose(compose_file_path, modify_compose=False, logger=Non
             env_content += f"{key}={value}\n"
         if modify_compose and compose_modified:
             with open(compose_file_path, 'w') as f:
-                yaml.dump(compose_data, f, sort_keys=False)
+                safe_dump(compose_data, f, sort_keys=False)
+            compose_cache.invalidate(compose_file_path)
         return env_content, compose_modified
     except Exception as e:
         if logger:
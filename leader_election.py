@@ -0,0 +1,125 @@
+# leader_election.py - Pick one gunicorn worker to run the background jobs
+
+import os
+import json
+import time
+import fcntl
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+LEADER_RETRY_INTERVAL = float(os.environ.get('LEADER_RETRY_INTERVAL', '10'))  # seconds
+
+
+class LeaderElection:
+    """Elects one process per METADATA_DIR with an exclusive flock on a lease file.
+
+    The lock is tied to the open file, so it is released by the kernel when the
+    leader exits or crashes and another worker takes over on its next attempt.
+    The leader refreshes a heartbeat in the file so other workers can report
+    who leads and since when.
+    """
+
+    def __init__(self, lock_path, retry_interval=LEADER_RETRY_INTERVAL):
+        self.lock_path = lock_path
+        self.retry_interval = retry_interval
+        self._fd = None
+        self._pid = None
+        self._since = None
+        self._listeners = []
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self):
+        """Try to become leader now and keep retrying in the background"""
+        self.try_acquire()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._worker, name='leader-election', daemon=True)
+            self._thread.start()
+
+    def add_listener(self, callback):
+        """Call callback() once this process becomes leader, or right away if it already is"""
+        with self._lock:
+            self._listeners.append(callback)
+            leading = self.is_leader()
+        if leading:
+            self._call(callback)
+
+    def is_leader(self):
+        # A forked child inherits the descriptor but not the leadership
+        return self._fd is not None and self._pid == os.getpid()
+
+    def try_acquire(self):
+        """Take the lease if nobody holds it; returns whether we lead"""
+        with self._lock:
+            if self.is_leader():
+                return True
+            try:
+                os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+                fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+            except OSError as e:
+                logger.error(f"Cannot open leader lock {self.lock_path}: {e}")
+                return False
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                os.close(fd)
+                return False
+            self._fd = fd
+            self._pid = os.getpid()
+            self._since = time.time()
+            self._write_heartbeat()
+            # Listeners added from here on see is_leader() and run themselves
+            listeners = list(self._listeners)
+
+        logger.info(f"Process {self._pid} is now leader for background jobs")
+        for callback in listeners:
+            self._call(callback)
+        return True
+
+    @staticmethod
+    def _call(callback):
+        try:
+            callback()
+        except Exception as e:
+            logger.error(f"Leader listener failed: {e}")
+
+    def release(self):
+        with self._lock:
+            if self._fd is None:
+                return
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+            self._pid = None
+
+    def leader_info(self):
+        """Contents of the lease file: pid, since and heartbeat of the current leader"""
+        try:
+            with open(self.lock_path, 'r') as f:
+                info = json.load(f)
+            info['is_self'] = info.get('pid') == os.getpid() and self.is_leader()
+            return info
+        except (OSError, ValueError):
+            return {}
+
+    def _write_heartbeat(self):
+        data = json.dumps({'pid': self._pid, 'since': self._since, 'heartbeat': time.time()}).encode()
+        os.ftruncate(self._fd, 0)
+        os.pwrite(self._fd, data, 0)
+
+    def _worker(self):
+        while True:
+            try:
+                if self.is_leader():
+                    with self._lock:
+                        self._write_heartbeat()
+                else:
+                    self.try_acquire()
+            except Exception as e:
+                logger.error(f"Leader election error: {e}")
+            time.sleep(self.retry_interval)
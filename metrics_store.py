@@ -0,0 +1,563 @@
+# metrics_store.py - In-memory ring-buffer time series for container and host metrics
+
+import os
+import re
+import math
+import time
+import logging
+import mmap
+import struct
+import threading
+from array import array
+from collections import OrderedDict
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# Values kept for every sample; sizes in MB as published by the stats collector
+METRICS = ('cpu_percent', 'memory_usage', 'block_read', 'block_write')
+
+# Comma separated "<resolution>:<span>" tiers, finest first
+METRICS_RETENTION = os.environ.get('METRICS_RETENTION', '5s:1h,1m:24h')
+
+# On-disk archive: one "<resolution>:<span>" tier per series file
+METRICS_ARCHIVE_ENABLED = os.environ.get('METRICS_ARCHIVE_ENABLED', 'true').lower() == 'true'
+METRICS_ARCHIVE_RETENTION = os.environ.get('METRICS_ARCHIVE_RETENTION', '5m:30d')
+METRICS_ARCHIVE_OPEN_FILES = int(os.environ.get('METRICS_ARCHIVE_OPEN_FILES', '256'))
+COMPACTION_INTERVAL = 3600  # seconds between archive compaction passes
+
+_DURATION_UNITS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_duration(value):
+    """Parse '90', '30s', '15m', '1h' or '7d' into seconds"""
+    match = re.fullmatch(r'\s*(\d+)\s*([smhd]?)\s*', str(value))
+    if not match:
+        raise ValueError(f"Invalid duration: {value}")
+    return int(match.group(1)) * _DURATION_UNITS[match.group(2) or 's']
+
+
+def parse_tiers(spec):
+    """Parse a retention spec into [(resolution_seconds, slots), ...] finest first"""
+    tiers = []
+    for part in spec.split(','):
+        if not part.strip():
+            continue
+        resolution, _, span = part.partition(':')
+        resolution = parse_duration(resolution)
+        span = parse_duration(span)
+        if resolution <= 0 or span < resolution:
+            raise ValueError(f"Invalid metrics tier: {part}")
+        tiers.append((resolution, span // resolution))
+    return sorted(tiers)
+
+
+def downsample(rows, resolution, range_seconds, points, metrics):
+    """Merge neighbouring (t, count, mins, maxs, sums) buckets so at most `points` remain"""
+    group = max(1, math.ceil(range_seconds / resolution / points))
+    merged = []
+    for row in rows:
+        slot_start = row[0] - row[0] % (resolution * group)
+        if merged and merged[-1][0] == slot_start:
+            _, count, mins, maxs, sums = merged[-1]
+            merged[-1] = (
+                slot_start,
+                count + row[1],
+                [min(a, b) for a, b in zip(mins, row[2])],
+                [max(a, b) for a, b in zip(maxs, row[3])],
+                [a + b for a, b in zip(sums, row[4])]
+            )
+        else:
+            merged.append((slot_start, row[1], list(row[2]), list(row[3]), list(row[4])))
+
+    result = []
+    for slot_start, count, mins, maxs, sums in merged:
+        point = {'t': slot_start}
+        for i, metric in enumerate(metrics):
+            point[metric] = {
+                'avg': round(sums[i] / count, 2) if count else 0,
+                'min': round(mins[i], 2),
+                'max': round(maxs[i], 2)
+            }
+        result.append(point)
+    return {'resolution': resolution * group, 'points': result}
+
+
+class RingTier:
+    """Fixed-size rollup buckets for one series at one resolution.
+
+    Slot i holds the bucket whose index (timestamp // resolution) is congruent
+    to i, so writing is O(1) and old buckets are overwritten in place. Each
+    bucket keeps count, min, max and sum for every metric in flat typed arrays,
+    which makes the memory cost per series fixed: slots * (6 + 12 * metrics) bytes.
+    """
+
+    def __init__(self, resolution, slots, width):
+        self.resolution = resolution
+        self.slots = slots
+        self.width = width
+        self.buckets = array('I', bytes(4 * slots))  # bucket index + 1, 0 = empty
+        self.counts = array('H', bytes(2 * slots))
+        self.mins = array('f', bytes(4 * slots * width))
+        self.maxs = array('f', bytes(4 * slots * width))
+        self.sums = array('f', bytes(4 * slots * width))
+
+    def add(self, timestamp, values):
+        bucket = int(timestamp // self.resolution)
+        slot = bucket % self.slots
+        base = slot * self.width
+        if self.buckets[slot] != bucket + 1:
+            self.buckets[slot] = bucket + 1
+            self.counts[slot] = 1
+            for i, value in enumerate(values):
+                self.mins[base + i] = self.maxs[base + i] = self.sums[base + i] = value
+            return
+        if self.counts[slot] < 65535:
+            self.counts[slot] += 1
+        for i, value in enumerate(values):
+            if value < self.mins[base + i]:
+                self.mins[base + i] = value
+            if value > self.maxs[base + i]:
+                self.maxs[base + i] = value
+            self.sums[base + i] += value
+
+    def buckets_between(self, start, end):
+        """[(bucket_start, count, mins, maxs, sums)] for buckets in [start, end], oldest first"""
+        first = int(start // self.resolution)
+        last = int(end // self.resolution)
+        if last - first >= self.slots:
+            first = last - self.slots + 1
+        rows = []
+        for bucket in range(first, last + 1):
+            slot = bucket % self.slots
+            if self.buckets[slot] != bucket + 1:
+                continue
+            base = slot * self.width
+            rows.append((
+                bucket * self.resolution,
+                self.counts[slot],
+                self.mins[base:base + self.width],
+                self.maxs[base:base + self.width],
+                self.sums[base:base + self.width]
+            ))
+        return rows
+
+
+class MetricsStore:
+    """Short-term metric history for containers and hosts.
+
+    Series are keyed by ('container', host, container_id) or ('host', host).
+    Every sample is rolled up into each retention tier at once, and queries
+    read from the finest tier that still covers the requested range.
+    """
+
+    def __init__(self, retention=METRICS_RETENTION, metrics=METRICS):
+        self.tiers = parse_tiers(retention)
+        self.metrics = metrics
+        self._series = {}  # key -> [RingTier, ...] matching self.tiers
+        self._lock = threading.Lock()
+        logger.info(f"Metrics store keeping {', '.join(f'{r}s x {n}' for r, n in self.tiers)} "
+                    f"({self.series_nbytes()} bytes per series)")
+
+    def record(self, key, sample, timestamp=None):
+        """Add one sample (dict with the metric names) to a series"""
+        timestamp = timestamp or sample.get('timestamp') or time.time()
+        values = [float(sample.get(m, 0) or 0) for m in self.metrics]
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = [RingTier(res, slots, len(self.metrics)) for res, slots in self.tiers]
+                self._series[key] = series
+            for tier in series:
+                tier.add(timestamp, values)
+
+    def record_sweep(self, host_name, samples, removed):
+        """Stats collector listener: store container samples and host totals"""
+        now = time.time()
+        totals = dict.fromkeys(self.metrics, 0.0)
+        for container_id, sample in samples.items():
+            self.record(('container', host_name, container_id), sample, now)
+            for metric in self.metrics:
+                totals[metric] += sample.get(metric, 0) or 0
+        self.record(('host', host_name), totals, now)
+        for container_id in removed:
+            self.drop(('container', host_name, container_id))
+
+    def drop(self, key):
+        with self._lock:
+            self._series.pop(key, None)
+
+    def drop_host(self, host_name):
+        with self._lock:
+            for key in [k for k in self._series if k[1] == host_name]:
+                del self._series[key]
+
+    def has(self, key):
+        with self._lock:
+            return key in self._series
+
+    def query(self, key, range_seconds, points=120, end=None):
+        """Downsampled series for the last range_seconds.
+
+        Returns {'resolution', 'points': [{'t', <metric>: {'avg', 'min', 'max'}}]}
+        with at most ``points`` entries, or None if the series is unknown.
+        """
+        end = end or time.time()
+        start = end - range_seconds
+        points = max(1, points)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                return None
+            # Finest tier whose span covers the range, else the coarsest one
+            index = len(self.tiers) - 1
+            for i, (resolution, slots) in enumerate(self.tiers):
+                if resolution * slots >= range_seconds:
+                    index = i
+                    break
+            resolution = self.tiers[index][0]
+            rows = series[index].buckets_between(start, end)
+
+        return downsample(rows, resolution, range_seconds, points, self.metrics)
+
+    def span(self):
+        """Longest range the in-memory tiers can answer, in seconds"""
+        return max(resolution * slots for resolution, slots in self.tiers)
+
+    def series_nbytes(self):
+        """Fixed memory cost of one series across all tiers"""
+        return sum(slots * (6 + 12 * len(self.metrics)) for _, slots in self.tiers)
+
+    def stats(self):
+        with self._lock:
+            count = len(self._series)
+        return {'series': count, 'bytes': count * self.series_nbytes()}
+
+
+class MetricsArchive:
+    """Persistent per-series metric history in fixed-record, memory-mapped files.
+
+    Each series is one file under ``directory`` holding a header followed by a
+    ring of ``slots`` records of (bucket start, count, min/avg/max per metric).
+    Like the in-memory tiers, a bucket always lands in the same slot, so the
+    file never grows and retention is enforced by overwriting. Files are mapped
+    on demand and only the pages touched by a write or query are read. Enough
+    mappings stay open for every series of a sweep (at least ``max_open``, at
+    most half the file descriptor limit); series beyond that are mapped for
+    one access at a time instead of evicting the others.
+
+    Only the writer (the worker running the stats collector) creates, migrates
+    or deletes files, and it builds new files under a temporary name before
+    moving them into place. Other workers map files read-only, skip files that
+    are not in the current layout and remap a file once it has been replaced.
+    Compaction deletes series that have not been written for a whole retention
+    period (removed containers) and rewrites files created with a different
+    retention setting.
+    """
+
+    MAGIC = b'CMA1'
+    VERSION = 1
+    HEADER = struct.Struct('<4sHHIIQ')  # magic, version, record size, resolution, slots, last write
+    HEADER_SIZE = 32
+
+    def __init__(self, directory, retention=METRICS_ARCHIVE_RETENTION, metrics=METRICS,
+                 max_open=METRICS_ARCHIVE_OPEN_FILES):
+        tiers = parse_tiers(retention)
+        if len(tiers) != 1:
+            raise ValueError(f"Metrics archive takes a single tier, got: {retention}")
+        self.resolution, self.slots = tiers[0]
+        self.directory = directory
+        self.metrics = metrics
+        self.max_open = max_open
+        self.record_struct = struct.Struct('<IH' + 'fff' * len(metrics))
+        self._maps = OrderedDict()  # path -> (mmap, writable, inode), least recently used first
+        self._sweep_series = {}  # host -> series written by its last sweep
+        self._fd_budget = max_open
+        if resource is not None:
+            soft_limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+            if soft_limit != resource.RLIM_INFINITY:
+                self._fd_budget = max(max_open, soft_limit // 2)
+        self._lock = threading.Lock()
+        self._last_compaction = 0
+        os.makedirs(directory, exist_ok=True)
+        logger.info(f"Metrics archive at {directory}: {self.resolution}s x {self.slots} "
+                    f"({self.file_size()} bytes per series)")
+
+    def file_size(self):
+        return self.HEADER_SIZE + self.slots * self.record_struct.size
+
+    def record(self, key, sample, timestamp=None):
+        """Fold one sample into its bucket of a series"""
+        timestamp = timestamp or sample.get('timestamp') or time.time()
+        triples = []
+        for metric in self.metrics:
+            value = float(sample.get(metric, 0) or 0)
+            triples.append((value, value, value))
+        path = self._path(key)
+        with self._lock:
+            mm = self._open(path, writable=True)
+            try:
+                self._merge(mm, timestamp, 1, triples)
+            finally:
+                self._release(path, mm)
+
+    def record_sweep(self, host_name, samples, removed):
+        """Stats collector listener: archive container samples and host totals.
+
+        History of removed containers is kept until compaction expires it.
+        """
+        now = time.time()
+        totals = dict.fromkeys(self.metrics, 0.0)
+        self._sweep_series[host_name] = len(samples) + 1
+        try:
+            for container_id, sample in samples.items():
+                self.record(('container', host_name, container_id), sample, now)
+                for metric in self.metrics:
+                    totals[metric] += sample.get(metric, 0) or 0
+            self.record(('host', host_name), totals, now)
+        except OSError as e:
+            logger.error(f"Failed to archive metrics for {host_name}: {e}")
+
+        if now - self._last_compaction > COMPACTION_INTERVAL:
+            self._last_compaction = now
+            self.compact()
+
+    def has(self, key):
+        return os.path.exists(self._path(key))
+
+    def query(self, key, range_seconds, points=120, end=None):
+        """Downsampled series for the last range_seconds, same shape as MetricsStore.query"""
+        end = end or time.time()
+        start = end - range_seconds
+        path = self._path(key)
+        with self._lock:
+            mm = self._open(path, writable=False)
+            if mm is None:
+                return None
+            try:
+                rows = self._read_rows(mm, start, end)
+            finally:
+                self._release(path, mm)
+        return downsample(rows, self.resolution, range_seconds, max(1, points), self.metrics)
+
+    def compact(self):
+        """Expire stale series and migrate files written with other settings"""
+        now = time.time()
+        expired = migrated = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                if name.endswith('.tmp'):
+                    # Left behind by a writer that died while building a file
+                    try:
+                        if now - os.path.getmtime(path) > COMPACTION_INTERVAL:
+                            os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                if not name.endswith('.bin'):
+                    continue
+                try:
+                    with open(path, 'rb') as f:
+                        header = self.HEADER.unpack(f.read(self.HEADER.size))
+                    if now - header[5] > self.resolution * self.slots:
+                        with self._lock:
+                            self._close(path)
+                            os.remove(path)
+                        expired += 1
+                    elif header[2:5] != (self.record_struct.size, self.resolution, self.slots):
+                        with self._lock:
+                            self._close(path)
+                            self._migrate(path)
+                        migrated += 1
+                except (OSError, struct.error) as e:
+                    logger.warning(f"Skipping metrics archive file {path}: {e}")
+            if root != self.directory and not os.listdir(root):
+                os.rmdir(root)
+        with self._lock:
+            for mm, writable, _ in self._maps.values():
+                if writable:
+                    mm.flush()
+        if expired or migrated:
+            logger.info(f"Metrics archive compaction: {expired} expired, {migrated} migrated")
+
+    def close(self):
+        with self._lock:
+            for path in list(self._maps):
+                self._close(path)
+
+    def _path(self, key):
+        host = re.sub(r'[^A-Za-z0-9_-]', '_', key[1])
+        name = f"{key[2]}.bin" if key[0] == 'container' else '_host.bin'
+        return os.path.join(self.directory, host, name)
+
+    def _open(self, path, writable):
+        """Mapping of a series file, or None when a reader finds none it can use.
+
+        The writer creates missing files and migrates ones in another layout;
+        readers leave both alone. A cached mapping is only reused while the
+        file at ``path`` is still the one it maps.
+        """
+        try:
+            inode = os.stat(path).st_ino
+        except FileNotFoundError:
+            inode = None
+
+        entry = self._maps.get(path)
+        if entry is not None:
+            mm, mapped_writable, mapped_inode = entry
+            if mapped_inode == inode and (mapped_writable or not writable):
+                self._maps.move_to_end(path)
+                return mm
+            self._close(path)
+
+        if inode is None:
+            if not writable:
+                return None
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.replace(self._new_file(path), path)
+
+        mapped = self._map(path, writable)
+        if mapped is None:
+            if not writable:
+                return None
+            self._migrate(path)
+            mapped = self._map(path, writable)
+            if mapped is None:
+                raise OSError(f"Unusable metrics archive file {path}")
+
+        mm, inode = mapped
+        if len(self._maps) < self._capacity():
+            self._maps[path] = (mm, writable, inode)
+        return mm
+
+    def _map(self, path, writable):
+        """(mmap, inode) of a file in the current layout, else None"""
+        try:
+            with open(path, 'r+b' if writable else 'rb') as f:
+                inode = os.fstat(f.fileno()).st_ino
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except FileNotFoundError:
+            return None
+        except ValueError:  # empty file
+            return None
+        try:
+            header = self.HEADER.unpack_from(mm, 0)
+        except struct.error:
+            header = None
+        if (len(mm) != self.file_size() or header is None or header[0] != self.MAGIC
+                or header[2:5] != (self.record_struct.size, self.resolution, self.slots)):
+            mm.close()
+            return None
+        return mm, inode
+
+    def _new_file(self, path):
+        """Write an empty series file next to path under a temporary name and return that name"""
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(self.HEADER.pack(self.MAGIC, self.VERSION, self.record_struct.size,
+                                     self.resolution, self.slots, 0).ljust(self.HEADER_SIZE, b'\0'))
+            f.truncate(self.file_size())
+        return temp_path
+
+    def _capacity(self):
+        """Mappings to keep open: every series of a sweep plus room for queries, within the fd budget"""
+        wanted = sum(self._sweep_series.values()) * 5 // 4
+        return min(max(self.max_open, wanted), self._fd_budget)
+
+    def _release(self, path, mm):
+        """Close a mapping that did not fit in the cache once it has been used"""
+        entry = self._maps.get(path)
+        if entry is None or entry[0] is not mm:
+            mm.close()
+
+    def _close(self, path):
+        entry = self._maps.pop(path, None)
+        if entry is not None:
+            entry[0].close()
+
+    def _merge(self, mm, timestamp, count, triples):
+        """Fold (min, avg, max) triples covering `count` samples into a bucket"""
+        bucket_start = int(timestamp // self.resolution) * self.resolution
+        offset = self.HEADER_SIZE + (bucket_start // self.resolution % self.slots) * self.record_struct.size
+        current = self.record_struct.unpack_from(mm, offset)
+        values = []
+        if current[0] != bucket_start or current[1] == 0:
+            total = count
+            for triple in triples:
+                values.extend(triple)
+        else:
+            old_count = current[1]
+            total = min(old_count + count, 65535)
+            for i, (low, avg, high) in enumerate(triples):
+                old_low, old_avg, old_high = current[2 + i * 3:5 + i * 3]
+                values.extend((
+                    min(old_low, low),
+                    (old_avg * old_count + avg * count) / (old_count + count),
+                    max(old_high, high)
+                ))
+        self.record_struct.pack_into(mm, offset, bucket_start, total, *values)
+        last_write = self.HEADER.unpack_from(mm, 0)[5]
+        if timestamp > last_write:
+            self.HEADER.pack_into(mm, 0, self.MAGIC, self.VERSION, self.record_struct.size,
+                                  self.resolution, self.slots, int(timestamp))
+
+    def _read_rows(self, mm, start, end):
+        """[(t, count, mins, maxs, sums)] for buckets in [start, end], oldest first"""
+        first = int(start // self.resolution)
+        last = int(end // self.resolution)
+        if last - first >= self.slots:
+            first = last - self.slots + 1
+        width = len(self.metrics)
+        rows = []
+        for bucket in range(first, last + 1):
+            offset = self.HEADER_SIZE + (bucket % self.slots) * self.record_struct.size
+            record = self.record_struct.unpack_from(mm, offset)
+            if record[0] != bucket * self.resolution or record[1] == 0:
+                continue
+            count = record[1]
+            values = record[2:]
+            rows.append((
+                record[0],
+                count,
+                [values[i * 3] for i in range(width)],
+                [values[i * 3 + 2] for i in range(width)],
+                [values[i * 3 + 1] * count for i in range(width)]
+            ))
+        return rows
+
+    def _migrate(self, path):
+        """Rewrite a series file written with a different layout or retention"""
+        with open(path, 'rb') as f:
+            data = f.read()
+        records = []
+        try:
+            magic, _, record_size, _, slots, last_write = self.HEADER.unpack_from(data, 0)
+            if magic == self.MAGIC and record_size == self.record_struct.size:
+                for slot in range(slots):
+                    record = self.record_struct.unpack_from(data, self.HEADER_SIZE + slot * record_size)
+                    if record[1]:
+                        records.append(record)
+        except struct.error:
+            pass
+
+        temp_path = self._new_file(path)
+        with open(temp_path, 'r+b') as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        try:
+            width = len(self.metrics)
+            cutoff = time.time() - self.resolution * self.slots
+            for record in sorted(records):
+                if record[0] < cutoff:
+                    continue
+                values = record[2:]
+                self._merge(mm, record[0], record[1], [tuple(values[i * 3:i * 3 + 3]) for i in range(width)])
+            mm.flush()
+        finally:
+            mm.close()
+        os.replace(temp_path, path)
+        logger.info(f"Migrated metrics archive file {path} ({len(records)} buckets read)")
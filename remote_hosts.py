@@ -1,13 +1,254 @@
 import docker
 import logging
+import requests
 import threading
 import time
 import json
 import os
+import random
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timezone
+from call_context import is_background_call
+from container_inventory import ContainerSnapshotBuilder, ContainerInventory, shareable_record
+from leader_election import LeaderElection
+from shared_cache import SharedCache, SHARED_CACHE_TTL
 
 logger = logging.getLogger(__name__)
 
+# Per-host deadline (seconds) for parallel fan-out queries
+FANOUT_TIMEOUT = float(os.environ.get('HOST_FANOUT_TIMEOUT', '8'))
+FANOUT_WORKERS = int(os.environ.get('HOST_FANOUT_WORKERS', '32'))
+
+HOST_POOL_SIZE = int(os.environ.get('HOST_POOL_SIZE', '16'))  # pooled connections per host
+HOST_MAX_CONCURRENCY = int(os.environ.get('HOST_MAX_CONCURRENCY', '6'))  # Docker API calls in flight per host
+HOST_MAX_QUEUE = int(os.environ.get('HOST_MAX_QUEUE', '10'))  # calls allowed to wait for a slot
+HOST_QUEUE_TIMEOUT = float(os.environ.get('HOST_QUEUE_TIMEOUT', '2'))  # seconds a call may wait
+HOST_RESERVED_SLOTS = int(os.environ.get('HOST_RESERVED_SLOTS', '2'))  # slots background work never takes
+BACKGROUND_QUEUE_TIMEOUT = 30  # seconds a background call waits for a slot
+HEALTH_CHECK_INTERVAL = 30  # seconds between pings of a healthy host
+HEALTH_FOLLOW_INTERVAL = 5  # seconds between reads of the leader's results
+HEALTH_TICK = 5  # seconds between looks for hosts that are due a check
+HEALTH_CHECK_WORKERS = int(os.environ.get('HEALTH_CHECK_WORKERS', '16'))
+HEALTH_CHECK_TIMEOUT = 15  # seconds to wait for one round of checks
+HEALTH_BACKOFF_BASE = 5  # seconds before the first retry of a failed host
+HEALTH_BACKOFF_MAX = float(os.environ.get('HEALTH_BACKOFF_MAX', '600'))
+HEALTH_FAILURE_THRESHOLD = 3  # consecutive failures that open the circuit
+HEALTH_STABLE_PERIOD = 300  # seconds a host must stay up before its failures are forgotten
+HEALTH_JITTER = 0.2  # +/- fraction applied to every delay
+
+SNAPSHOT_PUBLISH_INTERVAL = 1  # seconds between publishing changed inventories
+SNAPSHOT_REFRESH = 10  # republish unchanged inventories this often
+SNAPSHOT_MAX_AGE = 30  # followers ignore published snapshots older than this
+HOST_INFO_TTL = 30  # seconds a host's daemon info is served without revalidating
+HOST_INFO_MAX_STALE = 300  # seconds stale info may still be served while it refreshes
+HOST_INFO_FIELDS = (
+    'Name', 'ServerVersion', 'OperatingSystem', 'OSType', 'Architecture', 'KernelVersion',
+    'NCPU', 'MemTotal', 'Driver', 'CgroupVersion',
+    'Containers', 'ContainersRunning', 'ContainersPaused', 'ContainersStopped', 'Images'
+)
+
+def new_docker_client(url, timeout=10, pool_size=None):
+    """DockerClient whose connection pool holds pool_size keep-alive connections.
+
+    docker-py only passes max_pool_size to its unix/ssh adapters; tcp hosts use
+    requests' default adapter capped at 10 connections, so swap in one sized
+    for parallel fan-out and stats sampling.
+    """
+    pool_size = int(pool_size or HOST_POOL_SIZE)
+    client = docker.DockerClient(base_url=url, timeout=timeout, max_pool_size=pool_size)
+    api = client.api
+    for scheme in ('http://', 'https://'):
+        if api.base_url.startswith(scheme) and type(api.adapters.get(scheme)) is requests.adapters.HTTPAdapter:
+            adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            api.mount(scheme, adapter)
+            if getattr(api, '_custom_adapter', None) is not None:
+                api._custom_adapter = adapter
+    return client
+
+
+def pool_stats(client):
+    """Connection reuse figures for a client's urllib3 pools in this process"""
+    stats = {'connections_opened': 0, 'requests': 0, 'idle': 0, 'pool_size': 0}
+    adapters = {id(a): a for a in client.api.adapters.values()}.values()
+    for adapter in adapters:
+        pools = getattr(adapter, 'pools', None)
+        if pools is None:
+            pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats['connections_opened'] += pool.num_connections
+            stats['requests'] += pool.num_requests
+            if pool.pool is not None:
+                stats['pool_size'] += pool.pool.maxsize
+                # The queue is pre-filled with None placeholders for unopened slots
+                stats['idle'] += sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    if stats['requests']:
+        stats['reuse_ratio'] = round(1 - stats['connections_opened'] / stats['requests'], 3)
+    else:
+        stats['reuse_ratio'] = None
+    return stats
+
+
+class HostBusyError(Exception):
+    """Raised instead of calling a host whose bulkhead is full"""
+
+    def __init__(self, host_name, message):
+        super().__init__(message)
+        self.host_name = host_name
+
+
+class HostBulkhead:
+    """Caps concurrent Docker API calls to one host within this process.
+
+    Up to limit calls run at once and up to max_queue more wait at most
+    queue_timeout seconds for a slot; anything beyond that fails immediately
+    with HostBusyError, so a hung daemon ties up a bounded number of threads
+    and requests for other hosts keep flowing. Background calls hold at most
+    limit - reserved slots and wait in a queue of their own, so collectors
+    working through a slow host never crowd out interactive requests.
+    """
+
+    def __init__(self, host_name, limit=HOST_MAX_CONCURRENCY, max_queue=HOST_MAX_QUEUE,
+                 queue_timeout=HOST_QUEUE_TIMEOUT, reserved=HOST_RESERVED_SLOTS):
+        self.host_name = host_name
+        self.limit = limit
+        self.background_limit = max(1, limit - reserved)
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.background_active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, background=False):
+        if background:
+            self._acquire_background()
+            return
+        with self._cond:
+            if self.active < self.limit:
+                self.active += 1
+                return
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise HostBusyError(self.host_name, f"Host {self.host_name} is busy: "
+                                    f"{self.active} requests running and {self.waiting} queued")
+            self.waiting += 1
+            try:
+                deadline = time.time() + self.queue_timeout
+                while self.active >= self.limit:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise HostBusyError(self.host_name, f"Host {self.host_name} is busy: "
+                                            f"no request slot freed up within {self.queue_timeout}s")
+                    self._cond.wait(remaining)
+                self.active += 1
+            finally:
+                self.waiting -= 1
+
+    def _acquire_background(self):
+        with self._cond:
+            deadline = time.time() + BACKGROUND_QUEUE_TIMEOUT
+            while self.active >= self.limit or self.background_active >= self.background_limit:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise HostBusyError(self.host_name, f"Host {self.host_name} is busy: "
+                                        f"no background slot freed up within {BACKGROUND_QUEUE_TIMEOUT}s")
+                self._cond.wait(remaining)
+            self.active += 1
+            self.background_active += 1
+
+    def release(self, background=False):
+        with self._cond:
+            self.active -= 1
+            if background:
+                self.background_active -= 1
+            # Interactive and background callers wait on the same condition
+            self._cond.notify_all()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    def stats(self):
+        return {
+            'limit': self.limit,
+            'background_limit': self.background_limit,
+            'active': self.active,
+            'background_active': self.background_active,
+            'waiting': self.waiting,
+            'rejected': self.rejected
+        }
+
+
+def _jitter(delay):
+    return delay * random.uniform(1 - HEALTH_JITTER, 1 + HEALTH_JITTER)
+
+
+class HostHealth:
+    """Health check schedule and circuit breaker for one host.
+
+    closed: checked every HEALTH_CHECK_INTERVAL; early failures retry sooner.
+    open: after HEALTH_FAILURE_THRESHOLD consecutive failures the host is left
+    alone for an exponentially growing, jittered backoff.
+    half_open: when the backoff expires a single probe decides between closing
+    the circuit and reopening it with a doubled delay.
+
+    Failures are only forgotten once the host has stayed up for
+    HEALTH_STABLE_PERIOD, so a flapping host keeps its backoff and its
+    reconnects stay rate limited.
+    """
+
+    def __init__(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.next_check = 0
+        self.checking = False
+        self.last_error = None
+        self.healthy_since = None
+
+    def due(self, now):
+        if self.checking or now < self.next_check:
+            return False
+        if self.state == 'open':
+            self.state = 'half_open'
+        return True
+
+    def record_success(self, now):
+        if self.healthy_since is None:
+            self.healthy_since = now
+        if now - self.healthy_since >= HEALTH_STABLE_PERIOD:
+            self.failures = 0
+        self.state = 'closed'
+        self.last_error = None
+        self.next_check = now + _jitter(HEALTH_CHECK_INTERVAL)
+
+    def record_failure(self, now, error):
+        self.failures += 1
+        self.healthy_since = None
+        self.last_error = str(error)
+        delay = min(HEALTH_BACKOFF_MAX, HEALTH_BACKOFF_BASE * 2 ** min(self.failures - 1, 20))
+        if self.state == 'half_open' or self.failures >= HEALTH_FAILURE_THRESHOLD:
+            self.state = 'open'
+        else:
+            delay = min(delay, HEALTH_CHECK_INTERVAL)
+        self.next_check = now + _jitter(delay)
+
+    def to_dict(self):
+        return {
+            'state': self.state,
+            'failures': self.failures,
+            'next_check': self.next_check,
+            'last_error': self.last_error
+        }
+
+
 class HostManager:
     def __init__(self, metadata_dir=None):  
         if metadata_dir is None:
@@ -20,14 +261,41 @@ class HostManager:
         self.current_host = 'local'
         self.metadata_dir = metadata_dir
         self.hosts_file = os.path.join(metadata_dir, 'docker_hosts.json')
+        self.health_file = os.path.join(metadata_dir, 'host_health.json')
+        self._health_file_mtime = 0
         self._lock = threading.Lock()
-        
+        self.snapshot_builder = ContainerSnapshotBuilder()
+        self.inventory = ContainerInventory(self.snapshot_builder, self.get_client)
+        self._fanout_executor = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix='host-fanout')
+        self._status_listeners = []
+        self._bulkheads = {}  # host -> HostBulkhead shared by every client of that host
+        self._connecting = set()  # saved hosts not probed yet since startup
+        self._started_at = time.time()
+        self._health = {}  # host -> HostHealth, driven by the leader
+        self.health_info = {}  # host -> last known HostHealth.to_dict()
+        self._health_executor = ThreadPoolExecutor(max_workers=HEALTH_CHECK_WORKERS, thread_name_prefix='health-check')
+
+        # Only one worker process pings and watches hosts; the others follow
+        # its results through the shared cache
+        self.shared_cache = SharedCache(os.path.join(metadata_dir, 'shared_cache.db'))
+        self._dirty_snapshots = set()
+        self._published_at = {}
+        self._publisher = None
+        self.inventory.add_listener(self._mark_snapshot_dirty)
+        self._host_info = {}  # host -> {'fetched_at', 'info'} trimmed to HOST_INFO_FIELDS
+        self._info_refreshing = set()
+        self._info_pending = set()  # hosts that changed while their refresh was running
+        self.inventory.add_listener(self._expire_host_info)
+        self.leader = LeaderElection(os.path.join(metadata_dir, 'leader.lock'))
+        self.leader.start()
+        self.leader.add_listener(self._on_leadership)  # right away if start() won the lease
+
         # Initialize with local Docker
         self._initialize_local_docker()
         
-        # Load saved hosts
+        # Load saved hosts; they are probed by the health checker in the background
         self._load_hosts_from_file()
-        
+
         # Start health check thread
         self._start_health_checker()
     
@@ -43,7 +311,7 @@ class HostManager:
             local_client = None
             for socket_path in socket_paths:
                 try:
-                    local_client = docker.DockerClient(base_url=socket_path, timeout=10)
+                    local_client = new_docker_client(socket_path, pool_size=os.environ.get('LOCAL_POOL_SIZE'))
                     local_client.ping()
                     logger.info(f"Connected to local Docker at {socket_path}")
                     break
@@ -52,7 +320,7 @@ class HostManager:
                     continue
             
             if local_client:
-                self.clients['local'] = local_client
+                self.clients['local'] = self._guard_client('local', local_client)
                 self.host_configs['local'] = {
                     'type': 'local',
                     'url': socket_paths[0],
@@ -61,6 +329,7 @@ class HostManager:
                 }
                 self.connection_status['local'] = True
                 self.last_health_check['local'] = time.time()
+                self._watch_host('local')
             else:
                 logger.error("Failed to connect to local Docker")
                 raise Exception("Could not connect to local Docker daemon")
@@ -79,12 +348,10 @@ class HostManager:
                 for host_name, config in saved_hosts.items():
                     if host_name != 'local':  # Don't override local config
                         self.host_configs[host_name] = config
-                        # Try to connect to saved hosts
-                        if self._test_connection(config):
-                            self._create_client(host_name, config)
-                        else:
-                            self.connection_status[host_name] = False
-                            logger.warning(f"Saved host {host_name} is not reachable")
+                        self.connection_status[host_name] = False
+                        self._connecting.add(host_name)
+                if self._connecting:
+                    logger.info(f"Connecting to {len(self._connecting)} saved host(s) in the background")
         except Exception as e:
             logger.error(f"Error loading hosts from file: {e}")
     
@@ -102,7 +369,7 @@ class HostManager:
         except Exception as e:
             logger.error(f"Error saving hosts to file: {e}")
     
-    def add_host(self, name, url, description=None):
+    def add_host(self, name, url, description=None, pool_size=None):
         """Add and test new Docker host connection"""
         with self._lock:
             if name in self.host_configs:
@@ -114,17 +381,17 @@ class HostManager:
                 'name': description or name,
                 'added_at': datetime.now(timezone.utc).isoformat()
             }
+            if pool_size:
+                config['pool_size'] = int(pool_size)
             
-            if self._test_connection(config):
-                if self._create_client(name, config):
-                    self.host_configs[name] = config
-                    self.connection_status[name] = True
-                    self.last_health_check[name] = time.time()
-                    self._save_hosts_to_file()
-                    logger.info(f"Successfully added host {name}")
-                    return True, f"Host {name} added successfully"
-                else:
-                    return False, f"Failed to create client for {name}"
+            # _create_client pings through the client it keeps, so no separate test client
+            if self._create_client(name, config):
+                self.host_configs[name] = config
+                self._set_connection_status(name, True)
+                self.last_health_check[name] = time.time()
+                self._save_hosts_to_file()
+                logger.info(f"Successfully added host {name}")
+                return True, f"Host {name} added successfully"
             else:
                 return False, f"Could not connect to {name} at {url}"
     
@@ -151,7 +418,13 @@ class HostManager:
                 del self.connection_status[name]
             if name in self.last_health_check:
                 del self.last_health_check[name]
-            
+            self._health.pop(name, None)
+            self.health_info.pop(name, None)
+            self._connecting.discard(name)
+            self._bulkheads.pop(name, None)
+            self._host_info.pop(name, None)
+            self.inventory.unwatch(name)
+
             # Switch to local if this was current host
             if self.current_host == name:
                 self.current_host = 'local'
@@ -185,7 +458,228 @@ class HostManager:
             return None  # Don't fall back, return None
         
         return self.clients[target_host]
-    
+
+    def _guard_client(self, host_name, client):
+        """Route every HTTP request the client makes through the host's bulkhead.
+
+        Only sending the request and reading the response headers holds a
+        slot; streamed bodies (events, logs) are read outside it.
+        """
+        bulkhead = self._bulkheads.get(host_name)
+        if bulkhead is None:
+            bulkhead = self._bulkheads[host_name] = HostBulkhead(host_name)
+        send = client.api.send
+
+        def guarded_send(request, **kwargs):
+            background = is_background_call()
+            bulkhead.acquire(background)
+            try:
+                return send(request, **kwargs)
+            finally:
+                bulkhead.release(background)
+
+        client.api.send = guarded_send
+        return client
+
+    def add_status_listener(self, callback):
+        """Call callback(host_name, connected) whenever a host's connectivity flips"""
+        self._status_listeners.append(callback)
+
+    def _set_connection_status(self, host_name, connected):
+        previous = self.connection_status.get(host_name)
+        self.connection_status[host_name] = connected
+        if previous == connected:
+            return
+        for callback in self._status_listeners:
+            try:
+                callback(host_name, connected)
+            except Exception as e:
+                logger.error(f"Host status listener failed for {host_name}: {e}")
+
+    def get_daemon_info(self, host_name, fetch=True):
+        """Daemon info for a host, served stale-while-revalidate.
+
+        The leader's health checker refreshes every connected host and shares
+        the result, so this is normally a memory or shared-cache hit. Info older
+        than HOST_INFO_TTL is still returned while one background refresh runs;
+        only a host with no usable info at all is asked synchronously (unless
+        fetch is False).
+        """
+        now = time.time()
+        entry = self._host_info.get(host_name)
+        if entry is None or now - entry['fetched_at'] > HOST_INFO_TTL:
+            shared = self.shared_cache.get(f"info:{host_name}", max_age=HOST_INFO_MAX_STALE)
+            if shared and (entry is None or shared['fetched_at'] > entry['fetched_at']):
+                entry = self._host_info[host_name] = shared
+
+        if entry is not None and now - entry['fetched_at'] <= HOST_INFO_MAX_STALE:
+            if now - entry['fetched_at'] > HOST_INFO_TTL:
+                self._revalidate_host_info(host_name)
+            return entry['info']
+
+        client = self.get_client(host_name)
+        if client is None or not fetch:
+            return entry['info'] if entry else None
+        return self._refresh_host_info(host_name, client)
+
+    def _refresh_host_info(self, host_name, client):
+        info = client.info()
+        trimmed = {key: info.get(key) for key in HOST_INFO_FIELDS}
+        entry = {'fetched_at': time.time(), 'info': trimmed}
+        self._host_info[host_name] = entry
+        self.shared_cache.set(f"info:{host_name}", entry)
+        return trimmed
+
+    def _revalidate_host_info(self, host_name):
+        """Refresh a host's info in the background, once at a time"""
+        if host_name in self._info_refreshing:
+            self._info_pending.add(host_name)
+            return
+        client = self.get_client(host_name)
+        if client is None:
+            return
+        self._info_refreshing.add(host_name)
+
+        def refresh():
+            try:
+                while True:
+                    self._info_pending.discard(host_name)
+                    self._refresh_host_info(host_name, client)
+                    if host_name not in self._info_pending:
+                        break
+            except Exception as e:
+                logger.debug(f"Background info refresh failed for {host_name}: {e}")
+            finally:
+                self._info_refreshing.discard(host_name)
+
+        self._health_executor.submit(refresh)
+
+    def _expire_host_info(self, host_name, change, record):
+        # Container counts changed: keep serving the old info while it refreshes
+        if host_name in self._host_info:
+            self._revalidate_host_info(host_name)
+
+    def get_container_snapshot(self, host_name):
+        """Get container records for a host.
+
+        The leader answers from its event-fed inventory, other workers from the
+        snapshot the leader published; a live snapshot is the fallback.
+        """
+        client = self.get_client(host_name)
+        if not client:
+            raise Exception(f"Host {host_name} not available")
+        records = self.inventory.get_records(host_name)
+        if records is not None:
+            return records
+        records = self.shared_cache.get(f"containers:{host_name}", max_age=SNAPSHOT_MAX_AGE)
+        if records is not None:
+            return records
+        return self.snapshot_builder.build(client, host_name)
+
+    def _watch_host(self, host_name):
+        """Keep an event subscription to the host, in the leader process only"""
+        if self.leader.is_leader():
+            self.inventory.watch(host_name)
+
+    def _on_leadership(self):
+        """Take over watching and publishing when this process becomes leader"""
+        for host_name in list(self.clients):
+            self.inventory.watch(host_name)
+        self._start_snapshot_publisher()
+
+    def _mark_snapshot_dirty(self, host_name, change, record):
+        self._dirty_snapshots.add(host_name)
+
+    def _start_snapshot_publisher(self):
+        """Publish inventories to the shared cache for the other workers"""
+        if self._publisher is not None:
+            return
+
+        def publisher_worker():
+            while True:
+                try:
+                    self._publish_snapshots()
+                except Exception as e:
+                    logger.error(f"Snapshot publisher error: {e}")
+                time.sleep(SNAPSHOT_PUBLISH_INTERVAL)
+
+        self._publisher = threading.Thread(target=publisher_worker, name='snapshot-publisher', daemon=True)
+        self._publisher.start()
+        logger.info("Started container snapshot publisher")
+
+    def _publish_snapshots(self):
+        now = time.time()
+        for host_name in list(self.clients):
+            dirty = host_name in self._dirty_snapshots
+            if not dirty and now - self._published_at.get(host_name, 0) < SNAPSHOT_REFRESH:
+                continue
+            records = self.inventory.get_records(host_name)
+            if records is None:
+                continue
+            self._dirty_snapshots.discard(host_name)
+            self.shared_cache.set(f"containers:{host_name}", [shareable_record(r) for r in records])
+            self._published_at[host_name] = now
+
+    def fan_out(self, func, timeout=None, cache_key=None):
+        """Run func(host_name, client) on every connected host in parallel.
+
+        Returns (results, report). results maps host -> return value for the hosts
+        that answered within the deadline; report maps every queried host to
+        {'ok', 'elapsed_ms', 'error'}. A slow or failing host only costs its own
+        entry, so the caller can still answer with partial results.
+
+        With a cache_key, each host's result is shared between worker processes
+        for SHARED_CACHE_TTL seconds under "<cache_key>:<host>".
+        """
+        deadline = FANOUT_TIMEOUT if timeout is None else timeout
+        futures = {}
+        for host_name in list(self.host_configs):
+            if not self.connection_status.get(host_name, False):
+                continue
+            client = self.clients.get(host_name)
+            if client is None:
+                continue
+            call = func
+            if cache_key:
+                call = self._shared_call(func, f"{cache_key}:{host_name}")
+            futures[host_name] = self._fanout_executor.submit(self._timed_call, call, host_name, client)
+
+        done, _ = wait(list(futures.values()), timeout=deadline)
+
+        results = {}
+        report = {}
+        for host_name, future in futures.items():
+            if future not in done:
+                logger.warning(f"Host {host_name} did not answer {func.__name__} within {deadline}s")
+                report[host_name] = {
+                    'ok': False,
+                    'elapsed_ms': round(deadline * 1000, 1),
+                    'error': f'Timed out after {deadline}s'
+                }
+                continue
+            elapsed_ms, value, error = future.result()
+            report[host_name] = {'ok': error is None, 'elapsed_ms': elapsed_ms, 'error': error}
+            if error is None:
+                results[host_name] = value
+        return results, report
+
+    def _shared_call(self, func, key):
+        """Wrap a fan-out function with a read-through lookup in the shared cache"""
+        def shared(host_name, client):
+            return self.shared_cache.get_or_compute(key, SHARED_CACHE_TTL, lambda: func(host_name, client))
+        shared.__name__ = func.__name__
+        return shared
+
+    def _timed_call(self, func, host_name, client):
+        """Run one fan-out call, returning (elapsed_ms, value, error)"""
+        start = time.time()
+        try:
+            value = func(host_name, client)
+            return round((time.time() - start) * 1000, 1), value, None
+        except Exception as e:
+            logger.error(f"{func.__name__} failed on host {host_name}: {e}")
+            return round((time.time() - start) * 1000, 1), None, str(e)
+
     def get_all_containers(self):
         """Get containers from all connected hosts"""
         all_containers = []
@@ -200,7 +694,7 @@ class HostManager:
                     all_containers.extend(containers)
                 except Exception as e:
                     logger.error(f"Failed to get containers from host {host_name}: {e}")
-                    self.connection_status[host_name] = False
+                    self._set_connection_status(host_name, False)
         
         return all_containers
     
@@ -215,8 +709,19 @@ class HostManager:
                 'type': config.get('type', 'unknown'),
                 'connected': self.connection_status.get(host_name, False),
                 'last_check': self.last_health_check.get(host_name, 0),
+                'connecting': host_name in self._connecting,
+                'health': self.health_info.get(host_name),
                 'current': host_name == self.current_host
             }
+            bulkhead = self._bulkheads.get(host_name)
+            if bulkhead is not None:
+                status[host_name]['bulkhead'] = bulkhead.stats()
+            client = self.clients.get(host_name)
+            if client is not None:
+                try:
+                    status[host_name]['pool'] = pool_stats(client)
+                except Exception as e:
+                    logger.debug(f"Could not read connection pool stats for {host_name}: {e}")
         return status
     
     def get_connected_hosts(self):
@@ -232,7 +737,16 @@ class HostManager:
         return self._test_connection(config)
     
     def _test_connection(self, config):
-        """Test Docker host connectivity"""
+        """Test Docker host connectivity, through the pooled client if we have one"""
+        for host_name, host_config in list(self.host_configs.items()):
+            client = self.clients.get(host_name)
+            if client is not None and host_config.get('url') == config['url']:
+                try:
+                    client.ping()
+                    return True
+                except Exception as e:
+                    logger.debug(f"Connection test failed for {config['url']}: {e}")
+                    return False
         try:
             test_client = docker.DockerClient(base_url=config['url'], timeout=5)
             test_client.ping()
@@ -245,9 +759,10 @@ class HostManager:
     def _create_client(self, host_name, config):
         """Create and store Docker client"""
         try:
-            client = docker.DockerClient(base_url=config['url'], timeout=10)
+            client = new_docker_client(config['url'], pool_size=config.get('pool_size'))
             client.ping()  # Verify connection
-            self.clients[host_name] = client
+            self.clients[host_name] = self._guard_client(host_name, client)
+            self._watch_host(host_name)
             return True
         except Exception as e:
             logger.error(f"Failed to create client for {host_name}: {e}")
@@ -257,47 +772,136 @@ class HostManager:
         """Start background health check thread"""
         def health_check_worker():
             while True:
-                try:
-                    self._perform_health_check()
-                except Exception as e:
-                    logger.error(f"Health check error: {e}")
-                time.sleep(30)  # Check every 30 seconds
+                if self.leader.is_leader():
+                    try:
+                        if self._perform_health_check():
+                            self._save_health_status()
+                    except Exception as e:
+                        logger.error(f"Health check error: {e}")
+                    time.sleep(HEALTH_TICK)
+                else:
+                    try:
+                        self._apply_shared_health_status()
+                    except Exception as e:
+                        logger.error(f"Failed to read shared host health: {e}")
+                    time.sleep(HEALTH_FOLLOW_INTERVAL)
         
         health_thread = threading.Thread(target=health_check_worker, daemon=True)
         health_thread.start()
         logger.info("Started health check thread")
     
-    def _perform_health_check(self):
-        """Check health of all host connections"""
-        current_time = time.time()
-        
-        for host_name, config in self.host_configs.items():
-            try:
-                if host_name in self.clients:
-                    # Test existing connection
-                    self.clients[host_name].ping()
-                    self.connection_status[host_name] = True
-                    self.last_health_check[host_name] = current_time
-                else:
-                    # Try to reconnect
-                    if self._test_connection(config):
-                        if self._create_client(host_name, config):
-                            self.connection_status[host_name] = True
-                            self.last_health_check[host_name] = current_time
-                            logger.info(f"Reconnected to host {host_name}")
-                    else:
-                        self.connection_status[host_name] = False
-            except Exception as e:
-                logger.warning(f"Health check failed for {host_name}: {e}")
-                self.connection_status[host_name] = False
-                
-                # Try to reconnect
+    def _save_health_status(self):
+        """Publish the leader's health check results for the other workers"""
+        status = {
+            'updated': time.time(),
+            'hosts': {
+                name: {
+                    'connected': self.connection_status.get(name, False),
+                    'last_check': self.last_health_check.get(name, 0),
+                    'health': self.health_info.get(name)
+                }
+                for name in list(self.host_configs)
+            }
+        }
+        tmp_file = f"{self.health_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w') as f:
+            json.dump(status, f)
+        os.replace(tmp_file, self.health_file)
+
+    def _apply_shared_health_status(self):
+        """Follow the leader's health check results instead of pinging every host"""
+        try:
+            mtime = os.stat(self.health_file).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._health_file_mtime:
+            return
+        self._health_file_mtime = mtime
+
+        with open(self.health_file, 'r') as f:
+            status = json.load(f)
+        hosts = status.get('hosts', {})
+        # Results saved before this process started may predate a restart
+        current = status.get('updated', 0) >= self._started_at
+
+        for host_name, config in list(self.host_configs.items()):
+            entry = hosts.get(host_name)
+            if entry is None:
+                continue
+            if current:
+                self._connecting.discard(host_name)
+            self.last_health_check[host_name] = entry.get('last_check', 0)
+            self.health_info[host_name] = entry.get('health')
+            if entry.get('connected'):
                 if host_name in self.clients:
+                    self._set_connection_status(host_name, True)
+                elif self._create_client(host_name, config):
+                    self._set_connection_status(host_name, True)
+                    logger.info(f"Reconnected to host {host_name}")
+            else:
+                self._set_connection_status(host_name, False)
+                client = self.clients.pop(host_name, None)
+                if client:
                     try:
-                        self.clients[host_name].close()
+                        client.close()
                     except Exception:
                         pass
-                    del self.clients[host_name]
+
+    def _perform_health_check(self):
+        """Check every host that is due, in parallel; returns whether any was checked"""
+        now = time.time()
+        futures = []
+        for host_name, config in list(self.host_configs.items()):
+            health = self._health.setdefault(host_name, HostHealth())
+            if health.due(now):
+                health.checking = True
+                futures.append(self._health_executor.submit(self._check_host, host_name, config, health))
+        if not futures:
+            return False
+        wait(futures, timeout=HEALTH_CHECK_TIMEOUT)
+        return True
+
+    def _check_host(self, host_name, config, health):
+        """Ping a host (or reconnect it) and feed the result to its circuit"""
+        try:
+            client = self.clients.get(host_name)
+            if client is not None:
+                client.ping()
+            elif self._create_client(host_name, config):
+                logger.info(f"Reconnected to host {host_name}")
+            else:
+                raise Exception("reconnect failed")
+            health.record_success(time.time())
+            self.last_health_check[host_name] = time.time()
+            self._set_connection_status(host_name, True)
+            try:
+                self._refresh_host_info(host_name, self.clients[host_name])
+            except Exception as e:
+                logger.debug(f"Could not refresh info for {host_name}: {e}")
+        except HostBusyError as e:
+            # Saturated by other calls: inconclusive, look again next round
+            logger.debug(f"Skipped health check for {host_name}: {e}")
+            if health.state == 'half_open':
+                health.state = 'open'
+            health.next_check = time.time() + _jitter(HEALTH_CHECK_INTERVAL)
+        except Exception as e:
+            health.record_failure(time.time(), e)
+            if health.state == 'open':
+                logger.warning(f"Health check failed for {host_name} ({health.failures} in a row), "
+                               f"next attempt in {round(health.next_check - time.time())}s: {e}")
+            else:
+                logger.warning(f"Health check failed for {host_name}: {e}")
+            self._set_connection_status(host_name, False)
+            client = self.clients.pop(host_name, None)
+            if client is not None:
+                try:
+                    client.close()
+                except Exception:
+                    pass
+        finally:
+            health.checking = False
+            self.health_info[host_name] = health.to_dict()
+            self._connecting.discard(host_name)
 
 # Global instance
 host_manager = HostManager()
\ No newline at end of file
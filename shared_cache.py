@@ -0,0 +1,153 @@
+# shared_cache.py - Cache and event log shared by all gunicorn workers (SQLite WAL)
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+SHARED_CACHE_TTL = float(os.environ.get('SHARED_CACHE_TTL', '10'))  # seconds for cached host lists
+EVENT_RETENTION = 120  # seconds relayed events are kept for followers
+
+
+class SharedCache:
+    """Small key/value store plus event log in one SQLite database in WAL mode.
+
+    WAL lets every worker read while one writes, so a cache hit is a single
+    indexed lookup in whichever process serves the request. Values are stored
+    as JSON. The cache is best effort: any SQLite error is logged and treated
+    as a miss, so callers always fall back to asking Docker directly.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._last_prune = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            conn = self._conn()
+            conn.execute('CREATE TABLE IF NOT EXISTS cache ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, updated REAL NOT NULL)')
+            conn.execute('CREATE TABLE IF NOT EXISTS events ('
+                         'id INTEGER PRIMARY KEY AUTOINCREMENT, created REAL NOT NULL, '
+                         'event TEXT NOT NULL, data TEXT NOT NULL, origin INTEGER NOT NULL DEFAULT 0)')
+            columns = [row[1] for row in conn.execute('PRAGMA table_info(events)')]
+            if 'origin' not in columns:
+                conn.execute('ALTER TABLE events ADD COLUMN origin INTEGER NOT NULL DEFAULT 0')
+        except sqlite3.Error as e:
+            logger.error(f"Failed to initialize shared cache at {path}: {e}")
+
+    def _conn(self):
+        # One connection per thread and process; never reuse one across fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, key, max_age=None):
+        """Cached value, or None if missing or older than max_age seconds"""
+        try:
+            row = self._conn().execute('SELECT value, updated FROM cache WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache read failed for {key}: {e}")
+            return None
+        if row is None or (max_age is not None and time.time() - row[1] > max_age):
+            return None
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        try:
+            self._conn().execute(
+                'INSERT OR REPLACE INTO cache (key, value, updated) VALUES (?, ?, ?)',
+                (key, json.dumps(value, separators=(',', ':'), default=str), time.time())
+            )
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache write failed for {key}: {e}")
+
+    def update(self, key, change):
+        """Atomically replace a value with change(current value or None).
+
+        Runs in one write transaction, so read-modify-write cycles of several
+        workers cannot interleave. change returns the new value, or None to
+        keep the current one. Returns the stored value, None on failure.
+        """
+        try:
+            conn = self._conn()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT value FROM cache WHERE key = ?', (key,)).fetchone()
+                current = json.loads(row[0]) if row else None
+                value = change(current)
+                if value is not None:
+                    conn.execute('INSERT OR REPLACE INTO cache (key, value, updated) VALUES (?, ?, ?)',
+                                 (key, json.dumps(value, separators=(',', ':'), default=str), time.time()))
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache update failed for {key}: {e}")
+            return None
+        return current if value is None else value
+
+    def delete(self, key):
+        try:
+            self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache delete failed for {key}: {e}")
+
+    def delete_prefix(self, prefix):
+        try:
+            self._conn().execute('DELETE FROM cache WHERE substr(key, 1, ?) = ?', (len(prefix), prefix))
+        except sqlite3.Error as e:
+            logger.warning(f"Shared cache invalidation failed for {prefix}: {e}")
+
+    def get_or_compute(self, key, ttl, compute):
+        """Return a fresh cached value or compute, store and return it"""
+        value = self.get(key, max_age=ttl)
+        if value is None:
+            value = compute()
+            self.set(key, value)
+        return value
+
+    def append_event(self, event, data):
+        """Add an event to the log other workers relay to their stream clients.
+
+        Events are tagged with the pid of the writing process, which has
+        already delivered them to its own clients.
+        """
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute('INSERT INTO events (created, event, data, origin) VALUES (?, ?, ?, ?)',
+                         (now, event, json.dumps(data, separators=(',', ':'), default=str), os.getpid()))
+            if now - self._last_prune > EVENT_RETENTION / 2:
+                self._last_prune = now
+                conn.execute('DELETE FROM events WHERE created < ?', (now - EVENT_RETENTION,))
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to append shared event {event}: {e}")
+
+    def last_event_id(self):
+        try:
+            row = self._conn().execute('SELECT MAX(id) FROM events').fetchone()
+            return row[0] or 0
+        except sqlite3.Error:
+            return 0
+
+    def events_after(self, last_id, limit=500):
+        """[(id, event, data, origin pid)] logged after last_id, oldest first"""
+        try:
+            rows = self._conn().execute(
+                'SELECT id, event, data, origin FROM events WHERE id > ? ORDER BY id LIMIT ?', (last_id, limit)
+            ).fetchall()
+        except sqlite3.Error as e:
+            logger.warning(f"Failed to read shared events: {e}")
+            return []
+        return [(row[0], row[1], json.loads(row[2]), row[3]) for row in rows]
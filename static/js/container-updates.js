@@ -500,7 +500,7 @@ async function updateSingleContainer(containerId, host) {
         
         setLoading(true, `Updating container to ${targetTag}...`);
         
-        const response = await fetch('/api/container-updates/update', {
+        const result = await fetchComposeJob('/api/container-updates/update', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -511,8 +511,6 @@ async function updateSingleContainer(containerId, host) {
             })
         });
         
-        const result = await response.json();
-        
         if (result.status === 'success') {
             showMessage('success', result.message);
             
@@ -646,7 +644,7 @@ async function executeBatchUpdate() {
         
         setLoading(true, `Updating ${selectedUpdates.length} containers...`);
         
-        const response = await fetch('/api/container-updates/batch-update', {
+        const result = await fetchComposeJob('/api/container-updates/batch-update', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -654,8 +652,6 @@ async function executeBatchUpdate() {
             })
         });
         
-        const result = await response.json();
-        
         if (result.status === 'success') {
             showMessage('success', result.message);
             
@@ -928,6 +924,10 @@ async function saveContainerUpdateSettings() {
 
 // Refresh update indicators
 function refreshUpdateIndicators() {
+    if (window.composrStreamConnected) {
+        // New results are pushed over /api/stream
+        return;
+    }
     if (containerUpdateStatus?.settings?.auto_check_enabled) {
         // Only refresh if auto-check is enabled
         loadContainerUpdateStatus();
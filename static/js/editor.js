@@ -628,7 +628,7 @@ function createAndDeployProject() {
             
             const composeFile = `${projectName}/docker-compose.yml`;
             
-            return fetch('/api/compose/apply', {
+            return fetchComposeJob('/api/compose/apply', {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
@@ -637,7 +637,6 @@ function createAndDeployProject() {
                     pull: true
                 })
             })
-            .then(deployResponse => deployResponse.json())
             .then(deployResult => {
                 setLoading(false);
                 
@@ -767,7 +766,7 @@ function retryDeployment(composeFile) {
         // Execute the compose restart
         setLoading(true, 'Retrying deployment...');
         
-        fetch('/api/compose/apply', {
+        fetchComposeJob('/api/compose/apply', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -776,7 +775,6 @@ function retryDeployment(composeFile) {
                 pull: false  // Don't pull on retry to make it faster
             })
         })
-        .then(response => response.json())
         .then(result => {
             setLoading(false);
             
@@ -330,7 +330,7 @@ function composeAction(action, file = null) {
     
     if (selectedHost !== 'local') {
         // Use multi-host endpoint
-        fetch('/api/compose/deploy', {
+        fetchComposeJob('/api/compose/deploy', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -340,7 +340,6 @@ function composeAction(action, file = null) {
                 pull: action === 'restart'
             })
         })
-        .then(response => response.json())
         .then(result => {
             setLoading(false);
             if (result.status === 'success') {
@@ -362,7 +361,7 @@ function composeAction(action, file = null) {
         });
     } else {
         // Use existing local deployment
-        fetch('/api/compose/apply', {
+        fetchComposeJob('/api/compose/apply', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({ 
@@ -370,7 +369,6 @@ function composeAction(action, file = null) {
                 pull: action === 'restart'
             })
         })
-        .then(response => response.json())
         .then(result => {
             setLoading(false);
             if (result.status === 'success') {
@@ -528,6 +526,75 @@ function setLoading(isLoading, message = 'Loading...') {
     }
 }
 
+// Compose operations are queued as background jobs: follow the job and
+// resolve to its final result, shaped like the old synchronous responses
+async function fetchComposeJob(url, options) {
+    const response = await fetch(url, options);
+    const queued = await response.json();
+    if (!queued.job_id) {
+        return queued;
+    }
+    // Live output over SSE; poll the status if the stream is refused or drops
+    const streamed = window.EventSource ? await streamComposeJob(queued.job_id) : null;
+    if (streamed) {
+        return streamed;
+    }
+    while (true) {
+        await new Promise(resolve => setTimeout(resolve, 1000));
+        const statusResponse = await fetch(`/api/deployment/status/${queued.job_id}`);
+        const status = await statusResponse.json();
+        if (status.status !== 'success') {
+            return status;
+        }
+        const job = status.job;
+        showJobOutput(job.output.slice(-JOB_OUTPUT_SHOWN), true);
+        if (job.state === 'completed' || job.state === 'failed') {
+            return composeJobResult(job);
+        }
+    }
+}
+
+function streamComposeJob(jobId) {
+    return new Promise(resolve => {
+        const source = new EventSource(`/api/deployment/stream/${jobId}`);
+        source.addEventListener('output', event => {
+            showJobOutput(JSON.parse(event.data).lines.map(entry => entry[2]));
+        });
+        source.addEventListener('skipped', event => {
+            showJobOutput([`... ${JSON.parse(event.data).lines} lines skipped ...`]);
+        });
+        source.addEventListener('done', event => {
+            source.close();
+            resolve(composeJobResult(JSON.parse(event.data)));
+        });
+        source.onerror = () => {
+            source.close();
+            resolve(null);
+        };
+    });
+}
+
+function composeJobResult(job) {
+    return job.result || { status: job.state === 'completed' ? 'success' : 'error', message: job.message };
+}
+
+const JOB_OUTPUT_SHOWN = 8;  // output lines under the loading message
+
+function showJobOutput(lines, replace = false) {
+    const spinner = document.getElementById('loading-spinner');
+    if (!spinner || !lines.length) {
+        return;
+    }
+    let output = spinner.querySelector('.job-output');
+    if (!output) {
+        output = document.createElement('pre');
+        output.className = 'job-output';
+        spinner.appendChild(output);
+    }
+    const shown = replace ? lines : output.textContent.split('\n').filter(line => line).concat(lines);
+    output.textContent = shown.slice(-JOB_OUTPUT_SHOWN).join('\n');
+}
+
 // Tab switching
 function switchTab(tabName) {
     document.querySelectorAll('.tab').forEach(tab => tab.classList.remove('active'));
@@ -694,39 +761,71 @@ function loadSystemStats() {
 }
 
 // Container functionality
-function startStatsUpdater() {
-    console.log("Starting stats updater...");
+function applyContainerStats(id, cpuPercent, memoryUsage) {
+    const card = document.querySelector(`[data-id="${id}"]`);
+    if (!card) {
+        return;
+    }
+    if (cpuPercent > 0) {
+        card.dataset.cpu = cpuPercent;
+    }
+    if (memoryUsage > 0) {
+        card.dataset.memory = memoryUsage;
+    }
+    
+    const statsEl = card.querySelector('.container-stats');
+    if (statsEl) {
+        statsEl.textContent = `CPU: ${card.dataset.cpu}% | Memory: ${card.dataset.memory} MB`;
+    }
+    
+    const popupCpu = document.getElementById(`popup-cpu-${id}`);
+    const popupMemory = document.getElementById(`popup-memory-${id}`);
+    
+    if (popupCpu) popupCpu.textContent = card.dataset.cpu;
+    if (popupMemory) popupMemory.textContent = card.dataset.memory;
+}
+
+let streamRefreshTimer = null;
+
+// Coalesce bursts of state changes (e.g. compose up) into one list refresh
+function scheduleStreamRefresh() {
+    clearTimeout(streamRefreshTimer);
+    streamRefreshTimer = setTimeout(() => {
+        if (!document.getElementById('loading-spinner')) {
+            refreshContainers();
+        }
+    }, 1500);
+}
+
+function startStatsPolling() {
+    console.log("Starting stats polling...");
     
+    // Only fetch rows that changed since the last poll
+    let epoch = '';
+    let version = 0;
     setInterval(() => {
         if (document.getElementById('loading-spinner')) {
             return;
         }
         
-        fetch('/api/containers?nocache=' + Date.now())
+        fetch(`/api/containers?since=${version}&epoch=${epoch}`, { cache: 'no-store' })
             .then(response => response.json())
-            .then(containers => {
-                containers.forEach(container => {
-                    const card = document.querySelector(`[data-id="${container.id}"]`);
-                    if (card) {
-                        if (container.cpu_percent > 0) {
-                            card.dataset.cpu = container.cpu_percent;
-                        }
-                        if (container.memory_usage > 0) {
-                            card.dataset.memory = container.memory_usage;
-                        }
-                        
-                        const statsEl = card.querySelector('.container-stats');
-                        if (statsEl) {
-                            statsEl.textContent = `CPU: ${card.dataset.cpu}% | Memory: ${card.dataset.memory} MB`;
+            .then(delta => {
+                epoch = delta.epoch;
+                version = delta.version;
+                // Stats and uptime are not versioned; every answer carries them for all rows
+                Object.values(delta.live || {}).forEach(hostContainers => {
+                    Object.entries(hostContainers).forEach(([id, live]) => {
+                        applyContainerStats(id, live.cpu_percent, live.memory_usage);
+                        const uptimeBadge = document.querySelector(`[data-id="${id}"] .uptime-badge`);
+                        if (uptimeBadge && live.uptime) {
+                            uptimeBadge.textContent = live.uptime.display;
                         }
-                        
-                        const popupCpu = document.getElementById(`popup-cpu-${container.id}`);
-                        const popupMemory = document.getElementById(`popup-memory-${container.id}`);
-                        
-                        if (popupCpu) popupCpu.textContent = card.dataset.cpu;
-                        if (popupMemory) popupMemory.textContent = card.dataset.memory;
-                    }
+                    });
                 });
+                if (!delta.full && (delta.changed.length || delta.removed.length)) {
+                    scheduleStreamRefresh();
+                }
             })
             .catch(error => {
                 console.error('Stats update failed:', error);
@@ -734,6 +833,48 @@ function startStatsUpdater() {
     }, 5000);
 }
 
+function startStatsUpdater() {
+    console.log("Starting stats updater...");
+    
+    if (typeof EventSource === 'undefined') {
+        startStatsPolling();
+        return;
+    }
+    
+    // Live deltas over Server-Sent Events; fall back to polling if the stream is refused
+    const source = new EventSource('/api/stream');
+    
+    source.addEventListener('hello', () => {
+        window.composrStreamConnected = true;
+    });
+    source.addEventListener('stats', (e) => {
+        const data = JSON.parse(e.data);
+        Object.entries(data.containers).forEach(([id, stats]) => {
+            applyContainerStats(id, stats.cpu_percent, stats.memory_usage);
+        });
+    });
+    source.addEventListener('container', scheduleStreamRefresh);
+    source.addEventListener('resync', scheduleStreamRefresh);
+    source.addEventListener('host', () => {
+        scheduleStreamRefresh();
+        if (typeof loadSystemStatsMultiHost === 'function') {
+            loadSystemStatsMultiHost();
+        }
+    });
+    source.addEventListener('updates', () => {
+        if (typeof loadContainerUpdateStatus === 'function') {
+            loadContainerUpdateStatus();
+        }
+    });
+    source.onerror = () => {
+        window.composrStreamConnected = false;
+        if (source.readyState === EventSource.CLOSED) {
+            console.warn('Event stream unavailable, falling back to polling');
+            startStatsPolling();
+        }
+    };
+}
+
 function updateTagFilterOptions(tags) {
     const tagFilter = document.getElementById('tag-filter');
     const tagFilterMobile = document.getElementById('tag-filter-mobile');
@@ -1538,7 +1679,7 @@ async function createAndDeployProject() {
                 setLoading(true, `Deploying to ${deployHost}...`);
                 
                 try {
-                    const deployResponse = await fetch('/api/compose/deploy', {
+                    const deployResult = await fetchComposeJob('/api/compose/deploy', {
                         method: 'POST',
                         headers: { 'Content-Type': 'application/json' },
                         body: JSON.stringify({
@@ -1549,8 +1690,6 @@ async function createAndDeployProject() {
                         })
                     });
                     
-                    const deployResult = await deployResponse.json();
-                    
                     if (deployResult.status === 'success') {
                         showPersistentResult('Create & Deploy', deployResult, projectName);
                         
@@ -2727,7 +2866,7 @@ function composeActionWithHost(action, file, host = 'local') {
     
     if (host !== 'local') {
         // Use multi-host endpoint
-        fetch('/api/compose/deploy', {
+        fetchComposeJob('/api/compose/deploy', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -2737,7 +2876,6 @@ function composeActionWithHost(action, file, host = 'local') {
                 pull: action === 'restart'
             })
         })
-        .then(response => response.json())
         .then(result => {
             setLoading(false);
             if (result.status === 'success') {
@@ -2760,12 +2898,11 @@ function composeActionWithHost(action, file, host = 'local') {
             { file: file, action: 'down' } : 
             { file: file, pull: action === 'restart' };
             
-        fetch(endpoint, {
+        fetchComposeJob(endpoint, {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(body)
         })
-        .then(response => response.json())
         .then(result => {
             setLoading(false);
             if (result.status === 'success') {
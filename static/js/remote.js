@@ -222,7 +222,7 @@ function createHostListItem(hostName, hostInfo, currentHost) {
     const hostDiv = document.createElement('div');
     hostDiv.className = `host-item ${hostInfo.connected ? 'connected' : 'disconnected'}`;
     
-    const statusIcon = hostInfo.connected ? '🟢' : '🔴';
+    const statusIcon = hostInfo.connected ? '🟢' : (hostInfo.connecting ? '🟡' : '🔴');
     
     hostDiv.innerHTML = `
         <div class="host-info">
@@ -236,7 +236,7 @@ function createHostListItem(hostName, hostInfo, currentHost) {
                     <span class="host-type">tcp</span>
                     <span class="last-check">Last check: ${formatLastCheck(hostInfo.last_check)}</span>
                 ` : `
-                    <span class="host-error">Connection failed</span>
+                    <span class="host-error">${hostInfo.connecting ? 'Connecting...' : 'Connection failed'}</span>
                 `}
             </div>
         </div>
@@ -591,7 +591,7 @@ async function deployProjectToHost(composePath, host, autoStart = true) {
         
         const action = autoStart ? 'up' : 'down';
         
-        const response = await fetch('/api/compose/deploy', {
+        const result = await fetchComposeJob('/api/compose/deploy', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify({
@@ -601,8 +601,6 @@ async function deployProjectToHost(composePath, host, autoStart = true) {
             })
         });
         
-        const result = await response.json();
-        
         if (result.status === 'success') {
             showMessage('success', `Project deployed successfully to ${host}`);
             